@@ -1,205 +1,29 @@
-import streamlit as st
+import os
+from datetime import timedelta
 import pandas as pd
-import numpy as np
-from pathlib import Path
-from xgboost import XGBRegressor
-import traceback
-import plotly.graph_objects as go
-import logging
+import streamlit as st
+from feature_store import FeatureStore, append_upload
+from inference import Model, PredictionCache, get_registry, predict_upload
+from inference.registry import live_setup
+from inference.constants import BASE_COLS, MULTI_HORIZON
+from inference.plots import MAX_POINTS, prediction_figure
+from ingestion import IngestionError
 
 #RUN COMMAND: 
 
-class Model:
-
-    def __init__(self, timestamp_unit="s"):
-
-        self.input_params = [
-            'CONVEYOR_STATUS_16', 'CONVEYOR_STATUS_03', 'CONVEYOR_STATUS_04',
-            'CONVEYOR_STATUS_01', 'CONVEYOR_STATUS_06', 'CONVEYOR_STATUS_08',
-            'CONVEYOR_STATUS_05', 'CONVEYOR_STATUS_12', 'CONVEYOR_STATUS_09',
-            'CONVEYOR_STATUS_07', 'CONVEYOR_STATUS_02', 'CONVEYOR_STATUS_13',
-            'CONVEYOR_STATUS_17', 'CONVEYOR_STATUS_22', 'CONVEYOR_STATUS_14',
-            'CONVEYOR_STATUS_11', 'CONVEYOR_STATUS_20', 'CONVEYOR_STATUS_19',
-            'CONVEYOR_STATUS_21', 'CONVEYOR_STATUS_25', 'CONVEYOR_STATUS_23',
-            'CONVEYOR_STATUS_24', 'CONVEYOR_STATUS_27', 'CONVEYOR_STATUS_26',
-            'CONVEYOR_STATUS_29'
-        ]
-
-        self.timestamp_unit = "s"
-        self.timestamp_factor = 1 if self.timestamp_unit == 's' else 1000
-        self.logger = logging.getLogger("ML MODEL LOGGER")
-        self.logger.setLevel(logging.INFO)
-        if not self.logger.hasHandlers():
-            stream_handler = logging.StreamHandler()
-            self.logger.addHandler(stream_handler)
-
-
-    def predict(self, data):
-        try:
-            self.logger.info("Prediction started")
-            missing_cols = list(set(self.input_params) - set(data.columns))
-            if missing_cols:
-                self.logger.info("Missing Columns")
-                return {
-                    "status":"error",
-                    "message": f"Missing columns: {missing_cols}"
-                }
-            
-
-            data["TIMESTAMP"] = pd.to_datetime(
-                data["TIMESTAMP"],
-                unit=self.timestamp_unit,
-                errors="coerce"
-            )
-
-            data = data.sort_values("TIMESTAMP")
-
-
-            # resample----------------------->
-            df_resampled = (
-                data
-                .ffill()
-                .set_index("TIMESTAMP")
-                .resample("1min")
-                .first()
-                .ffill()
-                .fillna(0).reset_index()
-            )
-
-            if df_resampled.empty:
-                self.logger.info("Resampled data is empty!")
-                return pd.DataFrame({
-                    "status":"error",
-                    "message": "No data after resampling"})
-        
-            duration_minutes = (df_resampled["TIMESTAMP"].max() - df_resampled["TIMESTAMP"].min()).total_seconds() / 60
-
-            if duration_minutes < 15:
-                self.logger.info("Insufficient duration of data, past 15 mins data unavailable")
-                return {
-                    "status":"error",
-                    "message": f"Insufficient data duration: {duration_minutes:.2f} minutes. At least 15 minutes of historical data is required for prediction."
-                }
-            
-            self.logger.info("Resampled sucessfully!")
-
-            # feature engineering----------------------->
-            conveyor_cols = [
-                col for col in df_resampled.columns
-                if col.startswith("CONVEYOR_STATUS")
-            ]
-
-            df_resampled["num_carts_full"] = (df_resampled[conveyor_cols] == 0).sum(axis=1)
-            df_resampled["num_carts_empty"] = (df_resampled[conveyor_cols] == 1).sum(axis=1)
-            df_resampled["num_carts_maintenance"] = (df_resampled[conveyor_cols] == 2).sum(axis=1)
-
-            
-            feature_df_15 = self.create_cart_features(df_resampled, 3)
-            feature_df_30 = self.create_cart_features(df_resampled, 5)
-            feature_df_45 = self.create_cart_features(df_resampled, 10)
-            feature_df_60 = self.create_cart_features(df_resampled, 15)
-            self.logger.info("Feature engineering done!")
-            if feature_df_15.empty or feature_df_30.empty or feature_df_45.empty or feature_df_60.empty:
-                self.logger.info("Feature data frame is empty!")
-                return {
-                    "status":"error",
-                    "message": "Insufficient data after feature engineering. Please provide more historical data for accurate predictions."
-                }
-            
-            feature_map = {
-                15: feature_df_15,
-                30: feature_df_30,
-                45: feature_df_45,
-                60: feature_df_60
-            }
-            feature_cols = [
-            'num_carts_full',
-            'num_carts_empty',
-            'num_carts_maintenance',
-
-            'num_carts_full_lag1',
-            'num_carts_empty_lag1',
-            'num_carts_maintenance_lag1',
-
-            'num_carts_full_roll_mean',
-            'num_carts_empty_roll_mean',
-            'num_carts_maintenance_roll_mean',
-
-            'num_carts_full_roll_std',
-            'num_carts_empty_roll_std',
-            'num_carts_maintenance_roll_std',
-
-            'num_carts_full_diff1',
-            'num_carts_empty_diff1',
-            'num_carts_maintenance_diff1'
-            ]
-
-
-            BASE_DIR = Path(__file__).resolve().parent
-            predictions = {}
-            plots = {}
-            for mins, fdf in feature_map.items():
-
-                fname = f"xgb_regressor_cart{mins}min.json"
-                model_path = BASE_DIR / "model_files" / fname
 
-                model = XGBRegressor()
-                model.load_model(model_path)
+@st.cache_resource
+def get_prediction_cache():
+    #shared by all sessions; set PREDICTION_CACHE_DIR to spill evicted results to disk
+    return PredictionCache(spill_dir=os.environ.get("PREDICTION_CACHE_DIR"))
 
-                preds = model.predict(fdf[feature_cols])
-                last_pred = int(np.rint(preds[-1]))
-                predictions[f"PRED_{mins}"] = last_pred
 
-                # store plot
-                plots[mins] = (fdf["TIMESTAMP"], preds)
-                self.logger.info(f"Predicted {mins} min")
+@st.cache_resource
+def get_feature_store():
+    #set FEATURE_STORE_DIR to keep the minutes and features of every upload on disk (one conveyor line per store)
+    path = os.environ.get("FEATURE_STORE_DIR")
+    return FeatureStore(path) if path else None
 
-            result = {
-                "status": "success",
-                "predictions": predictions,
-                "plots": plots,
-                "resampled": df_resampled
-            }
-            self.logger.info("Returning result")
-
-            return result
-        except Exception as e:
-            self.logger.error("An error occurred during prediction.  Error details: " + str(e) + "\n" + traceback.format_exc())
-            return {
-                "status":"error",
-                "message": "An error occurred during prediction.  Error details: " + str(e) + "\n" + traceback.format_exc()
-            }
-
-    def create_cart_features(self,df, roll_window):
-
-        df = df.sort_values("TIMESTAMP").reset_index(drop=True).copy()
-
-        base_cols = ["num_carts_full", "num_carts_empty", "num_carts_maintenance"]
-
-        # -------------------------
-        # Lag Features
-        # -------------------------
-        for col in base_cols:
-            df[f"{col}_lag1"] = df[col].shift(1)
-
-        # -------------------------
-        # Rolling Mean + Std
-        # -------------------------
-        for col in base_cols:
-            df[f"{col}_roll_mean"] = df[col].rolling(roll_window).mean()
-            df[f"{col}_roll_std"] = df[col].rolling(roll_window).std()
-
-        # -------------------------
-        # Difference / Momentum
-        # -------------------------
-        for col in base_cols:
-            df[f"{col}_diff1"] = df[col].diff(1)
-
-        # Drop rows where target not available
-        df = df.dropna().reset_index(drop=True)
-
-        return df
-    
 # ==============================
 # STREAMLIT UI
 # ==============================
@@ -207,12 +31,25 @@ class Model:
 st.title("🚀 Conveyor Prediction App")
 
 st.write(
-    "Upload a CSV containing TIMESTAMP and conveyor status columns."
+    "Upload a CSV containing TIMESTAMP and conveyor status columns, or an event log with TIMESTAMP, CONVEYOR_ID and STATUS columns."
 )
 
 #upload a file
 uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
 
+#plots need predictions for the full history, otherwise only the latest minute is scored
+show_plots = st.checkbox("Show prediction plots", value=True)
+show_timings = st.checkbox("Show timing breakdown", value=False)
+#one model for all four horizons, offered once it has been trained (python -m training --multi-horizon)
+multi_horizon = False
+if get_registry().model_path(MULTI_HORIZON).exists():
+    #preselected when the multi-horizon model was the last one promoted
+    multi_horizon = st.checkbox("Use single multi-horizon model", value=live_setup(get_registry().model_dir).get("multi_horizon", False))
+feature_store = get_feature_store()
+use_store = False
+if feature_store is not None:
+    use_store = st.checkbox("Predict from the feature store (every uploaded minute)", value=True)
+
 if st.button("Run Prediction"):
 
     if uploaded_file is not None:
@@ -222,55 +59,88 @@ if st.button("Run Prediction"):
                 st.error("Uploaded file is not a CSV.")
                 st.stop()
 
-            df = pd.read_csv(uploaded_file)
+            model = Model(multi_horizon=multi_horizon)
+            mode = "full" if show_plots else "latest"
+
+            try:
+                if feature_store is not None:
+                    #only the minutes after the stored ones are written
+                    preview, stored, minutes = append_upload(feature_store, uploaded_file.getvalue())
+                if use_store:
+                    output = {**model.predict_store(feature_store, mode=mode), "preview": preview, "cache": "store", "stored": stored}
+                elif feature_store is not None:
+                    #the upload was already read for the store, predict from the same minutes
+                    predict = model.predict_counts if BASE_COLS[0] in minutes.columns else model.predict_resampled
+                    output = {**predict(minutes, mode=mode), "preview": preview, "cache": "upload", "stored": stored}
+                else:
+                    #same upload (or an appended one) with the same models is served from the cache
+                    output = predict_upload(uploaded_file.getvalue(), get_prediction_cache(), model, mode=mode)
+            except IngestionError as e:
+                st.error(str(e))
+                st.stop()
 
-            st.subheader("Input Data Preview")
-            st.dataframe(df.head())
+            #kept across reruns, so changing the plot range redraws without predicting again
+            st.session_state["output"] = output
+            st.session_state["plots_requested"] = show_plots
 
-            model = Model()
+        except Exception as e:
+            st.error(f"Error: {e}")
 
-            output = model.predict(df)
+    else:
+        st.warning("Please upload a CSV file to run predictions.")
 
-            if output["status"] == "error":
+output = st.session_state.get("output")
+if output is not None:
+    try:
+        st.subheader("Input Data Preview")
+        st.dataframe(output["preview"])
 
-                st.error(output["message"])
+        if output["status"] == "error":
 
-            else:
+            st.error(output["message"])
 
-                st.success("Prediction Completed")
+        else:
 
-                st.subheader("Predictions")
-                st.write(output["predictions"])
+            source = {"hit": " (cached)", "prefix": " (appended rows only)"}.get(output["cache"], "")
+            if output["cache"] == "store":
+                source = f" (feature store, {output['stored']} minutes written)"
+            elif output["cache"] == "upload":
+                source = f" (upload, {output['stored']} minutes written to the feature store)"
+            st.success("Prediction Completed" + source)
 
-                st.subheader("Resampled Data")
-                st.dataframe(output["resampled"].tail())
+            st.subheader("Predictions")
+            st.write(output["predictions"])
 
-                st.subheader("Prediction Plots")
-                            
-                for mins, (ts, preds) in output["plots"].items():
+            st.subheader("Resampled Data")
+            st.dataframe(output["resampled"].tail())
 
-                    fig = go.Figure()
+            if show_timings:
+                st.subheader("Timing Breakdown")
+                timings = pd.DataFrame(output["stages"])
+                st.bar_chart(timings.set_index("stage")["duration_ms"])
+                st.dataframe(timings)
 
-                    fig.add_trace(
-                        go.Scatter(
-                            x=ts,
-                            y=preds,
-                            mode="lines",
-                            name=f"{mins} Min Prediction"
-                        )
-                    )
+            if st.session_state["plots_requested"]:
+                st.subheader("Prediction Plots")
 
-                    fig.update_layout(
-                        title=f"{mins} Minute Prediction",
-                        xaxis_title="Timestamp",
-                        yaxis_title="Predicted Available Carts",
-                        template="plotly_white"
+                #long histories are downsampled for the browser; a narrower range is redrawn from the full predictions
+                ts_all = next(iter(output["plots"].values()))[0]
+                first, last = ts_all.iloc[0].to_pydatetime(), ts_all.iloc[-1].to_pydatetime()
+                start, end = first, last
+                if len(ts_all) > MAX_POINTS:
+                    start, end = st.slider(
+                        "Plot range",
+                        min_value=first,
+                        max_value=last,
+                        value=(first, last),
+                        step=timedelta(minutes=1),
+                        format="YYYY-MM-DD HH:mm"
                     )
+                    st.caption(f"Ranges up to {MAX_POINTS:,} minutes are drawn at full resolution, longer ones keep each bucket's minimum and maximum.")
 
+                for mins, (ts, preds) in output["plots"].items():
+                    fig = prediction_figure(ts, preds, mins, start=start, end=end)
                     st.plotly_chart(fig, use_container_width=True)
 
-        except Exception as e:
-            st.error(f"Error: {e}")
-
-    else:
-        st.warning("Please upload a CSV file to run predictions.")
\ No newline at end of file
+    except Exception as e:
+        st.error(f"Error: {e}")
\ No newline at end of file
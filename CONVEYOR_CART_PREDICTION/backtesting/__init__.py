@@ -0,0 +1 @@
+from .engine import TARGET_COL, make_cutoffs, run_backtest, summarize
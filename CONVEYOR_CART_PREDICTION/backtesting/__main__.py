@@ -0,0 +1,54 @@
+"""
+Walk-forward validation of the deployed (or candidate) horizon models.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m backtesting --data history.csv --step 1D --workers 8 --out backtest.csv
+python -m backtesting --data history.csv --model-dir candidate_models/
+python -m backtesting --store feature_store_data --step 7D
+"""
+import argparse
+import sys
+
+from feature_store import FeatureStore
+from ingestion import IngestionError, read_conveyor_csv
+from .engine import run_backtest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="wide conveyor export CSV")
+    source.add_argument("--store", help="feature store directory (python -m feature_store)")
+    parser.add_argument("--step", default="1D", help="time between cutoffs")
+    parser.add_argument("--span", default=None, help="forecast period scored per cutoff (default: step)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--model-dir", default=None, help="score these model files instead of model_files/")
+    parser.add_argument("--out", default=None, help="write the per-cutoff metrics to this CSV")
+    args = parser.parse_args()
+
+    if args.store:
+        data, data_format = FeatureStore(args.store), "store"
+    else:
+        try:
+            data, data_format = read_conveyor_csv(args.data).resampled, "resampled"
+        except IngestionError as e:
+            sys.exit(str(e))
+
+    result = run_backtest(
+        data,
+        step=args.step,
+        span=args.span,
+        data_format=data_format,
+        max_workers=args.workers,
+        model_dir=args.model_dir
+    )
+    if result["status"] == "error":
+        sys.exit(result["message"])
+
+    print(result["summary"].to_string(index=False))
+    if args.out:
+        result["per_cutoff"].to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
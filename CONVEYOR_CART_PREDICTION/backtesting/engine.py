@@ -0,0 +1,189 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inference import Model, ModelRegistry, get_registry
+from inference.constants import HORIZON_WINDOWS
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+# the training target: empty carts this many minutes after the forecast is issued
+TARGET_COL = "num_carts_empty"
+
+METRIC_COLS = ["CUTOFF", "HORIZON", "N", "MAE", "RMSE", "BIAS", "R2"]
+
+
+def make_cutoffs(timestamps, step="1D", start=None, end=None, span=None) -> pd.DatetimeIndex:
+    """
+    Walk-forward cutoffs every step, from start (default: first minute plus the
+    longest feature warm-up) to the last cutoff whose span still fits the data.
+    """
+    timestamps = pd.DatetimeIndex(timestamps)
+    span = pd.Timedelta(span or step)
+    first = timestamps[0] + pd.Timedelta(minutes=max(HORIZON_WINDOWS.values()))
+    start = max(pd.Timestamp(start), first) if start is not None else first
+    last = timestamps[-1] - span - pd.Timedelta(minutes=min(HORIZON_WINDOWS))
+    end = min(pd.Timestamp(end), last) if end is not None else last
+    return pd.date_range(start.ceil("1min"), end, freq=step)
+
+
+def run_backtest(
+    data,
+    cutoffs=None,
+    step="1D",
+    span=None,
+    data_format="wide",
+    max_workers=None,
+    model_dir=None
+) -> dict:
+    """
+    Rolling-origin backtest of the four horizon models.
+
+    At every cutoff the models forecast each minute in [cutoff, cutoff + span)
+    and are scored against the empty-cart count horizon minutes later.
+
+    data goes through the same pipeline as Model.predict: data_format "wide"
+    (raw export, Model.prepare), "resampled" (Model.prepare_resampled),
+    "counts" (Model.prepare_counts) or "store" (a feature_store.FeatureStore,
+    whose stored features Model.prepare_store reads). The pipeline is causal
+    (ffill, first row per minute, trailing rolling windows), so features of a
+    minute computed on the whole history equal those computed on the history
+    up to any later cutoff; they are therefore computed once and every cutoff
+    scores a slice.
+    Cutoffs are grouped into contiguous chunks scored in a process pool.
+
+    model_dir scores candidate model files instead of the deployed ones.
+
+    Returns {"status", "per_cutoff": DataFrame(METRIC_COLS), "summary": DataFrame per horizon}.
+    """
+    model = Model()
+    prepare = {
+        "wide": model.prepare,
+        "resampled": model.prepare_resampled,
+        "counts": model.prepare_counts,
+        "store": model.prepare_store
+    }
+    if data_format not in prepare:
+        return {
+            "status":"error",
+            "message": f"Unknown data format: {data_format}"
+        }
+    prepared = prepare[data_format](data, mode="full")
+    if prepared["status"] == "error":
+        return prepared
+
+    minutes = prepared["resampled"]["TIMESTAMP"]
+    actual = prepared["resampled"][TARGET_COL].to_numpy(dtype=np.float64)
+    span = pd.Timedelta(span or step)
+    cutoffs = make_cutoffs(minutes, step, span=span) if cutoffs is None else pd.DatetimeIndex(cutoffs).sort_values()
+    if len(cutoffs) == 0:
+        return {
+            "status":"error",
+            "message": "No backtest cutoffs fit in the data"
+        }
+
+    # per horizon: forecast origins (ns), features and the value horizon minutes later
+    series = {}
+    for mins, X in prepared["features"].items():
+        origin_ns = prepared["timestamps"][mins].to_numpy().astype("datetime64[ns]").astype(np.int64)
+        target_row = np.arange(len(minutes) - len(X), len(minutes)) + mins
+        y = np.full(len(X), np.nan)
+        inside = target_row < len(actual)
+        y[inside] = actual[target_row[inside]]
+        series[mins] = (origin_ns, X, y)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(cutoffs))
+    tasks = []
+    for group in np.array_split(cutoffs.asi8, max_workers):
+        if len(group) == 0:
+            continue
+        lo, hi = group[0], group[-1] + span.value
+        task_series = {}
+        for mins, (origin_ns, X, y) in series.items():
+            a, b = np.searchsorted(origin_ns, [lo, hi])
+            task_series[mins] = (origin_ns[a:b], X[a:b], y[a:b])
+        tasks.append((group, span.value, task_series, model_dir, _threads_per_worker(max_workers)))
+
+    if len(tasks) == 1:
+        # in-process: leave the shared boosters' thread settings alone
+        parts = [_score_cutoffs(tasks[0][:-1] + (None,))]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(tasks), mp_context=ctx) as pool:
+            parts = list(pool.map(_score_cutoffs, tasks))
+
+    per_cutoff = (
+        pd.DataFrame([row for part in parts for row in part])
+        .sort_values(["HORIZON", "CUTOFF"], kind="stable")
+        .reset_index(drop=True)
+    )
+    logger.info(f"Backtested {len(cutoffs)} cutoffs over {len(tasks)} worker(s)")
+    return {
+        "status": "success",
+        "per_cutoff": per_cutoff[METRIC_COLS],
+        "summary": summarize(per_cutoff)
+    }
+
+
+def summarize(per_cutoff: pd.DataFrame) -> pd.DataFrame:
+    """Pooled error per horizon plus the spread of the per-cutoff MAE."""
+    rows = []
+    for mins, df in per_cutoff.groupby("HORIZON"):
+        n = df["N"].sum()
+        rows.append({
+            "HORIZON": mins,
+            "CUTOFFS": len(df),
+            "N": int(n),
+            "MAE": (df["_SAE"].sum() / n) if n else np.nan,
+            "RMSE": np.sqrt(df["_SSE"].sum() / n) if n else np.nan,
+            "MAE_STD": df["MAE"].std(),
+            "MAE_WORST": df["MAE"].max()
+        })
+    return pd.DataFrame(rows)
+
+
+def _threads_per_worker(n_workers: int) -> int:
+    return max((os.cpu_count() or 1) // n_workers, 1)
+
+
+def _score_cutoffs(task) -> list:
+    """Worker: predict the chunk's rows once per horizon, then score each cutoff's slice."""
+    cutoffs_ns, span_ns, task_series, model_dir, n_threads = task
+    registry = ModelRegistry(model_dir) if model_dir is not None else get_registry()
+
+    rows = []
+    for mins, (origin_ns, X, y) in task_series.items():
+        booster = registry.get(mins)
+        if n_threads is not None:
+            # workers split the cores instead of each starting one thread per core
+            booster.set_params(n_jobs=n_threads)
+        preds = booster.predict(X) if len(X) else np.empty(0)
+        for cutoff in cutoffs_ns:
+            a, b = np.searchsorted(origin_ns, [cutoff, cutoff + span_ns])
+            err_y, err_p = y[a:b], preds[a:b]
+            valid = ~np.isnan(err_y)
+            rows.append(_metrics(pd.Timestamp(cutoff), mins, err_y[valid], err_p[valid]))
+    return rows
+
+
+def _metrics(cutoff, mins, y, preds) -> dict:
+    err = preds - y
+    n = len(y)
+    sse = float(np.sum(err * err))
+    ss_tot = float(np.sum((y - y.mean()) ** 2)) if n else 0.0
+    return {
+        "CUTOFF": cutoff,
+        "HORIZON": mins,
+        "N": n,
+        "MAE": float(np.mean(np.abs(err))) if n else np.nan,
+        "RMSE": float(np.sqrt(sse / n)) if n else np.nan,
+        "BIAS": float(np.mean(err)) if n else np.nan,
+        "R2": 1 - sse / ss_tot if ss_tot > 0 else np.nan,
+        # sums for pooling across cutoffs in summarize()
+        "_SAE": float(np.sum(np.abs(err))),
+        "_SSE": sse
+    }
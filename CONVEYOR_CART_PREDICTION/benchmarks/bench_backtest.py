@@ -0,0 +1,73 @@
+"""
+Backtest benchmark: re-running Model.predict per cutoff vs the rolling-origin engine.
+
+The naive job rebuilds the pipeline on the history up to each cutoff's span end,
+the engine computes the features once and scores cutoff slices in a process pool.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_backtest --duration 60D --step 1D --workers 1 4
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtesting import TARGET_COL, make_cutoffs, run_backtest
+from inference import Model, get_registry
+from .synthetic import generate_wide
+
+
+def naive_backtest(data: pd.DataFrame, cutoffs, span) -> float:
+    """
+    Mean 15 min MAE over cutoffs, one full Model.predict per cutoff. The truncated
+    history ends at its last event, so a few trailing minutes score differently.
+    """
+    model = Model()
+    model.logger.setLevel(logging.WARNING)
+    ts = pd.to_datetime(data["TIMESTAMP"], unit="s")
+    maes = []
+    for cutoff in cutoffs:
+        out = model.predict(data[ts < cutoff + span + pd.Timedelta(minutes=15)].copy(), mode="full")
+        actual = out["resampled"].set_index("TIMESTAMP")[TARGET_COL]
+        origins, preds = out["plots"][15]
+        origins = pd.DatetimeIndex(origins)
+        in_span = (origins >= cutoff) & (origins < cutoff + span)
+        target = actual.reindex(origins[in_span] + pd.Timedelta(minutes=15)).to_numpy()
+        valid = ~np.isnan(target)
+        maes.append(np.mean(np.abs(preds[in_span][valid] - target[valid])))
+    return float(np.mean(maes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", default="60D")
+    parser.add_argument("--step", default="1D")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    get_registry().preload()
+    data = generate_wide(duration=args.duration)
+    minutes = pd.date_range(pd.to_datetime(data["TIMESTAMP"].iloc[0], unit="s").floor("1min"),
+                            pd.to_datetime(data["TIMESTAMP"].iloc[-1], unit="s"), freq="1min")
+    span = pd.Timedelta(args.step)
+    cutoffs = make_cutoffs(minutes, args.step)[1:]
+    print(f"{args.duration} of data, {len(cutoffs)} cutoffs every {args.step}")
+
+    start = time.perf_counter()
+    naive_mae = naive_backtest(data, cutoffs, span)
+    t_naive = time.perf_counter() - start
+    print(f"{'naive':>12} {t_naive:>8.2f}s  MAE15={naive_mae:.4f}")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = run_backtest(data.copy(), cutoffs=cutoffs, step=args.step, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        per_cutoff = result["per_cutoff"]
+        mae = per_cutoff.loc[per_cutoff["HORIZON"] == 15, "MAE"].mean()
+        print(f"{f'engine x{workers}':>12} {elapsed:>8.2f}s  MAE15={mae:.4f}  speedup {t_naive / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Multi-line batch prediction benchmark: 1, 10 and 100 lines, single process vs process pool.
+
+Lines are copies of the sample export with the conveyor columns shuffled, written to a
+temporary directory and read back by inference.batch.predict_lines.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_batch --lines 1 10 100 --workers 1 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from inference import get_registry, predict_lines
+from inference.constants import INPUT_PARAMS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = BASE_DIR / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+def write_lines(directory: Path, n_lines: int, seed: int = 0):
+    sample = pd.read_csv(SAMPLE_CSV)
+    rng = np.random.default_rng(seed)
+    for i in range(n_lines):
+        shuffled = sample.copy()
+        shuffled[INPUT_PARAMS] = sample[list(rng.permutation(INPUT_PARAMS))].to_numpy()
+        shuffled.to_csv(directory / f"LINE_{i:03d}.csv", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--mode", default="full", choices=["full", "latest"])
+    args = parser.parse_args()
+
+    get_registry().preload()
+    print(f"{'lines':>6} {'workers':>8} {'seconds':>9} {'lines/s':>8} {'speedup':>8}")
+    for n_lines in args.lines:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_lines(Path(tmp), n_lines)
+            baseline = None
+            for workers in args.workers:
+                start = time.perf_counter()
+                result = predict_lines(tmp, mode=args.mode, max_workers=workers)
+                elapsed = time.perf_counter() - start
+                assert not result["errors"], result["errors"]
+                baseline = baseline or elapsed
+                print(f"{n_lines:>6} {workers:>8} {elapsed:>9.2f} {n_lines / elapsed:>8.2f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
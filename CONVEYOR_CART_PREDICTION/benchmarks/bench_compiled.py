@@ -0,0 +1,81 @@
+"""
+Compiled inference benchmark: XGBRegressor.predict vs the NumPy compiled ensemble.
+
+Every shipped model (and the multi-horizon one when present) is compiled with
+inference.compiled, checked against XGBRegressor.predict on real feature rows
+(with some values set to NaN to exercise the default directions), then timed
+for a single row, as predicted by mode="latest", and for a large batch.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_compiled --data EDA_Training_files/data/raw_conveyor_cart_data.csv
+python -m benchmarks.bench_compiled --rows 1 10 100 10000 --repeat 50
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from inference import CompiledEnsemble, Model, ModelRegistry
+from inference.constants import HORIZON_WINDOWS, MULTI_HORIZON
+from ingestion import read_conveyor_csv
+
+
+def best_of(fn, repeat) -> float:
+    """Fastest of repeat runs in milliseconds (the least disturbed one)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="EDA_Training_files/data/raw_conveyor_cart_data.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    four, one = Model(registry=registry), Model(registry=registry, multi_horizon=True)
+    logging.getLogger("ML MODEL LOGGER").setLevel(logging.WARNING)
+    resampled = read_conveyor_csv(args.data).resampled
+    registry.preload()
+    keys = list(HORIZON_WINDOWS)
+    features = dict(four.prepare_resampled(resampled.copy(), "full")["features"])
+    if registry.model_path(MULTI_HORIZON).exists():
+        keys.append(MULTI_HORIZON)
+        features.update(one.prepare_resampled(resampled.copy(), "full")["features"])
+
+    rng = np.random.default_rng(0)
+    print(f"{'model':>6} {'rows':>6} {'xgboost (ms)':>13} {'numpy (ms)':>11} {'row fn (ms)':>12} {'max diff':>9}")
+    for key in keys:
+        booster = registry.get(key)
+        start = time.perf_counter()
+        compiled = CompiledEnsemble.from_booster(booster)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        X = np.asarray(features[key], dtype=np.float32)
+        X_nan = X.copy()
+        X_nan[rng.random(X.shape) < 0.05] = np.nan
+        diff = max(float(np.max(np.abs(compiled.predict(x) - booster.predict(x)))) for x in (X, X_nan))
+
+        for n in args.rows:
+            batch = X[-n:]
+            xgb_ms = best_of(lambda: booster.predict(batch), args.repeat)
+            # array path only, the generated row function is timed separately
+            compiled.ROW_FUNCTION_MAX_ROWS = 0
+            numpy_ms = best_of(lambda: compiled.predict(batch), args.repeat)
+            del compiled.ROW_FUNCTION_MAX_ROWS
+            row_ms = "-"
+            if n <= compiled.ROW_FUNCTION_MAX_ROWS and compiled.depth <= 8:
+                compiled.row_function()
+                row_ms = f"{best_of(lambda: compiled.predict(batch), args.repeat):.3f}"
+            print(f"{key:>6} {n:>6} {xgb_ms:>13.3f} {numpy_ms:>11.3f} {row_ms:>12} {diff:>9.2g}")
+        print(f"{'':>6} compiled in {compile_ms:.0f} ms, {compiled.n_trees} trees of depth {compiled.depth}")
+
+
+if __name__ == "__main__":
+    main()
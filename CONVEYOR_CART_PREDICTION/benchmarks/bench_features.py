@@ -0,0 +1,94 @@
+"""
+Feature engineering benchmark: pandas create_cart_features (x4) vs the single-pass NumPy engine.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_features --months 1 3 6 12
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference.constants import BASE_COLS, FEATURE_COLS, HORIZON_WINDOWS, INPUT_PARAMS
+from inference.features import build_features, status_counts
+
+
+def make_resampled(n_minutes: int, seed: int = 42) -> pd.DataFrame:
+    """Per-minute status matrix where each conveyor holds a state for a random number of minutes."""
+    rng = np.random.default_rng(seed)
+    status = np.empty((n_minutes, len(INPUT_PARAMS)))
+    for j in range(len(INPUT_PARAMS)):
+        durations = rng.integers(30, 400, size=n_minutes // 30 + 1)
+        states = rng.choice([0, 1, 2], p=[0.6, 0.25, 0.15], size=len(durations))
+        status[:, j] = np.repeat(states, durations)[:n_minutes]
+    df = pd.DataFrame(status, columns=INPUT_PARAMS)
+    df.insert(0, "TIMESTAMP", pd.date_range("2026-01-01", periods=n_minutes, freq="1min"))
+    return df
+
+
+def pandas_features(df: pd.DataFrame) -> dict:
+    """The original app.py path: three == passes then create_cart_features per window."""
+    df = df.copy()
+    df["num_carts_full"] = (df[INPUT_PARAMS] == 0).sum(axis=1)
+    df["num_carts_empty"] = (df[INPUT_PARAMS] == 1).sum(axis=1)
+    df["num_carts_maintenance"] = (df[INPUT_PARAMS] == 2).sum(axis=1)
+
+    out = {}
+    for roll_window in HORIZON_WINDOWS.values():
+        fdf = df.sort_values("TIMESTAMP").reset_index(drop=True).copy()
+        for col in BASE_COLS:
+            fdf[f"{col}_lag1"] = fdf[col].shift(1)
+        for col in BASE_COLS:
+            fdf[f"{col}_roll_mean"] = fdf[col].rolling(roll_window).mean()
+            fdf[f"{col}_roll_std"] = fdf[col].rolling(roll_window).std()
+        for col in BASE_COLS:
+            fdf[f"{col}_diff1"] = fdf[col].diff(1)
+        out[roll_window] = fdf.dropna().reset_index(drop=True)
+    return out
+
+
+def numpy_features(df: pd.DataFrame) -> dict:
+    counts = status_counts(df[INPUT_PARAMS].to_numpy())
+    return build_features(counts, HORIZON_WINDOWS.values())
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_parity(df: pd.DataFrame):
+    expected = pandas_features(df)
+    actual = numpy_features(df)
+    for roll_window, fdf in expected.items():
+        start, X = actual[roll_window]
+        assert len(fdf) == len(X), f"row count differs for window {roll_window}"
+        # XGBoost evaluates features in float32
+        np.testing.assert_array_equal(
+            fdf[FEATURE_COLS].to_numpy().astype(np.float32), X.astype(np.float32)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=float, nargs="+", default=[1, 3, 6, 12])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'months':>7} {'minutes':>9} {'pandas (s)':>11} {'numpy (s)':>10} {'speedup':>8}")
+    for months in args.months:
+        n_minutes = int(months * 30 * 24 * 60)
+        df = make_resampled(n_minutes)
+        check_parity(df)
+        t_pandas = best_of(pandas_features, df, args.repeat)
+        t_numpy = best_of(numpy_features, df, args.repeat)
+        print(f"{months:>7g} {n_minutes:>9} {t_pandas:>11.3f} {t_numpy:>10.3f} {t_pandas / t_numpy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
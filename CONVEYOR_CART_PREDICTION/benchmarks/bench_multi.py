@@ -0,0 +1,109 @@
+"""
+Multi-horizon benchmark: four per-horizon boosters vs one multi-output model.
+
+Both setups are trained on the same export with the same parameters, then
+compared on model size, inference latency (booster only and the whole
+Model.predict_resampled, for the latest minute and the full history) and test
+MAE per horizon on the forecast origins both test sets share.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_multi --data EDA_Training_files/data/raw_conveyor_cart_data.csv
+python -m benchmarks.bench_multi --data history.csv --trees 200 --repeat 50 --full-repeat 5
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inference import Model, ModelRegistry
+from inference.constants import HORIZON_WINDOWS, MULTI_HORIZON, model_filename
+from ingestion import read_conveyor_csv
+from training import DEFAULT_PARAMS, MULTI_PARAMS, multi_horizon_set, train_horizons, train_multi_horizon, training_sets, write_models
+
+
+def best_of(fn, repeat) -> float:
+    """Fastest of repeat runs in milliseconds (the least disturbed one)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def shared_mae(sets, multi, separate, multi_model) -> dict:
+    """Test MAE per horizon of both setups on the origins present in both test sets."""
+    multi_pred = multi_model.predict(multi["X_test"])
+    rows = {}
+    for i, mins in enumerate(HORIZON_WINDOWS):
+        data = sets[mins]
+        _, a, b = np.intersect1d(data["timestamps_test"], multi["timestamps_test"], return_indices=True)
+        separate_pred = separate[mins][0].predict(data["X_test"][a])
+        rows[mins] = (
+            len(a),
+            float(np.mean(np.abs(separate_pred - data["y_test"][a]))),
+            float(np.mean(np.abs(multi_pred[b, i] - multi["y_test"][b, i])))
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="EDA_Training_files/data/raw_conveyor_cart_data.csv")
+    parser.add_argument("--trees", type=int, default=DEFAULT_PARAMS["n_estimators"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs for the latest minute")
+    parser.add_argument("--full-repeat", type=int, default=3, help="timed runs for the full history")
+    args = parser.parse_args()
+
+    logging.getLogger("ML MODEL LOGGER").setLevel(logging.WARNING)
+    resampled = read_conveyor_csv(args.data).resampled
+    print(f"{len(resampled)} minutes, {args.trees} trees per model")
+
+    sets = training_sets(resampled)
+    multi = multi_horizon_set(resampled)
+    start = time.perf_counter()
+    separate = train_horizons(sets, {mins: {**DEFAULT_PARAMS, "n_estimators": args.trees} for mins in sets}, args.threads)
+    t_separate = time.perf_counter() - start
+    start = time.perf_counter()
+    combined = train_multi_horizon(multi, {**MULTI_PARAMS, "n_estimators": args.trees}, args.threads)
+    t_multi = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_models({**separate, **combined}, model_dir=tmp, version="bench", promote=True)
+        sizes = {key: (Path(tmp) / model_filename(key)).stat().st_size for key in (*HORIZON_WINDOWS, MULTI_HORIZON)}
+
+        registry = ModelRegistry(tmp).preload()
+        registry.get(MULTI_HORIZON)
+        four, one = Model(registry=registry), Model(registry=registry, multi_horizon=True)
+        for m in (four, one):
+            m.logger.setLevel(logging.WARNING)
+
+        print(f"\n{'':>24} {'4 models':>10} {'multi':>10}")
+        print(f"{'train (s)':>24} {t_separate:>10.2f} {t_multi:>10.2f}")
+        print(f"{'size (MB)':>24} {sum(sizes[h] for h in HORIZON_WINDOWS) / 2**20:>10.2f} {sizes[MULTI_HORIZON] / 2**20:>10.2f}")
+
+        for label, mode, repeat in (("latest", "latest", args.repeat), ("full history", "full", args.full_repeat)):
+            prepared = {name: m.prepare_resampled(resampled.copy(), mode) for name, m in (("four", four), ("one", one))}
+            n_rows = len(next(iter(prepared["one"]["features"].values())))
+            booster = {
+                name: best_of(lambda p=p: [registry.get(key).predict(X) for key, X in p["features"].items()], repeat)
+                for name, p in prepared.items()
+            }
+            end_to_end = {
+                name: best_of(lambda m=m: m.predict_resampled(resampled.copy(), mode), repeat)
+                for name, m in (("four", four), ("one", one))
+            }
+            print(f"{f'{label} booster (ms)':>24} {booster['four']:>10.3f} {booster['one']:>10.3f}   {n_rows} rows")
+            print(f"{f'{label} predict (ms)':>24} {end_to_end['four']:>10.3f} {end_to_end['one']:>10.3f}")
+
+    print(f"\n{'horizon':>8} {'rows':>6} {'MAE 4 models':>13} {'MAE multi':>10}")
+    for mins, (n, mae_separate, mae_multi) in shared_mae(sets, multi, separate, combined[MULTI_HORIZON][0]).items():
+        print(f"{mins:>8} {n:>6} {mae_separate:>13.3f} {mae_multi:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
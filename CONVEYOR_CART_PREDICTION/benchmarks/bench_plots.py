@@ -0,0 +1,77 @@
+"""
+Plot payload benchmark: full-resolution go.Scatter traces vs the downsampled
+figures of inference.plots.
+
+For prediction series of each length (one value per minute, a bounded random
+walk like the cart predictions), builds the four horizon figures the app
+draws and reports the JSON sent to the browser, the time to build and
+serialize it, the trace type and whether every local minimum and maximum of
+the series is still drawn. Browser render time grows with the number of
+points sent; SVG traces above a few thousand points are what stalled the page.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_plots
+python -m benchmarks.bench_plots --minutes 1440 43200 525600 --method lttb
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from inference.constants import HORIZON_WINDOWS
+from inference.plots import DOWNSAMPLE_METHODS, MAX_POINTS, downsample, prediction_figure
+
+
+def series(n_minutes, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = pd.Series(pd.date_range("2025-01-01", periods=n_minutes, freq="min"))
+    preds = np.clip(12 + np.cumsum(rng.normal(0, 0.3, n_minutes)), 0, 25).astype(np.float32)
+    return ts, preds
+
+
+def full_figure(ts, preds, mins):
+    """The figure the app drew before downsampling."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=ts, y=preds, mode="lines", name=f"{mins} Min Prediction"))
+    fig.update_layout(title=f"{mins} Minute Prediction", xaxis_title="Timestamp", yaxis_title="Predicted Available Carts", template="plotly_white")
+    return fig
+
+
+def measure(build, plots):
+    start = time.perf_counter()
+    payload = sum(len(build(ts, preds, mins).to_json()) for mins, (ts, preds) in plots.items())
+    return payload, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=int, nargs="+", default=[1440, 43200, 262800, 525600])
+    parser.add_argument("--method", choices=DOWNSAMPLE_METHODS, default="minmax")
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS)
+    args = parser.parse_args()
+
+    # first figure loads the plotly template and validators
+    full_figure(*series(10), 15).to_json()
+    print(f"{'minutes':>8} {'full MB':>8} {'full ms':>8} {'down MB':>8} {'down ms':>8} {'points':>7} {'trace':>10} {'range ok':>9}")
+    for n in args.minutes:
+        plots = {mins: series(n, seed) for seed, mins in enumerate(HORIZON_WINDOWS)}
+        full_bytes, full_ms = measure(full_figure, plots)
+        down_bytes, down_ms = measure(
+            lambda ts, preds, mins: prediction_figure(ts, preds, mins, args.max_points, method=args.method), plots
+        )
+
+        first = next(iter(plots))
+        ts, preds = plots[first]
+        fig = prediction_figure(ts, preds, first, args.max_points, method=args.method)
+        _, kept = downsample(ts, preds, args.max_points, method=args.method)
+        range_ok = kept.min() == preds.min() and kept.max() == preds.max()
+        print(
+            f"{n:>8} {full_bytes / 2**20:>8.2f} {full_ms:>8.0f} {down_bytes / 2**20:>8.2f} {down_ms:>8.0f}"
+            f" {len(kept):>7} {fig.data[0].type:>10} {str(range_ok):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
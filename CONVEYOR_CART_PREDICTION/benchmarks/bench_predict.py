@@ -0,0 +1,147 @@
+"""
+Stage-by-stage benchmark of Model.predict on synthetic data.
+
+Every stage of the full-mode pipeline is timed (best of --repeat) and its peak
+memory measured with tracemalloc: CSV parse, datetime conversion, sort,
+resample, status counts, prefix sums, the four roll-window feature passes and
+the four horizon predictions, plus Model.predict end to end.
+
+--save writes the results as JSON; --compare checks them against a saved run
+and exits with status 1 when a stage got slower or hungrier than --tolerance,
+so it can gate a deploy.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_predict --durations 1D 30D 365D --save bench.json
+python -m benchmarks.bench_predict --durations 1D 30D 365D --compare bench.json
+"""
+import argparse
+import io
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from inference import Model, get_registry
+from inference.constants import HORIZON_WINDOWS, INPUT_PARAMS
+from inference.features import _prefixed_cumsum, status_counts, window_features
+from inference.resample import resample_frame
+from .synthetic import generate_wide
+
+# stages this short are dominated by timer noise, so they are not gated
+MIN_GATED_SECONDS = 0.02
+
+
+def pipeline_stages() -> list:
+    """(name, input stage, fn) triples; fn takes the named stage's output."""
+    registry = get_registry()
+
+    def prefix_sums(counts):
+        counts = counts.astype(np.int64)
+        return counts, _prefixed_cumsum(counts), _prefixed_cumsum(counts * counts)
+
+    stages = [
+        ("read_csv", "csv", lambda text: pd.read_csv(io.StringIO(text))),
+        ("to_datetime", "read_csv", lambda df: df.assign(TIMESTAMP=pd.to_datetime(df["TIMESTAMP"], unit="s", errors="coerce"))),
+        ("sort", "to_datetime", lambda df: df.sort_values("TIMESTAMP")),
+        ("resample", "sort", resample_frame),
+        ("counts", "resample", lambda df: status_counts(df[INPUT_PARAMS].to_numpy())),
+        ("prefix_sums", "counts", prefix_sums),
+    ]
+    for roll_window in HORIZON_WINDOWS.values():
+        stages.append((
+            f"features_w{roll_window}", "prefix_sums",
+            lambda sums, w=roll_window: window_features(sums[0], w, sums[1], sums[2])
+        ))
+    for mins, roll_window in HORIZON_WINDOWS.items():
+        stages.append((f"predict_{mins}", f"features_w{roll_window}", lambda X, m=mins: registry.get(m).predict(X)))
+    return stages
+
+
+def measure(fn, arg, repeat: int):
+    """Best wall time over repeat runs, then peak traced memory of one more run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(arg)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, min(timings), peak
+
+
+def run(duration: str, rate: float, repeat: int) -> dict:
+    data = generate_wide(duration=duration, rate=rate)
+    outputs = {"csv": data.to_csv(index=False)}
+    results = {"rows": len(data), "stages": {}}
+
+    for name, source, fn in pipeline_stages():
+        outputs[name], seconds, peak = measure(fn, outputs[source], repeat)
+        results["stages"][name] = {"seconds": seconds, "peak_mb": peak / 2**20}
+    results["minutes"] = len(outputs["resample"])
+    del outputs
+
+    model = Model()
+    model.logger.setLevel(logging.WARNING)
+    _, seconds, peak = measure(lambda df: model.predict(df.copy(), mode="full"), data, repeat)
+    results["stages"]["predict_total"] = {"seconds": seconds, "peak_mb": peak / 2**20}
+    return results
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for duration, run_result in current.items():
+        for name, stage in run_result["stages"].items():
+            before = baseline.get(duration, {}).get("stages", {}).get(name)
+            if before is None:
+                continue
+            if stage["seconds"] > MIN_GATED_SECONDS and stage["seconds"] > before["seconds"] * (1 + tolerance):
+                found.append(f"{duration} {name}: {before['seconds']:.4f}s -> {stage['seconds']:.4f}s")
+            if stage["peak_mb"] > 1 and stage["peak_mb"] > before["peak_mb"] * (1 + tolerance):
+                found.append(f"{duration} {name}: {before['peak_mb']:.1f}MB -> {stage['peak_mb']:.1f}MB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", nargs="+", default=["1D", "30D", "365D"])
+    parser.add_argument("--rate", type=float, default=1.0, help="event density relative to the sample")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    get_registry().preload()
+
+    results = {}
+    for duration in args.durations:
+        result = run(duration, args.rate, args.repeat)
+        results[duration] = result
+        print(f"\n{duration}: {result['rows']} rows -> {result['minutes']} minutes")
+        print(f"{'stage':>15} {'seconds':>9} {'peak MB':>9}")
+        for name, stage in result["stages"].items():
+            print(f"{name:>15} {stage['seconds']:>9.4f} {stage['peak_mb']:>9.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print("\nRegressions:\n" + "\n".join(found))
+            sys.exit(1)
+        print("\nNo regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Resample benchmark: the pandas ffill/resample/first chain vs the NumPy bucketing resampler.
+
+Input is a synthetic wide export with about --rows rows, already converted and sorted
+the way Model.prepare hands it to the resample step. Outputs are compared bit for bit
+whenever both paths run; the pandas path is skipped above --pandas-max-rows because
+its intermediate copies need several times the input's memory.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.bench_resample --rows 10000 1000000 50000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from inference.resample import resample_frame
+from .synthetic import generate_wide
+
+# rows per year of the sample's event density
+SAMPLE_ROWS_PER_YEAR = 33_000
+
+
+def make_input(n_rows: int, float32: bool) -> pd.DataFrame:
+    rate = max(n_rows / SAMPLE_ROWS_PER_YEAR, 0.05)
+    data = generate_wide(duration="365D", rate=rate)
+    if float32:
+        data = data.astype({c: np.float32 for c in data.columns if c != "TIMESTAMP"})
+    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"], unit="s")
+    return data.sort_values("TIMESTAMP")
+
+
+def pandas_resample(data: pd.DataFrame) -> pd.DataFrame:
+    return (
+        data
+        .ffill()
+        .set_index("TIMESTAMP")
+        .resample("1min")
+        .first()
+        .ffill()
+        .fillna(0).reset_index()
+    )
+
+
+def measure(fn, data, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(data)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, min(timings), peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 50_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pandas-max-rows", type=int, default=5_000_000)
+    parser.add_argument("--float32", action="store_true", help="float32 status columns (half the input memory)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'minutes':>8} {'pandas s':>9} {'pandas MB':>10} {'numpy s':>8} {'numpy MB':>9} {'speedup':>8}")
+    for n_rows in args.rows:
+        data = make_input(n_rows, args.float32)
+        fast, t_numpy, mb_numpy = measure(resample_frame, data, args.repeat)
+        if len(data) <= args.pandas_max_rows:
+            slow, t_pandas, mb_pandas = measure(pandas_resample, data, args.repeat)
+            pd.testing.assert_frame_equal(fast, slow, check_exact=True)
+            pandas_cols = f"{t_pandas:>9.3f} {mb_pandas:>10.1f}"
+            speedup = f"{t_pandas / t_numpy:>7.1f}x"
+        else:
+            pandas_cols, speedup = f"{'-':>9} {'-':>10}", f"{'-':>8}"
+        print(f"{len(data):>10} {len(fast):>8} {pandas_cols} {t_numpy:>8.3f} {mb_numpy:>9.1f} {speedup}")
+        del data, fast
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Load test for the prediction service: throughput and latency versus batch window.
+
+For every batch window a fresh uvicorn server is started with BATCH_WINDOW_MS set,
+then `--requests` latest-mode requests are fired with `--concurrency` in flight.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.load_test --windows 0 2 5 10 20 --requests 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = BASE_DIR / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+def make_payload(rows: int, lines: int) -> dict:
+    df = pd.read_csv(SAMPLE_CSV).tail(rows)
+    records = [
+        {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in r.items()}
+        for r in df.to_dict("records")
+    ]
+    return {
+        "mode": "latest",
+        "lines": [{"line_id": f"LINE_{i}", "data": records} for i in range(lines)]
+    }
+
+
+def start_server(port: int, window_ms: float) -> subprocess.Popen:
+    env = {**os.environ, "BATCH_WINDOW_MS": str(window_ms)}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fastapi_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Prediction service did not start")
+
+
+async def run_load(client: httpx.AsyncClient, payload: dict, n_requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            r = await client.post("/predict", json=payload)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    # warm up the threadpool and boosters
+    await asyncio.gather(*[one() for _ in range(concurrency)])
+    latencies.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(n_requests)])
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies)
+    return {
+        "throughput_rps": n_requests / elapsed,
+        "p50_ms": np.percentile(lat, 50),
+        "p95_ms": np.percentile(lat, 95),
+        "p99_ms": np.percentile(lat, 99)
+    }
+
+
+async def bench_window(window_ms: float, port: int, payload: dict, n_requests: int, concurrency: int) -> dict:
+    server = start_server(port, window_ms)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            await wait_ready(client)
+            result = await run_load(client, payload, n_requests, concurrency)
+            stats = (await client.get("/models")).json()["batching"]["stats"]
+        horizon_stats = next(iter(stats.values()))
+        result["requests_per_batch"] = horizon_stats["requests"] / max(horizon_stats["batches"], 1)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5, 10, 20])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=200, help="raw rows per line in each request")
+    parser.add_argument("--lines", type=int, default=1, help="conveyor lines per request")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows, args.lines)
+    print(f"{'window ms':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/batch':>9}")
+    for window_ms in args.windows:
+        r = asyncio.run(bench_window(window_ms, args.port, payload, args.requests, args.concurrency))
+        print(
+            f"{window_ms:>9g} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} "
+            f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['requests_per_batch']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
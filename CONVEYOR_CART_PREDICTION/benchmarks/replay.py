@@ -0,0 +1,385 @@
+"""
+Event replay load generator for the prediction path.
+
+The events of a conveyor export (wide CSV or event log, e.g. the sample
+raw_conveyor_cart_data.csv) are replayed at --speed times real time, as
+--lines simulated conveyor lines staggered across one minute of data time.
+Every event that opens a new minute asks for the current forecast:
+
+  predict    Model.predict(mode="latest") on the line's trailing minutes, what the service runs
+  streaming  StreamingPredictor.update for every event, one predictor per line
+  http       POST /predict of the same trailing minutes to the service at --url
+
+Requests are sent on the replay schedule whether or not earlier ones have
+finished (open loop), and latency is measured from the time an event was due,
+so queueing behind a slow prediction is part of it. In-process predictions run
+on --workers single-threaded executors, each serving every workers-th line, so
+the events of one line are applied in order.
+
+--save writes the report (configuration, model versions, git revision,
+throughput and latency percentiles) as JSON; --compare checks it against a
+saved report and exits with status 1 when latency or throughput got worse than
+--tolerance, so releases can be tracked with the same run.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.replay --speed 3600 --lines 10 --duration 1D --save replay.json
+python -m benchmarks.replay --speed 3600 --lines 10 --duration 1D --compare replay.json
+python -m benchmarks.replay --target http --url http://127.0.0.1:8002 --speed 3600 --lines 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost
+
+from inference import Model, StreamingPredictor, get_registry
+from inference.constants import INPUT_PARAMS
+from inference.features import minutes_needed
+from ingestion import read_event_log
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = BASE_DIR / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+TARGETS = ("predict", "streaming", "http")
+PERCENTILES = (50, 90, 95, 99, 99.9)
+# latencies this short are dominated by timer noise, so they are not gated
+MIN_GATED_MS = 1.0
+
+
+def load_events(path, start=None, duration=None):
+    """
+    Events of an export grouped by timestamp, limited to [start, start + duration).
+    Returns (timestamps in ns, group offsets into the event arrays, conveyor
+    index per event (-1 for heartbeats and unknown conveyors), status per event).
+    """
+    events = read_event_log(path)
+    ts = events["TIMESTAMP"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    lo = 0 if start is None else int(np.searchsorted(ts, pd.Timestamp(start).value, side="left"))
+    hi = len(ts)
+    if duration is not None and lo < len(ts):
+        hi = int(np.searchsorted(ts, ts[lo] + pd.Timedelta(duration).value, side="left"))
+    events = events.iloc[lo:hi]
+    ts = ts[lo:hi]
+    if len(ts) == 0:
+        raise ValueError(f"No events to replay in {path}")
+
+    index = {c: i for i, c in enumerate(INPUT_PARAMS)}
+    categories = np.array([index.get(c, -1) for c in events["CONVEYOR_ID"].cat.categories] + [-1])
+    # heartbeats have code -1, which picks the trailing -1
+    conveyor = categories[events["CONVEYOR_ID"].cat.codes.to_numpy()]
+    status = events["STATUS"].to_numpy(dtype=np.int8)
+    conveyor[status < 0] = -1
+
+    group_ts, offsets = np.unique(ts, return_index=True)
+    return group_ts, np.append(offsets, len(ts)), conveyor, status
+
+
+class LineReplay:
+    """
+    Conveyor state of one simulated line. Keeps a row per minute with events
+    (the full state after the minute's first event, which is the row the
+    resample takes) spanning the last minutes_needed() minutes, from the row
+    at or before their start, so a latest-mode request rebuilds the same
+    features as the line's whole history would and covers Model.predict's
+    minimum duration.
+    """
+
+    def __init__(self, line_id):
+        self.line_id = line_id
+        self.state = np.full(len(INPUT_PARAMS), np.nan)
+        self.minute = None
+        self.rows = deque()
+        self.span = minutes_needed()
+
+    def apply(self, ts_ns, conveyor, status) -> bool:
+        """Apply one event group; True when it opened a minute the line can be forecast at."""
+        known = conveyor >= 0
+        self.state[conveyor[known]] = status[known]
+        minute = ts_ns // 60_000_000_000
+        if minute == self.minute:
+            return False
+        self.minute = minute
+        self.rows.append((minute, self.state.copy()))
+        # the row at or before the window start carries the state into it
+        while len(self.rows) > 1 and self.rows[1][0] <= minute - self.span:
+            self.rows.popleft()
+        return minute - self.rows[0][0] >= self.span
+
+    def frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(np.vstack([state for _, state in self.rows]), columns=INPUT_PARAMS)
+        df.insert(0, "TIMESTAMP", [float(minute * 60) for minute, _ in self.rows])
+        return df
+
+    def payload(self) -> dict:
+        """The trailing minutes in the column format of POST /predict."""
+        data = {"TIMESTAMP": [float(minute * 60) for minute, _ in self.rows]}
+        states = np.vstack([state for _, state in self.rows])
+        for i, col in enumerate(INPUT_PARAMS):
+            data[col] = [None if np.isnan(v) else float(v) for v in states[:, i]]
+        return {"line_id": self.line_id, "data": data}
+
+
+def schedule(group_ts, n_lines, speed):
+    """(group, line, due seconds) of every event of every line, in send order."""
+    due = (group_ts - group_ts[0]) / 1e9 / speed
+    # lines are spread over one data minute so they do not fire in lock step
+    offsets = np.arange(n_lines) * (60.0 / speed / n_lines)
+    times = (due[:, None] + offsets[None, :]).ravel()
+    order = np.argsort(times, kind="stable")
+    groups, lines = np.divmod(order, n_lines)
+    return groups, lines, times[order]
+
+
+class Recorder:
+    """Latency samples and counters, shared by the worker threads."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.minutes = 0
+        self.max_lag = 0.0
+        self.versions = None
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok=True, minutes=1):
+        with self._lock:
+            self.latencies.append(latency)
+            self.errors += 0 if ok else 1
+            self.minutes += minutes if ok else 0
+
+
+def replay_in_process(target, events, n_lines, speed, workers) -> Recorder:
+    group_ts, offsets, conveyor, status = events
+    groups, line_of, due = schedule(group_ts, n_lines, speed)
+    lines = [LineReplay(f"LINE_{i}") for i in range(n_lines)]
+    recorder = Recorder()
+
+    if target == "predict":
+        model = Model()
+        model.logger.setLevel(logging.WARNING)
+
+        def job(line, df, due_at):
+            output = model.predict(df, mode="latest")
+            recorder.record(time.perf_counter() - due_at, output["status"] != "error")
+    else:
+        streams = [StreamingPredictor() for _ in range(n_lines)]
+
+        def job(line, event, due_at):
+            ts_ns, statuses, forecast = event
+            preds = streams[line].update(pd.Timestamp(ts_ns), statuses)
+            if forecast:
+                recorder.record(time.perf_counter() - due_at, minutes=len(preds))
+
+    executors = [ThreadPoolExecutor(max_workers=1) for _ in range(workers)]
+    start = time.perf_counter() + 0.1
+    try:
+        for g, line, t in zip(groups, line_of, due):
+            lo, hi = offsets[g], offsets[g + 1]
+            due_at = start + t
+            delay = due_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            recorder.max_lag = max(recorder.max_lag, time.perf_counter() - due_at)
+
+            forecast = lines[line].apply(group_ts[g], conveyor[lo:hi], status[lo:hi])
+            if target == "predict":
+                if forecast:
+                    executors[line % workers].submit(job, line, lines[line].frame(), due_at)
+            else:
+                statuses = {INPUT_PARAMS[c]: int(s) for c, s in zip(conveyor[lo:hi], status[lo:hi]) if c >= 0}
+                executors[line % workers].submit(job, line, (group_ts[g], statuses, forecast), due_at)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return recorder
+
+
+async def replay_http(url, events, n_lines, speed, concurrency) -> Recorder:
+    import httpx
+
+    group_ts, offsets, conveyor, status = events
+    groups, line_of, due = schedule(group_ts, n_lines, speed)
+    lines = [LineReplay(f"LINE_{i}") for i in range(n_lines)]
+    recorder = Recorder()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        await wait_ready(client)
+
+        async def one(payload, due_at):
+            try:
+                r = await client.post("/predict", json={"mode": "latest", "lines": [payload]})
+                ok = r.status_code == 200 and all(res["status"] != "error" for res in r.json()["results"])
+            except httpx.HTTPError:
+                ok = False
+            recorder.record(time.perf_counter() - due_at, ok)
+
+        # warm up the connection pool and the service's threadpool
+        warm = LineReplay("warmup")
+        for g in range(len(group_ts)):
+            if warm.apply(group_ts[g], conveyor[offsets[g]:offsets[g + 1]], status[offsets[g]:offsets[g + 1]]):
+                await client.post("/predict", json={"mode": "latest", "lines": [warm.payload()]})
+                break
+
+        tasks = []
+        start = time.perf_counter() + 0.1
+        for g, line, t in zip(groups, line_of, due):
+            lo, hi = offsets[g], offsets[g + 1]
+            due_at = start + t
+            delay = due_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            recorder.max_lag = max(recorder.max_lag, time.perf_counter() - due_at)
+            if lines[line].apply(group_ts[g], conveyor[lo:hi], status[lo:hi]):
+                tasks.append(asyncio.create_task(one(lines[line].payload(), due_at)))
+        await asyncio.gather(*tasks)
+        versions = (await client.get("/models")).json().get("versions")
+    recorder.versions = versions
+    return recorder
+
+
+async def wait_ready(client, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Prediction service did not start")
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(args, events, recorder: Recorder, elapsed) -> dict:
+    group_ts = events[0]
+    lat = np.array(recorder.latencies) * 1000
+    latency = {f"p{p:g}": float(np.percentile(lat, p)) if len(lat) else None for p in PERCENTILES}
+    latency["max"] = float(lat.max()) if len(lat) else None
+    latency["mean"] = float(lat.mean()) if len(lat) else None
+
+    return {
+        "config": {
+            "data": str(args.data),
+            "target": args.target,
+            "url": args.url,
+            "speed": args.speed,
+            "lines": args.lines,
+            "workers": args.workers,
+            "data_start": str(pd.Timestamp(int(group_ts[0]))),
+            "data_end": str(pd.Timestamp(int(group_ts[-1])))
+        },
+        "environment": {
+            "revision": git_revision(),
+            "models": {str(h): sha[:12] for h, sha in (recorder.versions or {}).items()},
+            "python": platform.python_version(),
+            "xgboost": xgboost.__version__,
+            "run_at": pd.Timestamp.now().isoformat(timespec="seconds")
+        },
+        "events": int(len(group_ts) * args.lines),
+        "requests": len(lat),
+        "errors": recorder.errors,
+        "minutes_predicted": recorder.minutes,
+        "elapsed_s": elapsed,
+        "requests_per_s": len(lat) / elapsed,
+        "events_per_s": len(group_ts) * args.lines / elapsed,
+        "max_send_lag_ms": recorder.max_lag * 1000,
+        "latency_ms": latency
+    }
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    for key in ("target", "speed", "lines", "data_start", "data_end"):
+        if current["config"].get(key) != baseline["config"].get(key):
+            found.append(f"config {key}: {baseline['config'].get(key)} -> {current['config'].get(key)} (runs are not comparable)")
+    for name, value in current["latency_ms"].items():
+        before = baseline["latency_ms"].get(name)
+        if value is None or before is None or name == "max":
+            continue
+        if value > MIN_GATED_MS and value > before * (1 + tolerance):
+            found.append(f"latency {name}: {before:.2f}ms -> {value:.2f}ms")
+    if current["requests_per_s"] < baseline["requests_per_s"] * (1 - tolerance):
+        found.append(f"throughput: {baseline['requests_per_s']:.1f} -> {current['requests_per_s']:.1f} requests/s")
+    if current["errors"] > baseline["errors"]:
+        found.append(f"errors: {baseline['errors']} -> {current['errors']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=SAMPLE_CSV, help="wide conveyor export or event log to replay")
+    parser.add_argument("--start", help="first data timestamp to replay (default: the first event)")
+    parser.add_argument("--duration", default="1D", help="span of data to replay, 'all' for the whole export")
+    parser.add_argument("--speed", type=float, default=3600, help="replay speed relative to real time")
+    parser.add_argument("--lines", type=int, default=10, help="simulated conveyor lines")
+    parser.add_argument("--target", choices=TARGETS, default="predict")
+    parser.add_argument("--url", default="http://127.0.0.1:8002", help="prediction service for --target http")
+    parser.add_argument("--workers", type=int, default=4, help="in-process prediction threads, or HTTP connections")
+    parser.add_argument("--save", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="report JSON from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.target != "http":
+        args.url = None
+
+    events = load_events(args.data, args.start, None if args.duration == "all" else args.duration)
+    span = (events[0][-1] - events[0][0]) / 1e9
+    print(
+        f"Replaying {len(events[0])} event groups ({span / 3600:.1f} h of data) x {args.lines} lines "
+        f"at {args.speed:g}x -> about {span / args.speed:.0f} s"
+    )
+
+    start = time.perf_counter()
+    if args.target == "http":
+        recorder = asyncio.run(replay_http(args.url, events, args.lines, args.speed, args.workers))
+    else:
+        registry = get_registry().preload()
+        recorder = replay_in_process(args.target, events, args.lines, args.speed, args.workers)
+        recorder.versions = registry.versions()
+    report = build_report(args, events, recorder, time.perf_counter() - start)
+
+    print(
+        f"\n{report['requests']} requests ({report['errors']} errors), {report['minutes_predicted']} minutes predicted "
+        f"in {report['elapsed_s']:.1f} s: {report['requests_per_s']:.1f} requests/s, {report['events_per_s']:.1f} events/s"
+    )
+    print(f"max send lag {report['max_send_lag_ms']:.1f} ms")
+    print(" ".join(f"{name:>8}" for name in report["latency_ms"]))
+    print(" ".join(f"{value:>8.2f}" if value is not None else f"{'-':>8}" for value in report["latency_ms"].values()))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        found = regressions(report, baseline, args.tolerance)
+        if found:
+            print("\nRegressions:\n" + "\n".join(found))
+            sys.exit(1)
+        print("\nNo regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
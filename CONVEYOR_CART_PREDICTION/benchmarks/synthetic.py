@@ -0,0 +1,157 @@
+"""
+Synthetic conveyor status data shaped like the plant export.
+
+Each conveyor reports its status (0 = full, 1 = empty, 2 = maintenance) as a
+sequence of events. The state sequence is a Markov chain and the gaps between
+a conveyor's reports are drawn from the ones observed in the sample export,
+so the status mix, the mostly alternating full/empty pattern and the long
+quiet stretches all match EDA_Training_files/data.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m benchmarks.synthetic --duration 365D --conveyors 25 --out synthetic.csv
+python -m benchmarks.synthetic --duration 30D --format events --out events.csv
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from inference.constants import INPUT_PARAMS
+from inference.features import N_STATES
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_CSV = BASE_DIR / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+def fit_profile(sample: pd.DataFrame = None) -> dict:
+    """
+    Status transition matrix, starting state mix and report gaps (seconds)
+    of the conveyors in the sample export.
+    """
+    if sample is None:
+        sample = pd.read_csv(SAMPLE_CSV)
+    conveyor_cols = [c for c in sample.columns if c.startswith("CONVEYOR_STATUS")]
+
+    transitions = np.zeros((N_STATES, N_STATES))
+    initial = np.zeros(N_STATES)
+    gaps = []
+    for col in conveyor_cols:
+        reports = sample[["TIMESTAMP", col]].dropna().sort_values("TIMESTAMP")
+        states = reports[col].to_numpy().astype(int)
+        if len(states) == 0:
+            continue
+        initial[states[0]] += 1
+        np.add.at(transitions, (states[:-1], states[1:]), 1)
+        gaps.append(np.diff(reports["TIMESTAMP"].to_numpy()))
+
+    # a state never left in the sample (maintenance -> maintenance) falls back to the overall mix
+    row_totals = transitions.sum(axis=1, keepdims=True)
+    overall = transitions.sum(axis=0) / transitions.sum()
+    transitions = np.where(row_totals > 0, transitions / np.maximum(row_totals, 1), overall)
+
+    return {
+        "transitions": transitions,
+        "initial": initial / initial.sum(),
+        "gaps": np.concatenate(gaps).astype(np.float64)
+    }
+
+
+def conveyor_names(n_conveyors: int) -> list:
+    """The real conveyor columns first, then CONVEYOR_STATUS_30, _31, ..."""
+    names = list(INPUT_PARAMS[:n_conveyors])
+    extra = n_conveyors - len(names)
+    return names + [f"CONVEYOR_STATUS_{30 + i:02d}" for i in range(extra)]
+
+
+def generate_events(
+    n_conveyors: int = len(INPUT_PARAMS),
+    duration="7D",
+    start="2026-01-01",
+    rate: float = 1.0,
+    seed: int = 0,
+    profile: dict = None
+) -> pd.DataFrame:
+    """
+    Event log (TIMESTAMP, CONVEYOR_ID, STATUS) for n_conveyors over duration,
+    in the layout of ingestion.read_event_log. rate scales how often the
+    conveyors report (rate=10 -> ten times the sample's event density).
+    """
+    profile = profile or fit_profile()
+    rng = np.random.default_rng(seed)
+    duration_s = pd.Timedelta(duration).total_seconds()
+    gaps = profile["gaps"] / rate
+
+    # enough reports per conveyor to cover the duration, with headroom
+    n_steps = int(duration_s / gaps.mean() * 1.5) + 16
+    offsets = rng.uniform(0, gaps.mean(), size=(1, n_conveyors))
+    report_s = offsets + np.cumsum(rng.choice(gaps, size=(n_steps, n_conveyors)), axis=0)
+
+    # Markov chain stepped for all conveyors at once
+    cumulative = np.cumsum(profile["transitions"], axis=1)
+    states = np.empty((n_steps, n_conveyors), dtype=np.int8)
+    states[0] = rng.choice(N_STATES, p=profile["initial"], size=n_conveyors)
+    draws = rng.random((n_steps, n_conveyors))
+    for step in range(1, n_steps):
+        row = cumulative[states[step - 1]]
+        states[step] = np.minimum((draws[step][:, None] > row).sum(axis=1), N_STATES - 1)
+
+    inside = report_s < duration_s
+    steps, conveyors = np.nonzero(inside)
+    # whole seconds, like the plant export
+    seconds = np.floor(report_s[steps, conveyors]).astype(np.int64)
+    order = np.lexsort((conveyors, seconds))
+
+    start_s = pd.Timestamp(start).value // 1_000_000_000
+    return pd.DataFrame({
+        "TIMESTAMP": pd.to_datetime(start_s + seconds[order], unit="s"),
+        "CONVEYOR_ID": pd.Categorical.from_codes(conveyors[order], categories=conveyor_names(n_conveyors)),
+        "STATUS": states[steps, conveyors][order]
+    })
+
+
+def to_wide(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Events -> the wide export Model.predict reads: epoch-second TIMESTAMP and
+    one mostly empty column per conveyor; reports sharing a second share a row.
+    """
+    seconds = events["TIMESTAMP"].to_numpy().astype("datetime64[s]").astype(np.int64)
+    rows, row_index = np.unique(seconds, return_inverse=True)
+    conveyor_ids = events["CONVEYOR_ID"]
+    if not isinstance(conveyor_ids.dtype, pd.CategoricalDtype):
+        conveyor_ids = conveyor_ids.astype("category")
+
+    values = np.full((len(rows), len(conveyor_ids.cat.categories)), np.nan)
+    # later reports in the same second win, like the export keeps the last write
+    values[row_index, conveyor_ids.cat.codes.to_numpy()] = events["STATUS"].to_numpy()
+
+    wide = pd.DataFrame(values, columns=list(conveyor_ids.cat.categories))
+    wide.insert(0, "TIMESTAMP", rows)
+    return wide
+
+
+def generate_wide(n_conveyors: int = len(INPUT_PARAMS), duration="7D", **kwargs) -> pd.DataFrame:
+    return to_wide(generate_events(n_conveyors, duration, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conveyors", type=int, default=len(INPUT_PARAMS))
+    parser.add_argument("--duration", default="7D", help="pandas timedelta, e.g. 12h, 30D, 365D")
+    parser.add_argument("--start", default="2026-01-01")
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", default="wide", choices=["wide", "events"])
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    events = generate_events(args.conveyors, args.duration, args.start, args.rate, args.seed)
+    if args.format == "wide":
+        to_wide(events).to_csv(args.out, index=False)
+    else:
+        events.assign(TIMESTAMP=events["TIMESTAMP"].astype("int64") // 1_000_000_000).to_csv(args.out, index=False)
+    print(f"Wrote {len(events)} events for {args.conveyors} conveyors over {args.duration} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
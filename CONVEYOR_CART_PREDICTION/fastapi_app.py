@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from inference import MicroBatcher, Model, StreamingPredictor, get_registry
+from inference.constants import HORIZON_WINDOWS
+from inference.instrumentation import StageTotals, to_jsonl
+
+#RUN COMMAND: uvicorn fastapi_app:app --host 0.0.0.0 --port 8002
+#BATCH_WINDOW_MS controls how long concurrent requests are coalesced per horizon
+#STAGE_LOG_PATH, when set, gets one JSON line per prediction stage
+#INFERENCE_BACKEND selects xgboost, numpy (compiled trees) or auto for the batched scoring
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "65536"))
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+STAGE_LOG_PATH = os.getenv("STAGE_LOG_PATH")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "xgboost")
+
+registry = get_registry()
+batcher = MicroBatcher(HORIZON_WINDOWS, registry=registry, window_ms=BATCH_WINDOW_MS, max_rows=BATCH_MAX_ROWS, backend=INFERENCE_BACKEND)
+model = Model(registry=registry, batcher=batcher, backend=INFERENCE_BACKEND)
+stage_totals = StageTotals()
+stage_log_lock = threading.Lock()
+#line id -> (lock, StreamingPredictor) fed by POST /lines/{line_id}/events
+streams = {}
+streams_lock = threading.Lock()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #parse the boosters before the first request
+    registry.preload()
+    batcher.start()
+    logger.info(f"Prediction service ready, batch window: {BATCH_WINDOW_MS} ms")
+    yield
+
+
+app = FastAPI(title="Conveyor Cart Prediction API", lifespan=lifespan)
+
+
+class LinePayload(BaseModel):
+    line_id: str = "default"
+    #row records [{"TIMESTAMP": ..., "CONVEYOR_STATUS_01": ...}] or columns {"TIMESTAMP": [...], ...}
+    data: Union[List[Dict[str, Optional[float]]], Dict[str, List[Optional[float]]]]
+
+
+class PredictRequest(BaseModel):
+    lines: List[LinePayload] = Field(min_length=1)
+    mode: Literal["full", "latest"] = "latest"
+
+
+class EventsRequest(BaseModel):
+    #rows of the raw export, in order: TIMESTAMP plus the statuses that changed at that instant
+    events: List[Dict[str, Optional[float]]] = Field(min_length=1)
+    #close the open minute instead of waiting for the line's next event
+    flush: bool = False
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/models")
+async def models():
+    return {
+        "versions": registry.versions(),
+        "batching": {"window_ms": BATCH_WINDOW_MS, "backend": INFERENCE_BACKEND, "stats": batcher.stats_snapshot()}
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage prediction totals in the Prometheus text format."""
+    return stage_totals.to_prometheus()
+
+
+@app.post("/predict")
+async def predict(req: PredictRequest):
+    start = time.perf_counter()
+    #nulls arrive as None, keep the status columns numeric
+    frames = {line.line_id: pd.DataFrame(line.data, dtype="float64") for line in req.lines}
+    results = await predict_lines(frames, req.mode)
+    return build_response(results, start)
+
+
+@app.post("/predict/arrow")
+async def predict_arrow(request: Request, mode: Literal["full", "latest"] = Query("latest")):
+    """Arrow IPC stream with TIMESTAMP, conveyor status columns and an optional LINE_ID column."""
+    start = time.perf_counter()
+    body = await request.body()
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Arrow IPC stream: {e}")
+
+    df = table.to_pandas()
+    if "LINE_ID" in df.columns:
+        frames = {str(line_id): g.drop(columns="LINE_ID") for line_id, g in df.groupby("LINE_ID", sort=False)}
+    else:
+        frames = {"default": df}
+    results = await predict_lines(frames, mode)
+    return build_response(results, start)
+
+
+@app.post("/lines/{line_id}/events")
+async def line_events(line_id: str, req: EventsRequest):
+    """Feed a line's live events; returns the forecasts of the minutes they closed."""
+    start = time.perf_counter()
+    if any(event.get("TIMESTAMP") is None for event in req.events):
+        raise HTTPException(status_code=400, detail="Every event needs a TIMESTAMP")
+    minutes = await run_in_threadpool(stream_events, line_id, req.events, req.flush)
+    return {"line_id": line_id, "minutes": minutes, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+@app.delete("/lines/{line_id}/events")
+async def reset_line(line_id: str):
+    """Drop a line's streaming state, e.g. before replaying its history."""
+    with streams_lock:
+        found = streams.pop(line_id, None) is not None
+    return {"line_id": line_id, "reset": found}
+
+
+def stream_events(line_id: str, events: list, flush: bool) -> list:
+    with streams_lock:
+        if line_id not in streams:
+            streams[line_id] = (threading.Lock(), StreamingPredictor(registry=registry, backend=INFERENCE_BACKEND))
+        lock, predictor = streams[line_id]
+    #events of one line are applied in order, other lines go ahead
+    with lock:
+        minutes = predictor.update_batch((event["TIMESTAMP"], event) for event in events)
+        if flush:
+            minutes += predictor.flush()
+    for minute in minutes:
+        minute["TIMESTAMP"] = str(minute["TIMESTAMP"])
+    return minutes
+
+
+async def predict_lines(frames: dict, mode: str) -> list:
+    #each line is prepared in the threadpool, inference of concurrent lines/requests is batched
+    outputs = await asyncio.gather(*[
+        run_in_threadpool(predict_line, line_id, df, mode) for line_id, df in frames.items()
+    ])
+    return list(outputs)
+
+
+def predict_line(line_id: str, df: pd.DataFrame, mode: str) -> dict:
+    start = time.perf_counter()
+    output = model.predict(df, mode=mode)
+    result = {
+        "line_id": line_id,
+        "status": output["status"],
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+    if output["status"] == "error":
+        result["message"] = output["message"]
+        return result
+
+    result["predictions"] = output["predictions"]
+    result["stages"] = output["stages"]
+    stage_totals.add(output["stages"])
+    if STAGE_LOG_PATH:
+        with stage_log_lock, open(STAGE_LOG_PATH, "a") as f:
+            f.write(to_jsonl(output["stages"], line_id=line_id, mode=mode))
+    if mode == "full":
+        result["series"] = {
+            f"PRED_{mins}": {
+                "TIMESTAMP": [str(t) for t in ts],
+                "values": [float(p) for p in preds]
+            }
+            for mins, (ts, preds) in output["plots"].items()
+        }
+    return result
+
+
+def build_response(results: list, start: float) -> dict:
+    latency_ms = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"Served {len(results)} line(s) in {latency_ms} ms")
+    return {"results": results, "latency_ms": latency_ms}
+
+
+@app.middleware("http")
+async def add_process_time(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    response.headers["X-Process-Time-ms"] = f"{(time.perf_counter() - start) * 1000:.3f}"
+    return response
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1 @@
+from .store import FeatureStore, append_upload, feature_column, first_feature_row
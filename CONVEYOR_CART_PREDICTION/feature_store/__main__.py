@@ -0,0 +1,38 @@
+"""
+Append conveyor exports (wide CSV or event log) to a feature store, in the order given.
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m feature_store --store feature_store_data --data EDA_Training_files/data/raw_conveyor_cart_data.csv
+python -m feature_store --store feature_store_data --data jan.csv feb.csv mar.csv
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from ingestion import IngestionError
+from .store import FeatureStore, append_upload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", required=True, help="feature store directory (created if missing)")
+    parser.add_argument("--data", nargs="+", required=True, help="exports to append, oldest first")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    for path in args.data:
+        start = time.perf_counter()
+        try:
+            _, written, _ = append_upload(store, Path(path).read_bytes())
+        except IngestionError as e:
+            sys.exit(f"{path}: {e}")
+        print(f"{path}: {written} minutes written in {time.perf_counter() - start:.2f} s")
+
+    days = store.days()
+    if days:
+        print(f"{store.path}: {len(store)} minutes, {store.first} to {store.last}, {len(days)} day partitions")
+
+
+if __name__ == "__main__":
+    main()
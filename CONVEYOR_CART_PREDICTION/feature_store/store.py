@@ -0,0 +1,287 @@
+import io
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from inference.constants import BASE_COLS, HORIZON_WINDOWS, MULTI_HORIZON
+from inference.features import first_valid_row, minutes_needed, multi_window_features, status_counts, window_features
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+MINUTE_NS = 60 * 10**9
+DAY_NS = 24 * 60 * MINUTE_NS
+PARTITION_FILE = "part-0.arrow"
+
+
+def feature_column(window) -> str:
+    """Store column holding the feature matrix of a roll window, or of the multi-horizon model."""
+    return "features_multi" if window == MULTI_HORIZON else f"features_w{window}"
+
+
+def first_feature_row(window) -> int:
+    """Row of the whole history from which a window's (or the multi-horizon) features exist."""
+    return minutes_needed() - 1 if window == MULTI_HORIZON else first_valid_row(window)
+
+
+class FeatureStore:
+    """
+    Per-minute cart counts and features of one conveyor line, on disk.
+
+    One Arrow IPC file per day (day=YYYY-MM-DD/part-0.arrow, readable with
+    pyarrow.dataset and hive partitioning) holds TIMESTAMP, the three counts
+    and, per roll window and for the multi-horizon model, the feature matrix
+    as a fixed size list column, so a row range of it is one contiguous
+    (rows, features) block. Features are stored as float32, the precision
+    XGBoost evaluates them at; rows before a window's warm-up hold NaN.
+
+    The minutes are contiguous from the first one stored, as if every
+    appended export had been read as one file: append() only writes minutes
+    from the last stored one on (the last minute may still have been open),
+    recomputing features from the stored tail, and forward-fills gaps. The
+    reader state after the last export (the last status of every conveyor
+    and the open minute, see MinuteBucketer.carried) is kept in the metadata
+    of the last day file, and append_upload() reads the next export from it,
+    so conveyors that have not reported in a new export keep their status.
+    Frames appended without that state (counts only) start the next export
+    from scratch, as does an export overlapping the stored rows (a re-upload
+    of a grown export, which holds its own history).
+
+    Reads memory-map the day files, and read()/matrix() slice them without
+    copying within a day. Writes are serialized per instance and every day
+    file is replaced atomically.
+    """
+
+    def __init__(self, path, windows=None):
+        self.path = Path(path)
+        self.windows = sorted(set(windows if windows is not None else HORIZON_WINDOWS.values()))
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # day -> ((mtime_ns, size), table)
+        self._tables = {}
+        self.schema = pa.schema(
+            [pa.field("TIMESTAMP", pa.timestamp("ns"))]
+            + [pa.field(col, pa.int64()) for col in BASE_COLS]
+            + [pa.field(feature_column(w), pa.list_(pa.float32(), 5 * len(BASE_COLS))) for w in self.windows]
+            + [pa.field(feature_column(MULTI_HORIZON), pa.list_(pa.float32(), (3 + 2 * len(self.windows)) * len(BASE_COLS)))],
+            metadata={"windows": ",".join(map(str, self.windows))}
+        )
+
+    def days(self) -> list:
+        """Stored days, oldest first."""
+        return sorted(p.name[len("day="):] for p in self.path.glob("day=*") if (p / PARTITION_FILE).exists())
+
+    def __len__(self) -> int:
+        return sum(self._table(day).num_rows for day in self.days())
+
+    @property
+    def first(self):
+        days = self.days()
+        return pd.Timestamp(self._timestamps(self._table(days[0]))[0]) if days else None
+
+    @property
+    def last(self):
+        days = self.days()
+        return pd.Timestamp(self._timestamps(self._table(days[-1]))[-1]) if days else None
+
+    @property
+    def carried(self):
+        """Reader state stored with the last append (MinuteBucketer.carried), None if there is none."""
+        days = self.days()
+        if not days:
+            return None
+        carried = (self._table(days[-1]).schema.metadata or {}).get(b"carried")
+        return json.loads(carried) if carried else None
+
+    def row_of(self, timestamp) -> int:
+        """Position of a stored minute in the whole history."""
+        return int((pd.Timestamp(timestamp) - self.first) // pd.Timedelta(minutes=1))
+
+    def read(self, start=None, end=None) -> pa.Table:
+        """Minutes in [start, end] (both optional) as a table of zero-copy slices of the day files."""
+        days = self.days()
+        if start is not None:
+            days = [d for d in days if d >= pd.Timestamp(start).strftime("%Y-%m-%d")]
+        if end is not None:
+            days = [d for d in days if d <= pd.Timestamp(end).strftime("%Y-%m-%d")]
+
+        slices = []
+        for day in days:
+            table = self._table(day)
+            ts = self._timestamps(table)
+            lo = 0 if start is None else int(np.searchsorted(ts, pd.Timestamp(start).to_datetime64(), side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, pd.Timestamp(end).to_datetime64(), side="right"))
+            if hi > lo:
+                slices.append(table.slice(lo, hi - lo))
+        if not slices:
+            return self.schema.empty_table()
+        return pa.concat_tables(slices)
+
+    @staticmethod
+    def matrix(table: pa.Table, column: str) -> np.ndarray:
+        """
+        (rows, features) float32 array of a feature column; a view of the
+        memory-mapped file when the table covers one day, one copy otherwise.
+        """
+        parts = []
+        for chunk in table.column(column).chunks:
+            parts.append(chunk.flatten().to_numpy(zero_copy_only=True).reshape(len(chunk), chunk.type.list_size))
+        if len(parts) == 1:
+            return parts[0]
+        width = table.schema.field(column).type.list_size
+        return np.concatenate(parts) if parts else np.empty((0, width), dtype=np.float32)
+
+    def counts(self, table: pa.Table) -> pd.DataFrame:
+        """TIMESTAMP and the count columns of a read() table as a frame (the resampled counts)."""
+        return table.select(["TIMESTAMP", *BASE_COLS]).to_pandas()
+
+    def append(self, df: pd.DataFrame, carried: dict = None) -> int:
+        """
+        Add a per-minute frame (resampled conveyor status columns, or
+        TIMESTAMP + BASE_COLS counts) in time order. carried is the reader
+        state after the frame's last row, kept for the next export. Returns
+        the number of minutes written, counting the replaced last minute.
+        """
+        if df.empty:
+            return 0
+        ts = df["TIMESTAMP"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+        if all(col in df.columns for col in BASE_COLS):
+            counts = df[BASE_COLS].to_numpy(dtype=np.int64)
+        else:
+            conveyor_cols = [col for col in df.columns if col.startswith("CONVEYOR_STATUS")]
+            counts = status_counts(df[conveyor_cols].to_numpy()).astype(np.int64)
+        ts, counts = _contiguous_minutes(ts, counts)
+
+        with self._lock:
+            last = self.last
+            history_ts = np.empty(0, dtype=np.int64)
+            history = np.empty((0, len(BASE_COLS)), dtype=np.int64)
+            if last is not None:
+                last_ns = last.value
+                keep = ts >= last_ns
+                if not keep.any():
+                    return 0
+                ts, counts = ts[keep], counts[keep]
+                if ts[0] > last_ns:
+                    # a gap after the stored minutes holds the last stored counts, as the resample would
+                    ts, counts = _contiguous_minutes(np.concatenate([[last_ns], ts]), np.concatenate([self._last_counts(), counts]))
+                # the windows look back over the stored minutes before the first rewritten one
+                lookback = self.read(pd.Timestamp(ts[0] - (minutes_needed() - 1) * MINUTE_NS), pd.Timestamp(ts[0] - MINUTE_NS))
+                history_ts = self._timestamps(lookback).astype(np.int64)
+                history = np.column_stack([lookback.column(col).to_numpy() for col in BASE_COLS]).reshape(-1, len(BASE_COLS))
+
+            new = self._build(np.concatenate([history_ts, ts]), np.concatenate([history, counts]))
+            new = new.slice(len(history_ts))
+            self._write(new, ts, carried)
+
+        logger.info(f"Stored {len(ts)} minutes in {self.path}")
+        return len(ts)
+
+    def _build(self, ts, counts) -> pa.Table:
+        """Table of contiguous minutes with features computed from their counts."""
+        n = len(ts)
+        columns = [pa.array(ts.astype("datetime64[ns]"), pa.timestamp("ns"))]
+        columns += [pa.array(counts[:, i], pa.int64()) for i in range(len(BASE_COLS))]
+        for w in self.windows:
+            columns.append(_fixed_size(_padded(window_features(counts, w), n), self.schema.field(feature_column(w)).type))
+        multi = multi_window_features(counts, self.windows)
+        columns.append(_fixed_size(_padded(multi, n), self.schema.field(feature_column(MULTI_HORIZON)).type))
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def _write(self, new: pa.Table, ts: np.ndarray, carried=None):
+        """Write the rows of new into their day files, keeping the stored rows before them."""
+        day_of_row = ts // DAY_NS
+        bounds = np.flatnonzero(np.diff(day_of_row)) + 1
+        for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(ts)]])):
+            day = pd.Timestamp(int(day_of_row[lo]) * DAY_NS).strftime("%Y-%m-%d")
+            part = new.slice(lo, hi - lo)
+            path = self.path / f"day={day}" / PARTITION_FILE
+            if path.exists():
+                stored = self._table(day).replace_schema_metadata(self.schema.metadata)
+                keep = int(np.searchsorted(self._timestamps(stored), np.datetime64(int(ts[lo]), "ns")))
+                part = pa.concat_tables([stored.slice(0, keep), part])
+            schema = self.schema
+            if hi == len(ts) and carried is not None:
+                # the reader state travels with the last minute it belongs to
+                schema = schema.with_metadata({**schema.metadata, b"carried": json.dumps(carried).encode()})
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f".{path.name}.tmp")
+            with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(part.combine_chunks().replace_schema_metadata(schema.metadata))
+            os.replace(tmp, path)
+            self._tables.pop(day, None)
+
+    def _last_counts(self) -> np.ndarray:
+        table = self._table(self.days()[-1])
+        return np.array([[table.column(col)[-1].as_py() for col in BASE_COLS]], dtype=np.int64)
+
+    def _table(self, day) -> pa.Table:
+        path = self.path / f"day={day}" / PARTITION_FILE
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._tables.get(day)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # the table's buffers point into the mapping, which stays open as long as they are referenced
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        windows = (table.schema.metadata or {}).get(b"windows")
+        if windows != self.schema.metadata[b"windows"]:
+            raise ValueError(f"{path} was written for roll windows {windows}, rebuild the store")
+        self._tables[day] = (version, table)
+        return table
+
+    @staticmethod
+    def _timestamps(table: pa.Table) -> np.ndarray:
+        column = table.column("TIMESTAMP")
+        if column.num_chunks == 1:
+            return column.chunk(0).to_numpy()
+        return column.to_numpy()
+
+
+def append_upload(store: FeatureStore, data: bytes):
+    """
+    Read an uploaded export (wide CSV or event log) and append its minutes.
+    Returns (preview, minutes written, frame): frame is what was read, the
+    resampled status columns or, for an event log, the per-minute counts, so
+    the caller can predict from it without reading the upload again.
+    Ingestion errors are raised as ingestion.IngestionError.
+    """
+    from ingestion import carried_state, event_counts, is_event_log, read_conveyor_csv, read_event_log, read_header, with_carried
+
+    if is_event_log(read_header(io.BytesIO(data))):
+        events = read_event_log(io.BytesIO(data))
+        continued = with_carried(events, store.carried)
+        df_counts = event_counts(continued)
+        return events.head(), store.append(df_counts, carried_state(continued)), df_counts
+    ingested = read_conveyor_csv(io.BytesIO(data), carried=store.carried)
+    return ingested.preview, store.append(ingested.resampled, ingested.carried), ingested.resampled
+
+
+def _contiguous_minutes(ts, counts):
+    """Fill missing minutes with the previous minute's counts (the resample's forward fill)."""
+    if np.any(ts % MINUTE_NS) or np.any(np.diff(ts) <= 0):
+        raise ValueError("TIMESTAMP must hold whole minutes, unique and in time order")
+    steps = (ts - ts[0]) // MINUTE_NS
+    if steps[-1] == len(ts) - 1:
+        return ts, counts
+    rows = np.zeros(steps[-1] + 1, dtype=np.int64)
+    rows[steps] = 1
+    # row of the latest present minute at or before every minute
+    source = np.cumsum(rows) - 1
+    return ts[0] + np.arange(steps[-1] + 1, dtype=np.int64) * MINUTE_NS, counts[source]
+
+
+def _padded(X, n_rows) -> np.ndarray:
+    """Features starting at some warm-up row, with NaN rows in front so row i is minute i."""
+    out = np.full((n_rows, X.shape[1]), np.nan, dtype=np.float32)
+    out[n_rows - len(X):] = X
+    return out
+
+
+def _fixed_size(X, list_type) -> pa.FixedSizeListArray:
+    return pa.FixedSizeListArray.from_arrays(pa.array(X.ravel(), pa.float32()), list_type.list_size)
@@ -0,0 +1,7 @@
+from .registry import ModelRegistry, get_registry
+from .model import Model
+from .streaming import StreamingPredictor
+from .batching import MicroBatcher
+from .batch import predict_lines
+from .cache import PredictionCache, predict_upload
+from .compiled import CompiledEnsemble
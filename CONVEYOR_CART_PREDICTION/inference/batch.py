@@ -0,0 +1,112 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .constants import HORIZON_WINDOWS
+from .model import Model
+from .registry import get_registry
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+LINE_ID = "LINE_ID"
+
+
+def predict_lines(source, mode="latest", max_workers=None, registry=None, model=None) -> dict:
+    """
+    Predict many conveyor lines at once.
+
+    source is a directory of CSV exports (one per line, named after the line),
+    a DataFrame with a LINE_ID column, or a {line_id: DataFrame} dict.
+    Reading, resampling and feature engineering are fanned out over a process
+    pool; the features of all lines are then concatenated and each horizon is
+    scored with a single Model.infer call in this process. Pass model to score
+    with its backend, batcher or multi-horizon model, so every line gets the
+    predictions model.predict would give it (default: Model(registry=registry)).
+
+    Returns {"status", "predictions": tidy DataFrame (LINE_ID, HORIZON,
+    TIMESTAMP, PREDICTION), "errors": {line_id: message}}.
+    """
+    if model is None:
+        model = Model(registry=registry if registry is not None else get_registry())
+    tasks = _make_tasks(source)
+    if not tasks:
+        return {
+            "status":"error",
+            "message": "No conveyor lines found"
+        }
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers == 1:
+        prepared = [_prepare_task(task, mode, model.multi_horizon) for task in tasks]
+    else:
+        # spawn keeps the workers clear of the parent's OpenMP/XGBoost threads
+        ctx = multiprocessing.get_context("spawn")
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            prepared = list(pool.map(
+                _prepare_task, tasks, [mode] * len(tasks), [model.multi_horizon] * len(tasks), chunksize=chunksize
+            ))
+
+    errors = {line_id: out["message"] for line_id, out in prepared if out["status"] == "error"}
+    ok = [(line_id, out) for line_id, out in prepared if out["status"] == "success"]
+    logger.info(f"Prepared {len(ok)} of {len(tasks)} lines with {max_workers} worker(s)")
+
+    tables = []
+    if ok:
+        # all lines as one input, keyed like a single line's features (per horizon or MULTI_HORIZON)
+        scored = model.infer({
+            "status": "success",
+            "features": {key: np.vstack([out["features"][key] for _, out in ok]) for key in ok[0][1]["features"]},
+            "timestamps": {mins: None for mins in HORIZON_WINDOWS},
+            "resampled": None
+        })
+        if scored["status"] == "error":
+            return scored
+        for mins in HORIZON_WINDOWS:
+            lengths = [len(out["timestamps"][mins]) for _, out in ok]
+            tables.append(pd.DataFrame({
+                LINE_ID: np.repeat([line_id for line_id, _ in ok], lengths),
+                "HORIZON": mins,
+                "TIMESTAMP": np.concatenate([out["timestamps"][mins].to_numpy() for _, out in ok]),
+                "PREDICTION": np.rint(scored["plots"][mins][1]).astype(int)
+            }))
+
+    predictions = (
+        pd.concat(tables, ignore_index=True).sort_values([LINE_ID, "HORIZON", "TIMESTAMP"], kind="stable").reset_index(drop=True)
+        if tables else pd.DataFrame(columns=[LINE_ID, "HORIZON", "TIMESTAMP", "PREDICTION"])
+    )
+    return {
+        "status": "success",
+        "predictions": predictions,
+        "errors": errors
+    }
+
+
+def _make_tasks(source) -> list:
+    if isinstance(source, (str, Path)):
+        return [(path.stem, path) for path in sorted(Path(source).glob("*.csv"))]
+    if isinstance(source, pd.DataFrame):
+        return [(str(line_id), df.drop(columns=LINE_ID)) for line_id, df in source.groupby(LINE_ID, sort=False)]
+    return [(str(line_id), df) for line_id, df in dict(source).items()]
+
+
+def _prepare_task(task, mode, multi_horizon=False):
+    """Worker: read/resample/featurize one line; the resampled frame is not sent back."""
+    line_id, data = task
+    model = Model(multi_horizon=multi_horizon)
+    model.logger.setLevel(logging.WARNING)
+    if isinstance(data, Path):
+        from ingestion import IngestionError, read_conveyor_csv
+        try:
+            out = model.prepare_resampled(read_conveyor_csv(data).resampled, mode)
+        except IngestionError as e:
+            out = {"status": "error", "message": str(e)}
+    else:
+        out = model.prepare(data, mode)
+    out.pop("resampled", None)
+    return line_id, out
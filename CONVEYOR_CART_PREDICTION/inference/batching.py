@@ -0,0 +1,112 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .registry import BACKENDS, get_registry
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+
+class MicroBatcher:
+    """
+    Coalesces feature rows submitted by concurrent callers into one predict
+    call per horizon, on the booster or, with backend="numpy" (or "auto" for
+    batches of up to registry.COMPILED_MAX_ROWS rows), its compiled trees, as
+    Model does unbatched.
+
+    One worker thread per horizon waits for the first request, keeps collecting
+    for ``window_ms`` (or until ``max_rows`` rows are queued), predicts the
+    stacked matrix once and hands each caller its slice back through a Future.
+    With window_ms=0 only requests that are already queued get merged.
+
+    Workers for ``horizons`` start with start(); any other model key the
+    registry knows (MULTI_HORIZON for a multi-horizon Model) gets its worker on
+    its first submit.
+    """
+
+    def __init__(self, horizons, registry=None, window_ms=5.0, max_rows=65536, backend="xgboost"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        self.registry = registry if registry is not None else get_registry()
+        self.backend = backend
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self._queues = {h: queue.Queue() for h in horizons}
+        self._threads = {}
+        self._lock = threading.Lock()
+        self.stats = {h: {"batches": 0, "requests": 0, "rows": 0} for h in horizons}
+
+    def start(self):
+        with self._lock:
+            for h in list(self._queues):
+                self._start_worker(h)
+        return self
+
+    def submit(self, horizon, X) -> Future:
+        if horizon not in self._threads:
+            with self._lock:
+                if not self._threads:
+                    for h in list(self._queues):
+                        self._start_worker(h)
+                self._start_worker(horizon)
+        future = Future()
+        self._queues[horizon].put((np.asarray(X), future))
+        return future
+
+    def stats_snapshot(self) -> dict:
+        """Copy of the per-horizon stats; the live dict is updated by the worker threads."""
+        with self._lock:
+            return {h: dict(stats) for h, stats in self.stats.items()}
+
+    def predict_many(self, features: dict) -> dict:
+        """Submit every horizon first so they are batched in parallel, then wait."""
+        futures = {h: self.submit(h, X) for h, X in features.items()}
+        return {h: f.result() for h, f in futures.items()}
+
+    def _start_worker(self, horizon):
+        """Create the queue and worker of a horizon if missing; called with self._lock held."""
+        if horizon in self._threads:
+            return
+        q = self._queues.setdefault(horizon, queue.Queue())
+        self.stats.setdefault(horizon, {"batches": 0, "requests": 0, "rows": 0})
+        t = threading.Thread(target=self._run, args=(horizon, q), name=f"batcher-{horizon}", daemon=True)
+        t.start()
+        self._threads[horizon] = t
+
+    def _run(self, horizon, q):
+        while True:
+            batch = [q.get()]
+            rows = len(batch[0][0])
+            deadline = time.monotonic() + self.window
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=timeout) if timeout > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            try:
+                X = np.vstack([x for x, _ in batch]) if len(batch) > 1 else batch[0][0]
+                preds = self.registry.predictor(horizon, self.backend, len(X)).predict(X)
+            except Exception as e:
+                logger.error(f"Batched prediction failed for {horizon} min. Error details: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for x, future in batch:
+                future.set_result(preds[offset:offset + len(x)])
+                offset += len(x)
+
+            with self._lock:
+                stats = self.stats[horizon]
+                stats["batches"] += 1
+                stats["requests"] += len(batch)
+                stats["rows"] += rows
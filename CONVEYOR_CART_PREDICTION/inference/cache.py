@@ -0,0 +1,436 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .features import minutes_needed
+from .instrumentation import StageMetrics
+from .model import Model
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+# predict_upload outcome -> PredictionCache.stats counter
+_OUTCOME_STATS = {"hit": "hits", "prefix": "prefix_hits", "miss": "misses"}
+
+
+@dataclass
+class CacheEntry:
+    digest: str
+    length: int
+    versions: str
+    mode: str
+    # Model.infer result without its stages
+    output: dict
+    preview: pd.DataFrame
+    # ingestion.ReaderState after the last row; None for event logs and unordered exports
+    reader_state: object = None
+
+    @property
+    def key(self) -> str:
+        return cache_key(self.digest, self.length, self.versions, self.mode)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the entry (frames, prediction arrays and bucketed minutes)."""
+        size = int(self.output["resampled"].memory_usage(index=True).sum())
+        for ts, preds in self.output["plots"].values():
+            size += int(ts.memory_usage(index=True)) + preds.nbytes
+        if self.reader_state is not None:
+            bucketer = self.reader_state.bucketer
+            size += sum(a.nbytes for a in bucketer._minutes) + sum(a.nbytes for a in bucketer._snapshots)
+        return size
+
+
+def cache_key(digest: str, length: int, versions: str, mode: str) -> str:
+    return f"{digest}_{length}_{versions}_{mode}"
+
+
+def versions_digest(model) -> str:
+    """Short digest of the content hashes of the model files a Model predicts with."""
+    versions = model.versions()
+    joined = ",".join(f"{h}:{versions[h]}" for h in sorted(versions, key=str))
+    return hashlib.sha256(joined.encode()).hexdigest()[:16]
+
+
+def content_digests(data, prefix_lengths=()):
+    """
+    sha256 of data and of each of its prefixes in prefix_lengths, in one pass:
+    the hash state is copied at every prefix end instead of hashing it again.
+    Returns (digest, {length: digest}).
+    """
+    view = memoryview(data)
+    hasher = hashlib.sha256()
+    prefixes = {}
+    pos = 0
+    for length in sorted(set(prefix_lengths)):
+        if length >= len(view):
+            break
+        hasher.update(view[pos:length])
+        pos = length
+        prefixes[length] = hasher.copy().hexdigest()
+    hasher.update(view[pos:])
+    return hasher.hexdigest(), prefixes
+
+
+class PredictionCache:
+    """
+    Prediction results keyed by the content of the upload and the model versions.
+
+    Entries are kept in memory up to max_entries / max_bytes and evicted least
+    recently used first. With spill_dir set, evicted entries are written there
+    as .npz files (up to max_disk_bytes, oldest removed first) and loaded back
+    on the next hit; the directory is rescanned on start. The files hold plain
+    arrays and a JSON header and are loaded with allow_pickle=False, so they
+    never execute code. Thread safe, one instance is shared by all sessions.
+    """
+
+    def __init__(self, max_entries=16, max_bytes=512 << 20, spill_dir=None, max_disk_bytes=2 << 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # key -> file size, oldest first
+        self._disk = OrderedDict()
+        self.stats = {"hits": 0, "prefix_hits": 0, "misses": 0, "spilled": 0}
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            for path in sorted(self.spill_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime_ns):
+                self._disk[path.stem] = path.stat().st_size
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if key not in self._disk:
+                return None
+            path = self._spill_path(key)
+            try:
+                entry = _load_entry(path)
+            except (OSError, ValueError, KeyError, TypeError, zipfile.BadZipFile) as e:
+                logger.error(f"Dropping unreadable cache file {path.name}. Error details: {e}")
+                entry = None
+            self._remove_spilled(key)
+            if entry is not None:
+                self._insert(entry)
+            return entry
+
+    def record(self, outcome: str):
+        """Count a predict_upload outcome ("hit", "prefix" or "miss")."""
+        with self._lock:
+            self.stats[_OUTCOME_STATS[outcome]] += 1
+
+    def put(self, entry: CacheEntry):
+        with self._lock:
+            self._remove_spilled(entry.key)
+            self._insert(entry)
+
+    def prefix_candidates(self, length: int) -> list:
+        """(key, length) of entries whose upload is shorter than length and could be its prefix."""
+        with self._lock:
+            keys = list(self._memory) + list(self._disk)
+        candidates = []
+        for key in keys:
+            entry_length = int(key.split("_")[1])
+            if entry_length < length:
+                candidates.append((key, entry_length))
+        return candidates
+
+    def _insert(self, entry):
+        old = self._memory.pop(entry.key, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes()
+        self._memory[entry.key] = entry
+        self._memory_bytes += entry.nbytes()
+        while len(self._memory) > 1 and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes()
+            if self.spill_dir is not None:
+                self._spill(key, evicted)
+
+    def _spill(self, key, entry):
+        path = self._spill_path(key)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **_entry_arrays(entry))
+        os.replace(tmp, path)
+        self._disk[key] = path.stat().st_size
+        self.stats["spilled"] += 1
+        while len(self._disk) > 1 and sum(self._disk.values()) > self.max_disk_bytes:
+            self._remove_spilled(next(iter(self._disk)))
+
+    def _remove_spilled(self, key):
+        if self._disk.pop(key, None) is not None:
+            self._spill_path(key).unlink(missing_ok=True)
+
+    def _spill_path(self, key) -> Path:
+        return self.spill_dir / f"{key}.npz"
+
+
+def _entry_arrays(entry: CacheEntry) -> dict:
+    """A CacheEntry as named arrays for np.savez: the frames column by column, the rest in a JSON header."""
+    arrays = {}
+    output = entry.output
+    header = {
+        "digest": entry.digest,
+        "length": entry.length,
+        "versions": entry.versions,
+        "mode": entry.mode,
+        "status": output["status"],
+        "predictions": output["predictions"],
+        "plots": [],
+        "resampled": _frame_arrays(arrays, "resampled", output["resampled"]),
+        "preview": _frame_arrays(arrays, "preview", entry.preview),
+        "reader_state": None
+    }
+    for i, (mins, (ts, preds)) in enumerate(output["plots"].items()):
+        header["plots"].append([mins, ts.name])
+        arrays[f"plots.{i}.ts"] = ts.to_numpy()
+        arrays[f"plots.{i}.preds"] = preds
+
+    state = entry.reader_state
+    if state is not None:
+        bucketer = state.bucketer
+        header["reader_state"] = {
+            "columns": state.columns,
+            "conveyor_cols": state.conveyor_cols,
+            "rows_read": state.rows_read,
+            "chunks": state.chunks,
+            "preview": _frame_arrays(arrays, "state.preview", state.preview),
+            "n_cols": bucketer.n_cols,
+            "open_minute": None if bucketer.open_minute is None else int(bucketer.open_minute),
+            "last_ns": None if bucketer.last_ns is None else int(bucketer.last_ns)
+        }
+        arrays["state.state"] = bucketer.state
+        if bucketer.open_snapshot is not None:
+            arrays["state.open_snapshot"] = bucketer.open_snapshot
+        arrays["state.minutes"] = np.concatenate(bucketer._minutes) if bucketer._minutes else np.empty(0, dtype=np.int64)
+        arrays["state.snapshots"] = (
+            np.concatenate(bucketer._snapshots) if bucketer._snapshots else np.empty((0, bucketer.n_cols), dtype=np.int8)
+        )
+
+    arrays["header"] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    return arrays
+
+
+def _frame_arrays(arrays: dict, prefix: str, df: pd.DataFrame) -> dict:
+    """
+    Store df's columns in arrays. Object columns are stored as strings plus a
+    null mask, categoricals (the conveyor ids of an event log) as codes plus
+    their categories.
+    """
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        kind = "values"
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            kind = "category"
+            arrays[f"{prefix}.{i}.categories"] = _object_as_str(arrays, f"{prefix}.{i}.categories", series.cat.categories.to_numpy())
+            values = series.cat.codes.to_numpy()
+        else:
+            values = _object_as_str(arrays, f"{prefix}.{i}", series.to_numpy())
+        arrays[f"{prefix}.{i}"] = values
+        columns.append([col, kind])
+    return {"columns": columns}
+
+
+def _object_as_str(arrays: dict, name: str, values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind != "O":
+        return values
+    arrays[f"{name}.na"] = pd.isna(values)
+    return values.astype(str)
+
+
+def _load_entry(path: Path) -> CacheEntry:
+    from ingestion.csv_reader import MinuteBucketer, ReaderState
+
+    with np.load(path, allow_pickle=False) as npz:
+        header = json.loads(npz["header"].tobytes())
+        output = {
+            "status": header["status"],
+            "predictions": header["predictions"],
+            "plots": {
+                mins: (pd.Series(npz[f"plots.{i}.ts"], name=name), npz[f"plots.{i}.preds"])
+                for i, (mins, name) in enumerate(header["plots"])
+            },
+            "resampled": _load_frame(npz, "resampled", header["resampled"])
+        }
+        reader_state = None
+        state = header["reader_state"]
+        if state is not None:
+            bucketer = MinuteBucketer(state["n_cols"])
+            bucketer.state = npz["state.state"]
+            if state["open_minute"] is not None:
+                bucketer.open_minute = np.int64(state["open_minute"])
+                bucketer.open_snapshot = npz["state.open_snapshot"]
+            bucketer.last_ns = state["last_ns"]
+            if len(npz["state.minutes"]):
+                bucketer._minutes = [npz["state.minutes"]]
+                bucketer._snapshots = [npz["state.snapshots"]]
+            reader_state = ReaderState(
+                state["columns"], state["conveyor_cols"], bucketer, state["rows_read"], state["chunks"],
+                _load_frame(npz, "state.preview", state["preview"])
+            )
+        preview = _load_frame(npz, "preview", header["preview"])
+    return CacheEntry(header["digest"], header["length"], header["versions"], header["mode"], output, preview, reader_state)
+
+
+def _load_frame(npz, prefix: str, frame: dict) -> pd.DataFrame:
+    data = {}
+    for i, (col, kind) in enumerate(frame["columns"]):
+        if kind == "category":
+            categories = _str_as_object(npz, f"{prefix}.{i}.categories")
+            data[col] = pd.Categorical.from_codes(npz[f"{prefix}.{i}"], categories=categories)
+        else:
+            data[col] = _str_as_object(npz, f"{prefix}.{i}")
+    return pd.DataFrame(data)
+
+
+def _str_as_object(npz, name: str) -> np.ndarray:
+    values = npz[name]
+    if f"{name}.na" not in npz:
+        return values
+    values = values.astype(object)
+    values[npz[f"{name}.na"]] = None
+    return values
+
+
+def predict_upload(data: bytes, cache: PredictionCache, model: Model = None, mode="full") -> dict:
+    """
+    Model.predict_resampled / predict_counts on an uploaded export, through the cache.
+
+    The same bytes with the same model versions return the stored result. When
+    the upload extends a cached export (its first bytes hash to a cached entry
+    and end on a row boundary), only the appended rows are read, continuing the
+    cached reader state, and for mode="full" only the minutes from the last
+    cached one on are featurized and scored; the earlier predictions are
+    reused. Both give the same result as a fresh run. Event logs are cached by
+    exact content only.
+
+    Returns the Model result plus "preview" (first rows of the upload) and,
+    on success, "cache" ("hit", "prefix" or "miss"); ingestion errors are
+    raised as ingestion.IngestionError.
+    """
+    from ingestion import event_counts, is_event_log, read_conveyor_csv, read_event_log, read_header, resume_conveyor_csv
+
+    model = model if model is not None else Model()
+    metrics = StageMetrics()
+    with metrics.stage("cache_lookup", len(data)):
+        versions = versions_digest(model)
+        candidates = cache.prefix_candidates(len(data))
+        digest, prefix_digests = content_digests(data, [length for _, length in candidates])
+        entry = cache.get(cache_key(digest, len(data), versions, mode))
+
+    if entry is not None:
+        cache.record("hit")
+        return _result(entry.output, entry.preview, "hit", metrics)
+
+    if is_event_log(read_header(io.BytesIO(data))):
+        with metrics.stage("read_event_log") as stage:
+            events = read_event_log(io.BytesIO(data))
+            stage["rows_out"] = len(events)
+        with metrics.stage("event_counts", len(events)) as stage:
+            df_counts = event_counts(events)
+            stage["rows_out"] = len(df_counts)
+        output = model.predict_counts(df_counts, mode=mode)
+        return _store(cache, output, CacheEntry(digest, len(data), versions, mode, None, events.head()), metrics, "miss")
+
+    base = _find_prefix(cache, data, candidates, prefix_digests, versions, mode)
+    ingested = None
+    if base is not None:
+        with metrics.stage("read_csv_tail") as stage:
+            ingested = resume_conveyor_csv(base.reader_state, io.BytesIO(memoryview(data)[base.length:]))
+            if ingested is not None:
+                stage["rows_in"], stage["rows_out"] = ingested.rows_read - base.reader_state.rows_read, len(ingested.resampled)
+    if ingested is None:
+        base = None
+        with metrics.stage("read_csv") as stage:
+            ingested = read_conveyor_csv(io.BytesIO(data))
+            stage["rows_in"], stage["rows_out"] = ingested.rows_read, len(ingested.resampled)
+
+    if base is not None and base.mode == "full" and mode == "full" and base.versions == versions:
+        output = _extend(model, base.output, ingested.resampled)
+    else:
+        output = model.predict_resampled(ingested.resampled, mode=mode)
+
+    entry = CacheEntry(digest, len(data), versions, mode, None, ingested.preview, ingested.state)
+    return _store(cache, output, entry, metrics, "miss" if base is None else "prefix")
+
+
+def _find_prefix(cache, data, candidates, prefix_digests, versions, mode):
+    """Longest cached CSV the upload starts with, preferring one whose predictions can be extended."""
+    matches = []
+    for key, length in candidates:
+        digest, _, entry_versions, entry_mode = key.split("_")
+        if prefix_digests.get(length) != digest:
+            continue
+        # the cached export's last row must be complete in the new one too
+        if data[length - 1:length] != b"\n" and data[length:length + 1] not in (b"\n", b"\r"):
+            continue
+        reusable = entry_mode == "full" == mode and entry_versions == versions
+        matches.append((length, reusable, key))
+
+    for _, _, key in sorted(matches, reverse=True):
+        entry = cache.get(key)
+        if entry is not None and entry.reader_state is not None:
+            return entry
+    return None
+
+
+def _extend(model, cached, df_resampled):
+    """
+    Full-mode predictions for df_resampled, which starts with the minutes of a
+    cached result. Minutes before the cached last one are final (later rows
+    can only change the open minute), and features only look back
+    minutes_needed() - 1 rows, so only the tail from there is featurized and
+    scored; the cached predictions before it are kept.
+    """
+    old = cached["resampled"]
+    last_cached = len(old) - 1
+    lo = max(last_cached - (minutes_needed() - 1), 0)
+    duration_minutes = (df_resampled["TIMESTAMP"].iloc[-1] - df_resampled["TIMESTAMP"].iloc[0]).total_seconds() / 60
+
+    tail = df_resampled.iloc[lo:].reset_index(drop=True)
+    output = model.infer(model.featurize_tail(tail, duration_minutes))
+    if output["status"] == "error":
+        return output
+
+    plots = {}
+    for mins, (ts, preds) in output["plots"].items():
+        old_ts, old_preds = cached["plots"][mins]
+        keep = int(np.searchsorted(old_ts.to_numpy(), ts.iloc[0].to_datetime64()))
+        plots[mins] = (
+            pd.concat([old_ts.iloc[:keep], ts], ignore_index=True),
+            np.concatenate([old_preds[:keep], preds])
+        )
+    output["plots"] = plots
+    output["resampled"] = pd.concat([old.iloc[:lo], output["resampled"]], ignore_index=True)
+    model.logger.info(f"Reused {lo} cached minutes, scored {len(tail)} new ones")
+    return output
+
+
+def _store(cache, output, entry, metrics, outcome):
+    if output["status"] == "error":
+        return {**output, "preview": entry.preview}
+    cache.record(outcome)
+    stages = output.pop("stages")
+    entry.output = output
+    cache.put(entry)
+    return _result(output, entry.preview, outcome, metrics, stages)
+
+
+def _result(output, preview, outcome, metrics, stages=()):
+    return {**output, "preview": preview, "cache": outcome, "stages": metrics.stages + list(stages)}
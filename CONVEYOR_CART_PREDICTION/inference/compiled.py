@@ -0,0 +1,211 @@
+import json
+
+import numpy as np
+
+# complete trees of this depth hold 2**depth leaves each; deeper models stay on XGBoost
+MAX_DEPTH = 12
+
+
+class CompiledEnsemble:
+    """
+    XGBoost tree ensemble compiled to flat NumPy arrays, for predicting without
+    the per-call DMatrix and thread start-up cost of XGBRegressor.predict.
+
+    Every tree is padded to a complete binary tree of the ensemble's depth
+    (a leaf above the bottom becomes a split whose two subtrees repeat it), so
+    node i's children are 2i+1 and 2i+2 and only the split feature,
+    threshold, default direction and bottom leaf values are stored. Predicting
+    evaluates the split condition of every node of every tree for a block of
+    rows with one gather and compare, then walks all trees in lock step for
+    depth steps of index arithmetic. Single rows skip the array set-up: the
+    trees are also generated as one pure Python function of a row (nested
+    conditional expressions returning each tree's leaf), compiled on first use.
+
+    Handles the numerical splits of reg:squarederror models, with scalar or
+    multi-output (multi_output_tree) leaves. Leaves are added to the base score
+    one tree at a time in float32, the order XGBoost uses, so the predictions
+    are identical to XGBRegressor.predict.
+    """
+
+    # rows per block are chosen so the (rows, nodes) condition matrix stays around this size
+    BLOCK_CELLS = 1 << 21
+    # up to this many rows go through the generated Python function instead
+    ROW_FUNCTION_MAX_ROWS = 1
+
+    def __init__(self, feature, threshold, default_left, leaf_value, base_score, depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.base_score = base_score
+        self.depth = depth
+        self.n_trees = leaf_value.shape[0]
+        self._n_internal = 2 ** depth - 1
+        self._tree_offsets = np.arange(self.n_trees, dtype=np.int64) * self._n_internal
+        self._leaf_offsets = np.arange(self.n_trees, dtype=np.int64) * 2 ** depth
+        self._row_function = None
+
+    @property
+    def n_targets(self) -> int:
+        return self.leaf_value.shape[2]
+
+    @classmethod
+    def from_booster(cls, model) -> "CompiledEnsemble":
+        """Compile a fitted XGBRegressor (or Booster)."""
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        return cls.from_json(booster.save_raw("json"))
+
+    @classmethod
+    def from_json(cls, raw) -> "CompiledEnsemble":
+        """Compile a model saved with save_model(*.json): a path, the file's bytes/str or the parsed dict."""
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            raw = json.loads(bytes(raw))
+        elif isinstance(raw, str) and raw.lstrip().startswith("{"):
+            raw = json.loads(raw)
+        elif not isinstance(raw, dict):
+            with open(raw) as f:
+                raw = json.load(f)
+
+        learner = raw["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "reg:squarederror":
+            raise ValueError(f"Unsupported objective: {objective}")
+        params = learner["learner_model_param"]
+        n_targets = max(int(params.get("num_target", "1")), 1)
+        base_score = np.array(json.loads(params["base_score"]), dtype=np.float32).reshape(-1)
+        if len(base_score) == 1:
+            base_score = np.repeat(base_score, n_targets)
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        if any(any(tree["split_type"]) for tree in trees):
+            raise ValueError("Categorical splits are not supported")
+        depth = max(max((_depth(tree) for tree in trees), default=0), 1)
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Trees deeper than {MAX_DEPTH} levels are not supported")
+
+        n_internal = 2 ** depth - 1
+        feature = np.zeros((len(trees), n_internal), dtype=np.int64)
+        # padding splits send everything left, both sides repeat the leaf anyway
+        threshold = np.full((len(trees), n_internal), np.inf, dtype=np.float32)
+        default_left = np.ones((len(trees), n_internal), dtype=bool)
+        leaf_value = np.zeros((len(trees), 2 ** depth, n_targets), dtype=np.float32)
+
+        for t, tree in enumerate(trees):
+            left, right = tree["left_children"], tree["right_children"]
+            leaf_size = int(tree["tree_param"].get("size_leaf_vector", "1") or 1)
+            if leaf_size > 1:
+                # multi-output trees keep a weight vector per node
+                values = np.asarray(tree["base_weights"], dtype=np.float32).reshape(-1, leaf_size)
+            else:
+                # scalar trees store the (learning rate scaled) leaf value in split_conditions
+                values = np.asarray(tree["split_conditions"], dtype=np.float32).reshape(-1, 1)
+
+            stack = [(0, 0, 0)]
+            while stack:
+                node, pos, level = stack.pop()
+                if left[node] == -1:
+                    # a leaf covers the bottom slots of every path through pos
+                    first = (pos + 1) * 2 ** (depth - level) - 1 - n_internal
+                    leaf_value[t, first:first + 2 ** (depth - level)] = values[node]
+                    continue
+                feature[t, pos] = tree["split_indices"][node]
+                threshold[t, pos] = tree["split_conditions"][node]
+                default_left[t, pos] = bool(tree["default_left"][node])
+                stack.append((left[node], 2 * pos + 1, level + 1))
+                stack.append((right[node], 2 * pos + 2, level + 1))
+
+        return cls(feature.ravel(), threshold.ravel(), default_left.ravel(), leaf_value, base_score, depth)
+
+    def predict(self, X) -> np.ndarray:
+        """Same shape as XGBRegressor.predict: (n,) for one target, (n, n_targets) otherwise."""
+        # XGBoost compares float32 features with float32 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float32)
+        if len(X) <= self.ROW_FUNCTION_MAX_ROWS and self.depth <= 8:
+            leaves = self.row_function()
+            # float32 values are exact as Python floats, so the comparisons are unchanged
+            slots = np.frombuffer(b"".join(leaves(row) for row in X.tolist()), dtype=np.uint8)
+            out = self._sum_leaves(self._leaf_offsets[:, None] + slots.reshape(len(X), self.n_trees).T)
+        else:
+            out = np.empty((len(X), self.n_targets), dtype=np.float32)
+            block = max(self.BLOCK_CELLS // len(self.feature), 1)
+            for start in range(0, len(X), block):
+                out[start:start + block] = self._predict_block(X[start:start + block])
+        return out[:, 0] if self.n_targets == 1 else out
+
+    def _predict_block(self, X):
+        n = len(X)
+        # node-major: one contiguous copy of a feature column per node
+        x = X.T[self.feature]
+        go_left = x < self.threshold[:, None]
+        if np.isnan(X).any():
+            go_left |= np.isnan(x) & self.default_left[:, None]
+        go_left = go_left.ravel().view(np.uint8)
+
+        # position of every (tree, row) pair in its complete tree, children of i are 2i+1 and 2i+2
+        index_type = np.int32 if go_left.size < np.iinfo(np.int32).max else np.int64
+        base = (self._tree_offsets.astype(index_type) * n)[:, None] + np.arange(n, dtype=index_type)
+        pos = np.zeros((self.n_trees, n), dtype=index_type)
+        for _ in range(self.depth):
+            bit = go_left[base + pos * n]
+            pos *= 2
+            pos += 2
+            pos -= bit
+        return self._sum_leaves(self._leaf_offsets[:, None] + (pos - self._n_internal))
+
+    def _sum_leaves(self, leaf_index):
+        """(n_trees, n_rows) flat leaf indices -> (n_rows, n_targets) predictions."""
+        n_rows = leaf_index.shape[1]
+        values = self.leaf_value.reshape(-1, self.n_targets)[leaf_index]
+        values[0] += self.base_score
+        values = values.reshape(self.n_trees, -1)
+        # the trees are added one after another per row, as XGBoost does; reducing the
+        # leading axis does that, except for a single column, which numpy sums pairwise
+        if values.shape[1] == 1:
+            total = np.cumsum(values, axis=0, dtype=np.float32)[-1]
+        else:
+            total = values.sum(axis=0, dtype=np.float32)
+        return total.reshape(n_rows, self.n_targets)
+
+    def row_function(self):
+        """
+        Generated Python function of one row (list of floats) returning the
+        bottom slot every tree ends in, one byte per tree (depth <= 8).
+        """
+        if self._row_function is None:
+            trees = [self._node_source(t, 0) for t in range(self.n_trees)]
+            source = "def leaves(x):\n    return bytes((\n        " + ",\n        ".join(trees) + "\n    ))\n"
+            namespace = {}
+            exec(compile(source, "<compiled ensemble>", "exec"), namespace)
+            self._row_function = namespace["leaves"]
+        return self._row_function
+
+    def _node_source(self, t, pos) -> str:
+        if pos >= self._n_internal:
+            return str(pos - self._n_internal)
+        i = self._tree_offsets[t] + pos
+        left = self._node_source(t, 2 * pos + 1)
+        if np.isinf(self.threshold[i]):
+            # padding split, both subtrees repeat the same leaf
+            return left
+        right = self._node_source(t, 2 * pos + 2)
+        feature, threshold = self.feature[i], float(self.threshold[i])
+        # NaN fails both comparisons, so it takes the else branch: the default direction
+        if self.default_left[i]:
+            return f"({right} if x[{feature}] >= {threshold!r} else {left})"
+        return f"({left} if x[{feature}] < {threshold!r} else {right})"
+
+
+def _depth(tree) -> int:
+    """Number of splits on the longest root to leaf path."""
+    left, right = tree["left_children"], tree["right_children"]
+    depth = 0
+    level = [0]
+    while True:
+        level = [c for node in level for c in (left[node], right[node]) if c != -1]
+        if not level:
+            return depth
+        depth += 1
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_DIR = BASE_DIR / "model_files"
+
+INPUT_PARAMS = [
+    'CONVEYOR_STATUS_16', 'CONVEYOR_STATUS_03', 'CONVEYOR_STATUS_04',
+    'CONVEYOR_STATUS_01', 'CONVEYOR_STATUS_06', 'CONVEYOR_STATUS_08',
+    'CONVEYOR_STATUS_05', 'CONVEYOR_STATUS_12', 'CONVEYOR_STATUS_09',
+    'CONVEYOR_STATUS_07', 'CONVEYOR_STATUS_02', 'CONVEYOR_STATUS_13',
+    'CONVEYOR_STATUS_17', 'CONVEYOR_STATUS_22', 'CONVEYOR_STATUS_14',
+    'CONVEYOR_STATUS_11', 'CONVEYOR_STATUS_20', 'CONVEYOR_STATUS_19',
+    'CONVEYOR_STATUS_21', 'CONVEYOR_STATUS_25', 'CONVEYOR_STATUS_23',
+    'CONVEYOR_STATUS_24', 'CONVEYOR_STATUS_27', 'CONVEYOR_STATUS_26',
+    'CONVEYOR_STATUS_29'
+]
+
+# prediction horizon (minutes) -> rolling window used for its features
+HORIZON_WINDOWS = {
+    15: 3,
+    30: 5,
+    45: 10,
+    60: 15
+}
+
+BASE_COLS = ["num_carts_full", "num_carts_empty", "num_carts_maintenance"]
+
+FEATURE_COLS = [
+    'num_carts_full',
+    'num_carts_empty',
+    'num_carts_maintenance',
+
+    'num_carts_full_lag1',
+    'num_carts_empty_lag1',
+    'num_carts_maintenance_lag1',
+
+    'num_carts_full_roll_mean',
+    'num_carts_empty_roll_mean',
+    'num_carts_maintenance_roll_mean',
+
+    'num_carts_full_roll_std',
+    'num_carts_empty_roll_std',
+    'num_carts_maintenance_roll_std',
+
+    'num_carts_full_diff1',
+    'num_carts_empty_diff1',
+    'num_carts_maintenance_diff1'
+]
+
+# registry key of the single model predicting every horizon at once
+MULTI_HORIZON = "multi"
+
+# shared feature matrix of the multi-horizon model: window independent features once, then mean/std per window
+MULTI_FEATURE_COLS = (
+    FEATURE_COLS[0:6] + FEATURE_COLS[12:15] + [
+        f"{col}_w{w}"
+        for w in sorted(set(HORIZON_WINDOWS.values()))
+        for col in FEATURE_COLS[6:12]
+    ]
+)
+
+
+def model_filename(horizon) -> str:
+    if horizon == MULTI_HORIZON:
+        return "xgb_regressor_cart_multi.json"
+    return f"xgb_regressor_cart{horizon}min.json"
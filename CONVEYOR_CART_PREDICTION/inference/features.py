@@ -0,0 +1,131 @@
+import numpy as np
+
+from .constants import HORIZON_WINDOWS
+
+# status code -> position in the counts matrix (full, empty, maintenance)
+N_STATES = 3
+
+
+def encode_status(status) -> np.ndarray:
+    """
+    Convert the resampled conveyor status matrix into a compact int8 array.
+    Anything that is not a 0/1/2 status (the original == comparisons ignore it)
+    is encoded as N_STATES so it falls outside the counted bins.
+    """
+    status = np.asarray(status)
+    if status.dtype == np.int8:
+        return status
+    with np.errstate(invalid="ignore"):
+        codes = status.astype(np.int8)
+        # NaN, fractional and out-of-range values do not survive the round trip
+        invalid = (codes != status) | (codes < 0) | (codes >= N_STATES)
+    codes[invalid] = N_STATES
+    return codes
+
+
+def status_counts(status) -> np.ndarray:
+    """
+    Per-row number of conveyors in each state, shape (n_rows, 3) as
+    [num_carts_full, num_carts_empty, num_carts_maintenance].
+    One bincount over (row * 4 + status) replaces the three == 0/1/2 passes.
+    """
+    codes = encode_status(status)
+    n_rows = codes.shape[0]
+    width = N_STATES + 1
+    flat = (np.arange(n_rows, dtype=np.int64)[:, None] * width + codes).ravel()
+    counts = np.bincount(flat, minlength=n_rows * width).reshape(n_rows, width)
+    return counts[:, :N_STATES]
+
+
+def first_valid_row(roll_window: int) -> int:
+    """Index of the first row that survives dropna for a window (lag/diff need one prior row)."""
+    return max(roll_window - 1, 1)
+
+
+def minutes_needed(windows=None) -> int:
+    """Resampled minutes required to produce one complete feature row for every window."""
+    windows = windows if windows is not None else tuple(HORIZON_WINDOWS.values())
+    return max(first_valid_row(w) for w in windows) + 1
+
+
+def window_features(counts: np.ndarray, roll_window: int, cumsum=None, cumsum_sq=None) -> np.ndarray:
+    """
+    Feature matrix for one roll window, in FEATURE_COLS order, starting at
+    first_valid_row(roll_window).
+
+    Rolling sums come from cumulative sums of the integer counts, so mean and
+    std are exact; pandas' online rolling std drifts by ~1e-11, which is below
+    the float32 precision XGBoost evaluates features at.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if cumsum is None:
+        cumsum = _prefixed_cumsum(counts)
+    if cumsum_sq is None:
+        cumsum_sq = _prefixed_cumsum(counts * counts)
+
+    n_rows = counts.shape[0]
+    start = first_valid_row(roll_window)
+    if n_rows <= start:
+        return np.empty((0, 5 * N_STATES))
+
+    current = counts[start:]
+    previous = counts[start - 1:-1]
+    mean, std = _rolling_mean_std(cumsum, cumsum_sq, roll_window, start, n_rows)
+
+    return np.concatenate([current, previous, mean, std, current - previous], axis=1, dtype=np.float64)
+
+
+def multi_window_features(counts: np.ndarray, windows=None, cumsum=None, cumsum_sq=None) -> np.ndarray:
+    """
+    One feature matrix for all roll windows, in MULTI_FEATURE_COLS order,
+    starting at minutes_needed(windows) - 1 (the first row every window covers).
+    Current, lag and diff do not depend on the window and appear once.
+    """
+    windows = sorted(windows if windows is not None else set(HORIZON_WINDOWS.values()))
+    counts = np.asarray(counts, dtype=np.int64)
+    if cumsum is None:
+        cumsum = _prefixed_cumsum(counts)
+    if cumsum_sq is None:
+        cumsum_sq = _prefixed_cumsum(counts * counts)
+
+    n_rows = counts.shape[0]
+    start = minutes_needed(windows) - 1
+    if n_rows <= start:
+        return np.empty((0, (3 + 2 * len(windows)) * N_STATES))
+
+    current = counts[start:]
+    previous = counts[start - 1:-1]
+    blocks = [current, previous, current - previous]
+    for w in windows:
+        blocks.extend(_rolling_mean_std(cumsum, cumsum_sq, w, start, n_rows))
+    return np.concatenate(blocks, axis=1, dtype=np.float64)
+
+
+def _rolling_mean_std(cumsum, cumsum_sq, roll_window, start, n_rows):
+    # window ending at row t covers rows t-w+1 .. t
+    s = cumsum[start + 1:] - cumsum[start + 1 - roll_window:n_rows + 1 - roll_window]
+    ss = cumsum_sq[start + 1:] - cumsum_sq[start + 1 - roll_window:n_rows + 1 - roll_window]
+    mean = s / roll_window
+    std = np.sqrt((roll_window * ss - s * s) / (roll_window * (roll_window - 1)))
+    return mean, std
+
+
+def build_features(counts: np.ndarray, windows=None) -> dict:
+    """
+    Features for several roll windows from a single pass over the counts.
+    Returns {roll_window: (first_valid_row, feature_matrix)}.
+    """
+    windows = windows if windows is not None else tuple(HORIZON_WINDOWS.values())
+    counts = np.asarray(counts, dtype=np.int64)
+    cumsum = _prefixed_cumsum(counts)
+    cumsum_sq = _prefixed_cumsum(counts * counts)
+    return {
+        w: (first_valid_row(w), window_features(counts, w, cumsum, cumsum_sq))
+        for w in windows
+    }
+
+
+def _prefixed_cumsum(values: np.ndarray) -> np.ndarray:
+    out = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
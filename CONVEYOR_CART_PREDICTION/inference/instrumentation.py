@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def memory_bytes():
+    """
+    Traced allocations when tracemalloc is running (exact, for benchmarks),
+    otherwise the resident set size from /proc; None where neither is available.
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StageMetrics:
+    """
+    Records duration, rows in/out and memory delta of each prediction stage.
+    One instance per predict call, so concurrent calls never share records.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the block; set record["rows_out"] inside it when the row count changes."""
+        record = {"stage": name, "rows_in": rows_in, "rows_out": rows_in}
+        mem_before = memory_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            mem_after = memory_bytes()
+            record["mem_delta_mb"] = (
+                round((mem_after - mem_before) / 2**20, 3)
+                if mem_before is not None and mem_after is not None else None
+            )
+            self.stages.append(record)
+
+    def total_ms(self) -> float:
+        return round(sum(s["duration_ms"] for s in self.stages), 3)
+
+
+def to_jsonl(stages: list, **fields) -> str:
+    """One JSON object per stage; fields (e.g. line_id, mode) are added to every line."""
+    ts = time.time()
+    return "\n".join(json.dumps({"ts": ts, **fields, **stage}) for stage in stages) + "\n"
+
+
+def to_prometheus(stages: list, prefix="conveyor_predict_stage", **labels) -> str:
+    """Prometheus text exposition of one prediction's stages, one gauge family per field."""
+    families = [
+        ("duration_seconds", "Duration of the prediction stage", lambda s: s["duration_ms"] / 1000),
+        ("rows_in", "Rows entering the prediction stage", lambda s: s["rows_in"]),
+        ("rows_out", "Rows leaving the prediction stage", lambda s: s["rows_out"]),
+        ("memory_delta_bytes", "Memory change during the prediction stage", lambda s: None if s["mem_delta_mb"] is None else s["mem_delta_mb"] * 2**20),
+    ]
+    lines = []
+    for suffix, help_text, value in families:
+        name = f"{prefix}_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for stage in stages:
+            v = value(stage)
+            if v is not None:
+                lines.append(f"{name}{{{_labels(stage=stage['stage'], **labels)}}} {v:g}")
+    return "\n".join(lines) + "\n"
+
+
+class StageTotals:
+    """Running per-stage totals across predictions, exposed as Prometheus counters."""
+
+    def __init__(self, prefix="conveyor_predict_stage"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def add(self, stages: list):
+        with self._lock:
+            for stage in stages:
+                total = self._totals.setdefault(stage["stage"], {"calls": 0, "seconds": 0.0, "rows": 0})
+                total["calls"] += 1
+                total["seconds"] += stage["duration_ms"] / 1000
+                total["rows"] += stage["rows_in"] or 0
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            totals = {name: dict(t) for name, t in self._totals.items()}
+        lines = []
+        for field, help_text in (
+            ("calls", "Prediction stages executed"),
+            ("seconds", "Time spent in the prediction stage"),
+            ("rows", "Rows processed by the prediction stage"),
+        ):
+            name = f"{self.prefix}_{field}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{{{_labels(stage=stage)}}} {t[field]:g}" for stage, t in totals.items()]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
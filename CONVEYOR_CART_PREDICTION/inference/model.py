@@ -0,0 +1,483 @@
+import pandas as pd
+import numpy as np
+import traceback
+import logging
+
+from .constants import INPUT_PARAMS, FEATURE_COLS, BASE_COLS, HORIZON_WINDOWS, MULTI_HORIZON
+from .features import status_counts, window_features, multi_window_features, first_valid_row, minutes_needed, _prefixed_cumsum
+from .instrumentation import StageMetrics
+from .resample import resample_frame
+from .registry import BACKENDS, COMPILED_MAX_ROWS, get_registry
+
+
+class Model:
+
+    # backend="auto" scores up to this many rows per horizon with the compiled trees
+    COMPILED_MAX_ROWS = COMPILED_MAX_ROWS
+
+    def __init__(self, timestamp_unit="s", registry=None, batcher=None, multi_horizon=False, backend="xgboost"):
+
+        self.input_params = list(INPUT_PARAMS)
+
+        self.timestamp_unit = "s"
+        self.timestamp_factor = 1 if self.timestamp_unit == 's' else 1000
+        self.registry = registry if registry is not None else get_registry()
+        # optional MicroBatcher shared by concurrent callers (prediction service)
+        self.batcher = batcher
+        # one model scoring all horizons from a shared feature matrix (training --multi-horizon)
+        self.multi_horizon = multi_horizon
+        # "xgboost": XGBRegressor.predict, "numpy": trees compiled to NumPy (inference.compiled, same
+        # predictions without the per-call overhead), "auto": numpy for small inputs such as mode="latest"
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        if batcher is not None and batcher.backend != backend:
+            # the batcher's workers do the scoring, a different backend here would be ignored
+            raise ValueError(f"Model backend {backend!r} differs from its batcher's {batcher.backend!r}, pass the same backend to MicroBatcher")
+        self.backend = backend
+        self.logger = logging.getLogger("ML MODEL LOGGER")
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.hasHandlers():
+            stream_handler = logging.StreamHandler()
+            self.logger.addHandler(stream_handler)
+
+
+    def versions(self) -> dict:
+        """Content hash of the model file(s) this instance predicts with."""
+        if self.multi_horizon:
+            return self.registry.versions([MULTI_HORIZON])
+        return self.registry.versions()
+
+    def predict(self, data, mode="full"):
+        """
+        mode="full"   -> predictions for every resampled minute (used for the plots)
+        mode="latest" -> only the current forecast; the input is trimmed to the
+                         minimum tail and only the final row is scored
+
+        result["stages"] lists the duration, rows in/out and memory delta of
+        every stage (see inference.instrumentation for Prometheus/JSONL export).
+        """
+        return self.infer(self.prepare(data, mode))
+
+    def predict_resampled(self, df_resampled, mode="full"):
+        """
+        Same as predict() for data that is already bucketed per minute
+        (TIMESTAMP + conveyor status columns, as produced by the resample step
+        or the ingestion readers).
+        """
+        return self.infer(self.prepare_resampled(df_resampled, mode))
+
+    def predict_counts(self, df_counts, mode="full"):
+        """
+        Same as predict() for per-minute cart counts
+        (TIMESTAMP + num_carts_full/empty/maintenance), e.g. from an event log.
+        """
+        return self.infer(self.prepare_counts(df_counts, mode))
+
+    def predict_store(self, store, mode="full", start=None, end=None):
+        """
+        Same as predict_resampled() for the minutes [start, end] of a
+        feature_store.FeatureStore (default: all of them), scored on the
+        stored features instead of recomputing them.
+        """
+        return self.infer(self.prepare_store(store, mode, start, end))
+
+    def prepare(self, data, mode="full"):
+        """
+        predict() up to, but excluding, inference. Returns the per-horizon
+        feature matrices so callers can score many inputs together.
+        """
+        try:
+            self.logger.info(f"Prediction started, mode: {mode}")
+            if mode not in ("full", "latest"):
+                return {
+                    "status":"error",
+                    "message": f"Unknown prediction mode: {mode}"
+                }
+            missing_cols = list(set(self.input_params) - set(data.columns))
+            if missing_cols:
+                self.logger.info("Missing Columns")
+                return {
+                    "status":"error",
+                    "message": f"Missing columns: {missing_cols}"
+                }
+
+            metrics = StageMetrics()
+            with metrics.stage("to_datetime", len(data)):
+                data["TIMESTAMP"] = pd.to_datetime(
+                    data["TIMESTAMP"],
+                    unit=self.timestamp_unit,
+                    errors="coerce"
+                )
+
+            with metrics.stage("sort", len(data)):
+                data = data.sort_values("TIMESTAMP")
+
+            # duration of the whole upload, so trimming never changes the validation
+            ts = data["TIMESTAMP"].dropna()
+            duration_minutes = (
+                (ts.iloc[-1].floor("1min") - ts.iloc[0].floor("1min")).total_seconds() / 60
+                if len(ts) else 0.0
+            )
+
+            if mode == "latest":
+                with metrics.stage("trim_latest", len(data)) as stage:
+                    data = self.trim_to_latest(data)
+                    stage["rows_out"] = len(data)
+
+            # resample----------------------->
+            with metrics.stage("resample", len(data)) as stage:
+                # NumPy bucketing, identical to the pandas chain below, which handles non-numeric columns
+                df_resampled = resample_frame(data)
+                if df_resampled is None:
+                    df_resampled = (
+                        data
+                        .ffill()
+                        .set_index("TIMESTAMP")
+                        .resample("1min")
+                        .first()
+                        .ffill()
+                        .fillna(0).reset_index()
+                    )
+                stage["rows_out"] = len(df_resampled)
+
+            return self._featurize(df_resampled, mode, duration_minutes, metrics)
+        except Exception as e:
+            return self._error(e)
+
+    def prepare_resampled(self, df_resampled, mode="full"):
+        try:
+            self.logger.info(f"Prediction started from resampled data, mode: {mode}")
+            if mode not in ("full", "latest"):
+                return {
+                    "status":"error",
+                    "message": f"Unknown prediction mode: {mode}"
+                }
+            missing_cols = list(set(self.input_params) - set(df_resampled.columns))
+            if missing_cols:
+                self.logger.info("Missing Columns")
+                return {
+                    "status":"error",
+                    "message": f"Missing columns: {missing_cols}"
+                }
+
+            duration_minutes = 0.0
+            if not df_resampled.empty:
+                duration_minutes = (df_resampled["TIMESTAMP"].iloc[-1] - df_resampled["TIMESTAMP"].iloc[0]).total_seconds() / 60
+
+            metrics = StageMetrics()
+            if mode == "latest":
+                with metrics.stage("trim_latest", len(df_resampled)) as stage:
+                    df_resampled = df_resampled.iloc[-minutes_needed():].reset_index(drop=True)
+                    stage["rows_out"] = len(df_resampled)
+
+            return self._featurize(df_resampled, mode, duration_minutes, metrics)
+        except Exception as e:
+            return self._error(e)
+
+    def prepare_counts(self, df_counts, mode="full"):
+        try:
+            self.logger.info(f"Prediction started from cart counts, mode: {mode}")
+            if mode not in ("full", "latest"):
+                return {
+                    "status":"error",
+                    "message": f"Unknown prediction mode: {mode}"
+                }
+            missing_cols = list(set(BASE_COLS) - set(df_counts.columns))
+            if missing_cols:
+                self.logger.info("Missing Columns")
+                return {
+                    "status":"error",
+                    "message": f"Missing columns: {missing_cols}"
+                }
+
+            duration_minutes = 0.0
+            if not df_counts.empty:
+                duration_minutes = (df_counts["TIMESTAMP"].iloc[-1] - df_counts["TIMESTAMP"].iloc[0]).total_seconds() / 60
+            metrics = StageMetrics()
+            if mode == "latest":
+                with metrics.stage("trim_latest", len(df_counts)) as stage:
+                    df_counts = df_counts.iloc[-minutes_needed():].reset_index(drop=True)
+                    stage["rows_out"] = len(df_counts)
+
+            error = self._check_resampled(df_counts, duration_minutes)
+            if error:
+                return error
+
+            return self._featurize_counts(df_counts, df_counts[BASE_COLS].to_numpy(), mode, metrics)
+        except Exception as e:
+            return self._error(e)
+
+    def prepare_store(self, store, mode="full", start=None, end=None):
+        from feature_store import feature_column, first_feature_row
+
+        try:
+            self.logger.info(f"Prediction started from the feature store, mode: {mode}")
+            if mode not in ("full", "latest"):
+                return {
+                    "status":"error",
+                    "message": f"Unknown prediction mode: {mode}"
+                }
+            if not store.days():
+                return {
+                    "status":"error",
+                    "message": "No data in the feature store"
+                }
+
+            metrics = StageMetrics()
+            end = min(pd.Timestamp(end), store.last) if end is not None else store.last
+            if mode == "latest":
+                # the stored features of a minute already cover its history
+                start = end
+            with metrics.stage("read_store") as stage:
+                table = store.read(start, end)
+                df_counts = store.counts(table)
+                stage["rows_out"] = len(df_counts)
+
+            error = self._check_resampled(df_counts, (end - store.first).total_seconds() / 60)
+            if error:
+                return error
+
+            # rows before a window's warm-up (at the start of the stored history) have no features
+            offset = store.row_of(df_counts["TIMESTAMP"].iloc[0])
+            features = {}
+            feature_timestamps = {}
+            matrices = {}
+            with metrics.stage("store_features", len(df_counts)):
+                for mins, roll_window in HORIZON_WINDOWS.items():
+                    window = MULTI_HORIZON if self.multi_horizon else roll_window
+                    if window not in matrices:
+                        skip = max(first_feature_row(window) - offset, 0)
+                        matrices[window] = (skip, store.matrix(table, feature_column(window))[skip:])
+                    skip, X = matrices[window]
+                    features[mins] = X
+                    feature_timestamps[mins] = df_counts["TIMESTAMP"].iloc[skip:].reset_index(drop=True)
+            self.logger.info("Features read from the store!")
+            if any(len(X) == 0 for X in features.values()):
+                self.logger.info("Feature data frame is empty!")
+                return {
+                    "status":"error",
+                    "message": "Insufficient data after feature engineering. Please provide more historical data for accurate predictions."
+                }
+            if self.multi_horizon:
+                features = {MULTI_HORIZON: features[mins]}
+
+            return {
+                "status": "success",
+                "features": features,
+                "timestamps": feature_timestamps,
+                "resampled": df_counts,
+                "metrics": metrics
+            }
+        except Exception as e:
+            return self._error(e)
+
+    def featurize_tail(self, df_tail, duration_minutes, mode="full"):
+        """
+        prepare_resampled() for the last minutes of a longer per-minute frame,
+        validated with the duration of the whole frame. Lets a caller holding
+        the predictions of the earlier minutes featurize only the new ones.
+        """
+        try:
+            return self._featurize(df_tail, mode, duration_minutes, StageMetrics())
+        except Exception as e:
+            return self._error(e)
+
+    def _featurize(self, df_resampled, mode, duration_minutes, metrics):
+        """Validation and feature engineering on the per-minute frame."""
+        error = self._check_resampled(df_resampled, duration_minutes)
+        if error:
+            return error
+
+        # feature engineering----------------------->
+        conveyor_cols = [
+            col for col in df_resampled.columns
+            if col.startswith("CONVEYOR_STATUS")
+        ]
+
+        # single pass: counts via bincount, all windows from one cumsum
+        with metrics.stage("counts", len(df_resampled)):
+            counts = status_counts(df_resampled[conveyor_cols].to_numpy())
+            for i, col in enumerate(BASE_COLS):
+                df_resampled[col] = counts[:, i]
+
+        return self._featurize_counts(df_resampled, counts, mode, metrics)
+
+    def _check_resampled(self, df_resampled, duration_minutes):
+        if df_resampled.empty:
+            self.logger.info("Resampled data is empty!")
+            return {
+                "status":"error",
+                "message": "No data after resampling"
+            }
+
+        if duration_minutes < 15:
+            self.logger.info("Insufficient duration of data, past 15 mins data unavailable")
+            return {
+                "status":"error",
+                "message": f"Insufficient data duration: {duration_minutes:.2f} minutes. At least 15 minutes of historical data is required for prediction."
+            }
+
+        self.logger.info("Resampled sucessfully!")
+        return None
+
+    def _featurize_counts(self, df_resampled, counts, mode, metrics):
+        """Per-horizon feature matrices and their timestamps."""
+        with metrics.stage("prefix_sums", len(counts)):
+            counts = np.asarray(counts, dtype=np.int64)
+            cumsum = _prefixed_cumsum(counts)
+            cumsum_sq = _prefixed_cumsum(counts * counts)
+
+        if self.multi_horizon:
+            with metrics.stage("features_multi", len(counts)) as stage:
+                X = multi_window_features(counts, None, cumsum, cumsum_sq)
+                stage["rows_out"] = len(X)
+            # every horizon is scored on the same rows
+            window_map = {roll_window: (minutes_needed() - 1, X) for roll_window in set(HORIZON_WINDOWS.values())}
+        else:
+            window_map = {}
+            for roll_window in sorted(set(HORIZON_WINDOWS.values())):
+                with metrics.stage(f"features_w{roll_window}", len(counts)) as stage:
+                    X = window_features(counts, roll_window, cumsum, cumsum_sq)
+                    window_map[roll_window] = (first_valid_row(roll_window), X)
+                    stage["rows_out"] = len(X)
+        self.logger.info("Feature engineering done!")
+        if any(len(X) == 0 for _, X in window_map.values()):
+            self.logger.info("Feature data frame is empty!")
+            return {
+                "status":"error",
+                "message": "Insufficient data after feature engineering. Please provide more historical data for accurate predictions."
+            }
+
+        timestamps = df_resampled["TIMESTAMP"]
+        features = {}
+        feature_timestamps = {}
+        for mins, roll_window in HORIZON_WINDOWS.items():
+            start, X = window_map[roll_window]
+            if mode == "latest":
+                start, X = start + len(X) - 1, X[-1:]
+            features[mins] = X
+            feature_timestamps[mins] = timestamps.iloc[start:].reset_index(drop=True)
+        if self.multi_horizon:
+            features = {MULTI_HORIZON: features[mins]}
+
+        return {
+            "status": "success",
+            "features": features,
+            "timestamps": feature_timestamps,
+            "resampled": df_resampled,
+            "metrics": metrics
+        }
+
+    def infer(self, prepared):
+        """Score the output of one of the prepare methods."""
+        if prepared["status"] == "error":
+            return prepared
+        try:
+            metrics = prepared.get("metrics") or StageMetrics()
+            horizon_preds = self._infer(prepared["features"], metrics)
+
+            predictions = {}
+            plots = {}
+            for mins, preds in horizon_preds.items():
+
+                last_pred = int(np.rint(preds[-1]))
+                predictions[f"PRED_{mins}"] = last_pred
+
+                # store plot
+                plots[mins] = (prepared["timestamps"][mins], preds)
+                self.logger.info(f"Predicted {mins} min")
+
+            result = {
+                "status": "success",
+                "predictions": predictions,
+                "plots": plots,
+                "resampled": prepared["resampled"],
+                "stages": metrics.stages
+            }
+            self.logger.info("Returning result")
+
+            return result
+        except Exception as e:
+            return self._error(e)
+
+    def _infer(self, features, metrics):
+        """Run each horizon's booster on its feature matrix, through the batcher when one is set, else on self.backend."""
+        if self.batcher is not None:
+            # horizons are scored concurrently by the batcher, so they share one stage
+            with metrics.stage("infer_batched", sum(len(X) for X in features.values())):
+                horizon_preds = self.batcher.predict_many(features)
+        else:
+            horizon_preds = {}
+            for mins, X in features.items():
+                with metrics.stage(f"infer_{mins}", len(X)):
+                    horizon_preds[mins] = self._predictor(mins, len(X)).predict(X)
+
+        if MULTI_HORIZON in horizon_preds:
+            # one column per horizon, in HORIZON_WINDOWS order
+            preds = np.asarray(horizon_preds.pop(MULTI_HORIZON)).reshape(-1, len(HORIZON_WINDOWS))
+            horizon_preds = {mins: preds[:, i] for i, mins in enumerate(HORIZON_WINDOWS)}
+        return horizon_preds
+
+    def _predictor(self, mins, n_rows):
+        return self.registry.predictor(mins, self.backend, n_rows, self.COMPILED_MAX_ROWS)
+
+    def _error(self, e):
+        self.logger.error("An error occurred during prediction.  Error details: " + str(e) + "\n" + traceback.format_exc())
+        return {
+            "status":"error",
+            "message": "An error occurred during prediction.  Error details: " + str(e) + "\n" + traceback.format_exc()
+        }
+
+    def trim_to_latest(self, data):
+        """
+        Keep only the rows needed to rebuild the last minutes_needed() resampled
+        minutes exactly. The tail starts at the first event of the last
+        non-empty minute at or before the window start (empty minutes repeat
+        that minute's state), and its first row is back-filled with each
+        conveyor's last known state so ffill behaves as on the full history.
+        Expects data sorted by TIMESTAMP.
+        """
+        ts = data["TIMESTAMP"].to_numpy()
+        n_valid = int(np.count_nonzero(~np.isnat(ts)))
+        if n_valid == 0:
+            return data
+
+        minutes = ts[:n_valid].astype("datetime64[m]")
+        window_start = minutes[-1] - np.timedelta64(minutes_needed() - 1, "m")
+        # last minute with events at or before the window start, then its first row
+        anchor = minutes[max(np.searchsorted(minutes, window_start, side="right") - 1, 0)]
+        tail_idx = int(np.searchsorted(minutes, anchor, side="left"))
+        if tail_idx == 0:
+            return data
+
+        tail = data.iloc[tail_idx:].copy()
+        carry = self._last_known_state(data, tail_idx)
+        for col, value in carry.dropna().items():
+            loc = tail.columns.get_loc(col)
+            if pd.isna(tail.iat[0, loc]):
+                tail.iat[0, loc] = value
+        self.logger.info(f"Trimmed input from {len(data)} to {len(tail)} rows")
+        return tail
+
+    def _last_known_state(self, data, end_idx, chunk_rows=1024):
+        """Last non-null value of every conveyor in data.iloc[:end_idx], scanning backwards in growing chunks."""
+        state = pd.Series(np.nan, index=self.input_params)
+        pending = list(self.input_params)
+        stop = end_idx
+        while pending and stop > 0:
+            start = max(stop - chunk_rows, 0)
+            found = data[pending].iloc[start:stop].ffill().iloc[-1]
+            state[found.index] = found
+            pending = found.index[found.isna()].tolist()
+            stop = start
+            chunk_rows *= 4
+        return state
+
+    def create_cart_features(self,df, roll_window):
+        """Feature frame for one roll window (TIMESTAMP, counts and FEATURE_COLS), rows with incomplete windows dropped."""
+        df = df.sort_values("TIMESTAMP").reset_index(drop=True)
+        X = window_features(df[BASE_COLS].to_numpy(), roll_window)
+        start = first_valid_row(roll_window)
+        feature_df = pd.DataFrame(X, columns=FEATURE_COLS)
+        feature_df.insert(0, "TIMESTAMP", df["TIMESTAMP"].iloc[start:].to_numpy())
+        return feature_df
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# points per trace sent to the browser, about two per horizontal pixel of a wide chart
+MAX_POINTS = 4000
+# traces with more points than this are drawn with WebGL (go.Scattergl) instead of SVG
+WEBGL_THRESHOLD = 2000
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+
+def minmax_indices(y, n_out) -> np.ndarray:
+    """
+    Indices of the smallest and largest value of up to (n_out - 2) // 2 equal buckets
+    (plus the first and last point), in order. Every spike survives, so the
+    line's envelope is the same as the full series'.
+    """
+    n = len(y)
+    n_buckets = max((n_out - 2) // 2, 1)
+    if n <= n_out or n_buckets >= n:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    # the last bucket is padded with its final value, whose index is clipped back below
+    buckets = np.pad(np.asarray(y), (0, n_buckets * size - n), mode="edge").reshape(n_buckets, size)
+    starts = np.arange(n_buckets) * size
+    picked = np.concatenate([[0, n - 1], starts + buckets.argmin(axis=1), starts + buckets.argmax(axis=1)])
+    return np.unique(np.minimum(picked, n - 1))
+
+
+def lttb_indices(y, n_out) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    each of n_out - 2 equal buckets, the point forming the largest triangle
+    with the previously kept point and the next bucket's average. Points are
+    assumed evenly spaced (one per minute).
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # bucket averages, the last point stands in for the bucket after the last one
+    sums = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = np.diff(edges)
+    avg_y = np.append((sums[edges[1:]] - sums[edges[:-1]]) / sizes, y[-1])
+    avg_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay, cx, cy = x[a], y[a], avg_x[i + 1], avg_y[i + 1]
+        # twice the triangle area, the constant factor does not change the argmax
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(ts, preds, max_points=MAX_POINTS, start=None, end=None, method="minmax"):
+    """
+    One (timestamps, predictions) plot series cut to [start, end] and reduced
+    to at most max_points points; shorter ranges are returned at full
+    resolution. max_points=None only applies the range.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    ts = pd.Series(ts).reset_index(drop=True)
+    preds = np.asarray(preds)
+    # the series is in time order, so the visible range is one slice
+    values = ts.to_numpy()
+    lo = 0 if start is None else int(np.searchsorted(values, np.datetime64(pd.Timestamp(start)), side="left"))
+    hi = len(values) if end is None else int(np.searchsorted(values, np.datetime64(pd.Timestamp(end)), side="right"))
+    ts, preds = ts.iloc[lo:hi].reset_index(drop=True), preds[lo:hi]
+
+    if max_points is None or len(preds) <= max_points:
+        return ts, preds
+    idx = minmax_indices(preds, max_points) if method == "minmax" else lttb_indices(preds, max_points)
+    return ts.iloc[idx].reset_index(drop=True), preds[idx]
+
+
+def downsample_plots(plots: dict, max_points=MAX_POINTS, start=None, end=None, method="minmax") -> dict:
+    """downsample() applied to every horizon of a Model result's "plots"."""
+    return {
+        mins: downsample(ts, preds, max_points, start, end, method)
+        for mins, (ts, preds) in plots.items()
+    }
+
+
+def prediction_figure(ts, preds, mins, max_points=MAX_POINTS, start=None, end=None, method="minmax"):
+    """
+    Plotly figure of one horizon's predictions, downsampled for the browser.
+    Drawn with Scattergl when more than WEBGL_THRESHOLD points remain.
+    """
+    import plotly.graph_objects as go
+
+    n_total = len(preds)
+    ts, preds = downsample(ts, preds, max_points, start, end, method)
+    trace = go.Scattergl if len(preds) > WEBGL_THRESHOLD else go.Scatter
+
+    fig = go.Figure()
+    fig.add_trace(
+        trace(
+            x=ts,
+            y=preds,
+            mode="lines",
+            name=f"{mins} Min Prediction"
+        )
+    )
+    title = f"{mins} Minute Prediction"
+    if len(preds) < n_total:
+        title += f" ({len(preds):,} of {n_total:,} points)"
+    fig.update_layout(
+        title=title,
+        xaxis_title="Timestamp",
+        yaxis_title="Predicted Available Carts",
+        template="plotly_white"
+    )
+    return fig
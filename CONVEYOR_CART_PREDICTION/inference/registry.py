@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from xgboost import XGBRegressor
+
+from .compiled import CompiledEnsemble
+from .constants import HORIZON_WINDOWS, MODEL_DIR, MULTI_HORIZON, model_filename
+
+# inference backends: "xgboost" XGBRegressor.predict, "numpy" trees compiled to NumPy
+# (inference.compiled, same predictions without the per-call overhead), "auto" numpy for small inputs
+BACKENDS = ("xgboost", "numpy", "auto")
+# backend="auto" scores up to this many rows per call with the compiled trees
+COMPILED_MAX_ROWS = 8
+# written next to the model files by training.write_models when a version is promoted
+LIVE_FILE = "live.json"
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+
+@dataclass(frozen=True)
+class _LoadedModel:
+    model: XGBRegressor
+    path: Path
+    mtime_ns: int
+    size: int
+    sha256: str
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of the horizon boosters.
+
+    Each model file is parsed once and shared by every caller. On access the
+    file is stat-ed; when mtime/size change the file is hashed and, only if the
+    content really changed, a fresh booster is loaded off to the side and swapped
+    in with a single reference assignment. Callers that already hold the old
+    booster keep using it until their prediction finishes.
+
+    The optional multi-horizon model is served under the MULTI_HORIZON key; it
+    is only loaded when asked for, so get_all() and versions() cover the
+    per-horizon models.
+
+    get_compiled() returns the same booster compiled to NumPy arrays
+    (inference.compiled), rebuilt whenever the file's content changes.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, horizons=tuple(HORIZON_WINDOWS)):
+        self.model_dir = Path(model_dir)
+        self.horizons = tuple(horizons)
+        self._entries = {}
+        self._locks = {h: threading.Lock() for h in (*self.horizons, MULTI_HORIZON)}
+        # horizon -> (sha256, CompiledEnsemble)
+        self._compiled = {}
+
+    def model_path(self, horizon: int) -> Path:
+        return self.model_dir / model_filename(horizon)
+
+    def get(self, horizon) -> XGBRegressor:
+        """Return the current booster for a horizon (or MULTI_HORIZON), reloading it if its file changed."""
+        if horizon not in self._locks:
+            raise KeyError(f"Unknown horizon: {horizon}")
+
+        path = self.model_path(horizon)
+        stat = path.stat()
+        entry = self._entries.get(horizon)
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            return entry.model
+
+        with self._locks[horizon]:
+            # another thread may have reloaded while we waited
+            entry = self._entries.get(horizon)
+            stat = path.stat()
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                return entry.model
+
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+
+            if entry is not None and entry.sha256 == digest:
+                # touched but not modified, keep the parsed booster
+                self._entries[horizon] = _LoadedModel(entry.model, path, stat.st_mtime_ns, stat.st_size, digest)
+                return entry.model
+
+            model = XGBRegressor()
+            try:
+                model.load_model(bytearray(raw))
+            except Exception as e:
+                if entry is None:
+                    raise
+                # most likely caught mid-write, keep serving the previous booster
+                logger.error(f"Failed to reload {path.name}, keeping previous model. Error details: {e}")
+                return entry.model
+            self._entries[horizon] = _LoadedModel(model, path, stat.st_mtime_ns, stat.st_size, digest)
+
+            if entry is None:
+                logger.info(f"Loaded {path.name} ({digest[:12]})")
+            else:
+                logger.info(f"Reloaded {path.name} ({entry.sha256[:12]} -> {digest[:12]})")
+            return model
+
+    def get_compiled(self, horizon) -> CompiledEnsemble:
+        """The current booster for a horizon as a CompiledEnsemble, compiled once per model version."""
+        self.get(horizon)
+        entry = self._entries[horizon]
+        compiled = self._compiled.get(horizon)
+        if compiled is not None and compiled[0] == entry.sha256:
+            return compiled[1]
+
+        with self._locks[horizon]:
+            compiled = self._compiled.get(horizon)
+            if compiled is None or compiled[0] != entry.sha256:
+                compiled = (entry.sha256, CompiledEnsemble.from_booster(entry.model))
+                self._compiled[horizon] = compiled
+                logger.info(f"Compiled {entry.path.name} ({entry.sha256[:12]})")
+        return compiled[1]
+
+    def predictor(self, horizon, backend="xgboost", n_rows=None, compiled_max_rows=COMPILED_MAX_ROWS):
+        """What scores n_rows rows of a horizon on a backend: the booster or its CompiledEnsemble."""
+        if backend == "numpy" or (backend == "auto" and n_rows is not None and n_rows <= compiled_max_rows):
+            return self.get_compiled(horizon)
+        return self.get(horizon)
+
+    def get_all(self) -> dict:
+        return {h: self.get(h) for h in self.horizons}
+
+    def versions(self, horizons=None) -> dict:
+        """Content hash of every per-horizon model (or of the given keys), keyed by horizon."""
+        horizons = self.horizons if horizons is None else tuple(horizons)
+        for h in horizons:
+            self.get(h)
+        return {h: self._entries[h].sha256 for h in horizons}
+
+    def preload(self):
+        self.get_all()
+        return self
+
+
+def live_setup(model_dir=MODEL_DIR) -> dict:
+    """
+    What the last promote made live: {"version", "multi_horizon", "promoted_at"},
+    {} when the model files were not promoted by training.write_models.
+    """
+    path = Path(model_dir) / LIVE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the registry shared by the whole process."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+MINUTE_NS = 60_000_000_000
+
+
+def resample_minutes(ts_ns: np.ndarray, columns):
+    """
+    NumPy equivalent of ffill -> resample("1min").first() -> ffill -> fillna(0)
+    on a time-ordered frame.
+
+    ts_ns: int64 nanosecond timestamps, non-decreasing. columns: one 1D
+    int/float array per value column. Returns (minutes, snapshots, has_gaps):
+    the int64 minute index of every minute from the first to the last, the
+    (n_minutes, n_columns) float64 values and whether any minute had no rows.
+
+    Minute buckets come from integer division of the timestamps. A minute's
+    value is the forward-filled state at its first row: the last non-null row
+    at or before it, looked up in the column's non-null positions through a
+    running count, so the filled frame is never materialized. A column whose first
+    ever value arrives later in a minute still fills that minute (first()
+    skips nulls); columns not seen yet are 0, and empty minutes repeat the
+    previous minute.
+    """
+    n_cols = len(columns)
+    if len(ts_ns) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, n_cols)), False
+
+    minutes = ts_ns // MINUTE_NS
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    ends = np.append(starts[1:], len(ts_ns))
+
+    # column-major: each column is written contiguously and .T is the layout pandas stores
+    by_column = np.zeros((n_cols, len(starts)))
+    count_dtype = np.int32 if len(ts_ns) < np.iinfo(np.int32).max else np.int64
+    for c, values in enumerate(columns):
+        if values.dtype.kind != "f":
+            by_column[c] = values[starts]
+            continue
+        present = ~np.isnan(values)
+        positions = np.flatnonzero(present)
+        if len(positions) == 0:
+            continue
+        # number of values up to each minute's first row -> index of the last one in positions
+        j = np.cumsum(present, dtype=count_dtype)[starts] - 1
+        np.maximum(j, 0, out=j)
+        by_column[c] = values[positions[j]]
+        # minutes before the one holding the first value stay 0; that minute takes
+        # the first value even when it arrives after the minute's first row
+        by_column[c, :np.searchsorted(starts, positions[0], side="right") - 1] = 0
+
+    # empty minutes repeat the previous minute
+    bucket_minutes = minutes[starts]
+    all_minutes = np.arange(bucket_minutes[0], bucket_minutes[-1] + 1, dtype=np.int64)
+    has_gaps = len(all_minutes) != len(bucket_minutes)
+    if has_gaps:
+        by_column = by_column[:, np.searchsorted(bucket_minutes, all_minutes, side="right") - 1]
+    return all_minutes, by_column.T, has_gaps
+
+
+def resample_frame(data: pd.DataFrame):
+    """
+    The Model.predict resample on a TIMESTAMP-sorted frame, bit for bit:
+    data.ffill().set_index("TIMESTAMP").resample("1min").first().ffill().fillna(0).reset_index()
+
+    Returns None when a column is not int/float, so the caller can use pandas.
+    """
+    value_cols = [c for c in data.columns if c != "TIMESTAMP"]
+    dtypes = data[value_cols].dtypes
+    if not all(dtype.kind in "if" for dtype in dtypes):
+        return None
+
+    ts = data["TIMESTAMP"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    valid = ts != np.iinfo(np.int64).min
+    if not valid.any():
+        return None
+    # sort_values puts NaT last and ffill gives those rows the last timestamp
+    ts = np.where(valid, ts, ts[valid][-1])
+
+    minutes, snapshots, has_gaps = resample_minutes(ts, [data[c].to_numpy() for c in value_cols])
+
+    # first() turns int columns into float only when it has to fill an empty minute
+    out_dtypes = [np.dtype(np.float64) if dtype.kind == "i" and has_gaps else dtype for dtype in dtypes]
+    if len(set(out_dtypes)) == 1:
+        # one 2D block, no per-column copies
+        resampled = pd.DataFrame(snapshots.astype(out_dtypes[0], copy=False), columns=value_cols, copy=False)
+    else:
+        resampled = pd.DataFrame({
+            col: snapshots[:, i].astype(dtype, copy=False)
+            for i, (col, dtype) in enumerate(zip(value_cols, out_dtypes))
+        })
+    resampled.insert(0, "TIMESTAMP", (minutes * MINUTE_NS).view("datetime64[ns]"))
+    return resampled
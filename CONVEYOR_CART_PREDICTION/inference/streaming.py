@@ -0,0 +1,195 @@
+import logging
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .constants import INPUT_PARAMS, HORIZON_WINDOWS
+from .features import first_valid_row
+from .registry import BACKENDS, get_registry
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+NAN = float("nan")
+
+
+class StreamingPredictor:
+    """
+    Stateful per-minute predictor fed one conveyor status event at a time.
+
+    An event is a timestamp plus the statuses that changed at that instant, i.e.
+    one row of the raw export. Minute buckets follow the batch pipeline
+    (ffill -> resample("1min").first() -> ffill -> fillna(0)): the state of a
+    minute is the conveyor state right after the first event of that minute, and
+    minutes without events repeat the previous minute.
+
+    Only the last max(window)+1 minute counts are kept. lag1, diff1 and the
+    rolling mean/std of every window are maintained with running sums, so
+    closing a minute costs O(1) regardless of how much history was streamed.
+    A horizon is predicted for every closed minute from its window's
+    first_valid_row on, the minutes the batch path scores in mode="full", so
+    the first minutes only carry the horizons whose window is already filled.
+    backend is Model's: "xgboost", "numpy" or "auto".
+    """
+
+    def __init__(self, timestamp_unit="s", registry=None, conveyors=INPUT_PARAMS, horizon_windows=HORIZON_WINDOWS, backend="xgboost"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        self.timestamp_unit = timestamp_unit
+        self.registry = registry if registry is not None else get_registry()
+        self.backend = backend
+        self.conveyors = list(conveyors)
+        self.horizons = list(horizon_windows)
+        self.windows = np.array([horizon_windows[h] for h in self.horizons])
+        # minutes closed before a horizon's first feature row
+        self._warm_up = [first_valid_row(int(w)) for w in self.windows]
+        self._col_index = {c: i for i, c in enumerate(self.conveyors)}
+
+        # live conveyor state (NaN until a conveyor is first seen)
+        self._state = np.full(len(self.conveyors), np.nan)
+        # state snapshot of the minute currently open
+        self._snapshot = None
+        self._minute = None
+
+        # ring buffer of closed minute counts: [full, empty, maintenance]
+        self._counts = deque(maxlen=int(self.windows.max()) + 1)
+        # running sum / sum of squares per (window, count column)
+        self._sum = np.zeros((len(self.windows), 3), dtype=np.int64)
+        self._sumsq = np.zeros((len(self.windows), 3), dtype=np.int64)
+        self.minutes_closed = 0
+
+    # ------------------------------------------------------------------
+    # event ingestion
+    # ------------------------------------------------------------------
+    def _to_minute(self, timestamp) -> int:
+        if isinstance(timestamp, (pd.Timestamp, np.datetime64)):
+            return int(pd.Timestamp(timestamp).value // 60_000_000_000)
+        return int(pd.Timestamp(timestamp, unit=self.timestamp_unit).value // 60_000_000_000)
+
+    def update(self, timestamp, statuses: dict) -> list:
+        """Apply one event and return predictions for any minutes it closed."""
+        rows = self._apply_event(timestamp, statuses)
+        return self._predict_rows(rows)
+
+    def update_batch(self, events) -> list:
+        """
+        Apply a micro-batch of events in order.
+        Accepts a wide DataFrame (TIMESTAMP + conveyor columns) or an iterable of
+        (timestamp, statuses) pairs. All minutes closed by the batch are scored
+        with a single predict call per horizon.
+        """
+        if isinstance(events, pd.DataFrame):
+            cols = [c for c in self.conveyors if c in events.columns]
+            values = events[cols].to_numpy(dtype=float, na_value=np.nan)
+            events = (
+                (ts, {c: v for c, v in zip(cols, row) if not math.isnan(v)})
+                for ts, row in zip(events["TIMESTAMP"].to_numpy(), values)
+            )
+
+        rows = []
+        for timestamp, statuses in events:
+            rows.extend(self._apply_event(timestamp, statuses))
+        return self._predict_rows(rows)
+
+    def flush(self) -> list:
+        """Close the open minute without waiting for the next event."""
+        if self._minute is None:
+            return []
+        rows = [self._close_minute(self._minute, self._snapshot)]
+        self._minute = None
+        self._snapshot = None
+        return self._predict_rows([r for r in rows if r is not None])
+
+    def _apply_event(self, timestamp, statuses: dict) -> list:
+        minute = self._to_minute(timestamp)
+        rows = []
+
+        if self._minute is not None and minute < self._minute:
+            logger.info(f"Dropping out-of-order event at minute {minute}, current minute {self._minute}")
+            return rows
+
+        if self._minute is not None and minute > self._minute:
+            rows.append(self._close_minute(self._minute, self._snapshot))
+            # empty minutes repeat the previous minute's snapshot
+            for gap_minute in range(self._minute + 1, minute):
+                rows.append(self._close_minute(gap_minute, self._snapshot))
+            self._minute = None
+
+        for conveyor, status in statuses.items():
+            idx = self._col_index.get(conveyor)
+            if idx is None or status is None or status != status:
+                continue
+            self._state[idx] = status
+            # conveyors first seen later in the open minute still fill the snapshot
+            if self._minute is not None and np.isnan(self._snapshot[idx]):
+                self._snapshot[idx] = status
+
+        if self._minute is None:
+            self._minute = minute
+            self._snapshot = self._state.copy()
+
+        return [r for r in rows if r is not None]
+
+    # ------------------------------------------------------------------
+    # feature maintenance
+    # ------------------------------------------------------------------
+    def _close_minute(self, minute: int, snapshot: np.ndarray):
+        counts = np.array([
+            np.count_nonzero((snapshot == 0) | np.isnan(snapshot)),
+            np.count_nonzero(snapshot == 1),
+            np.count_nonzero(snapshot == 2)
+        ], dtype=np.int64)
+
+        n = len(self._counts)
+        for i, w in enumerate(self.windows):
+            self._sum[i] += counts
+            self._sumsq[i] += counts * counts
+            if n >= w:
+                old = self._counts[-w]
+                self._sum[i] -= old
+                self._sumsq[i] -= old * old
+
+        prev = self._counts[-1] if n else None
+        self._counts.append(counts)
+        self.minutes_closed += 1
+
+        features = {}
+        for i, (h, w) in enumerate(zip(self.horizons, self.windows)):
+            if self.minutes_closed <= self._warm_up[i]:
+                continue
+            s = self._sum[i]
+            mean = s / w
+            std = np.sqrt((w * self._sumsq[i] - s * s) / (w * (w - 1)))
+            features[h] = np.concatenate([counts, prev, mean, std, counts - prev]).astype(float)
+        if not features:
+            return None
+
+        return {
+            "TIMESTAMP": pd.Timestamp(minute * 60_000_000_000),
+            "counts": counts,
+            "features": features
+        }
+
+    def _predict_rows(self, rows: list) -> list:
+        if not rows:
+            return []
+
+        # one predict call per horizon over the rows that have it, read back in row order
+        preds = {}
+        for h in self.horizons:
+            ready = [r["features"][h] for r in rows if h in r["features"]]
+            if ready:
+                X = np.vstack(ready)
+                preds[h] = iter(self.registry.predictor(h, self.backend, len(X)).predict(X))
+
+        results = []
+        for r in rows:
+            results.append({
+                "TIMESTAMP": r["TIMESTAMP"],
+                "num_carts_full": int(r["counts"][0]),
+                "num_carts_empty": int(r["counts"][1]),
+                "num_carts_maintenance": int(r["counts"][2]),
+                "predictions": {f"PRED_{h}": int(np.rint(next(preds[h]))) for h in self.horizons if h in r["features"]}
+            })
+        return results
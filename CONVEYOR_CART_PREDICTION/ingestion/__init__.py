@@ -0,0 +1,2 @@
+from .csv_reader import IngestionError, IngestResult, ReaderState, read_conveyor_csv, read_header, resume_conveyor_csv
+from .event_log import carried_state, event_counts, is_event_log, read_event_log, wide_to_events, with_carried
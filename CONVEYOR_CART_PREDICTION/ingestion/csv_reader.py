@@ -0,0 +1,380 @@
+import copy
+import io
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from inference.constants import INPUT_PARAMS
+from inference.features import N_STATES
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+STATUS_PREFIX = "CONVEYOR_STATUS"
+# int8 sentinel for "no status known yet"
+NA_STATUS = -1
+DEFAULT_BLOCK_SIZE = 8 << 20
+
+
+class IngestionError(ValueError):
+    """Raised when an upload cannot be turned into a per-minute status frame."""
+
+
+@dataclass
+class IngestResult:
+    resampled: pd.DataFrame
+    preview: pd.DataFrame
+    rows_read: int = 0
+    chunks: int = 0
+    conveyor_cols: list = field(default_factory=list)
+    # reader state after the last row, for resume_conveyor_csv; None after the unordered fallback
+    state: "ReaderState" = None
+    # MinuteBucketer.carried() after the last row, for reading a later export of the same line
+    carried: dict = None
+
+
+@dataclass
+class ReaderState:
+    columns: list
+    conveyor_cols: list
+    bucketer: "MinuteBucketer"
+    rows_read: int
+    chunks: int
+    preview: pd.DataFrame
+
+
+def read_header(source) -> list:
+    """Column names from the first line of a path or seekable binary file."""
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            line = f.readline()
+    else:
+        pos = source.tell()
+        line = source.readline()
+        source.seek(pos)
+    return [c.strip().strip('"') for c in line.decode("utf-8-sig").strip().split(",")]
+
+
+def validate_header(columns, input_params=INPUT_PARAMS):
+    if "TIMESTAMP" not in columns:
+        raise IngestionError("Missing columns: ['TIMESTAMP']")
+    missing_cols = sorted(set(input_params) - set(columns))
+    if missing_cols:
+        raise IngestionError(f"Missing columns: {missing_cols}")
+
+
+def to_status_codes(values: np.ndarray) -> np.ndarray:
+    """Float statuses -> int8 with NA_STATUS for missing and N_STATES for anything uncountable."""
+    with np.errstate(invalid="ignore"):
+        codes = values.astype(np.int8)
+        invalid = (codes != values) | (codes < 0) | (codes >= N_STATES)
+    codes[invalid] = N_STATES
+    codes[np.isnan(values)] = NA_STATUS
+    return codes
+
+
+class MinuteBucketer:
+    """
+    Incremental equivalent of ffill -> resample("1min").first() -> ffill -> fillna(0)
+    for time-ordered chunks of int8 status codes.
+
+    Only the last known state of each conveyor and the still-open minute are
+    carried between chunks; closed minutes are stored as one int8 row each.
+    """
+
+    def __init__(self, n_cols: int):
+        self.n_cols = n_cols
+        self.state = np.full(n_cols, NA_STATUS, dtype=np.int8)
+        self.open_minute = None
+        self.open_snapshot = None
+        self.last_ns = None
+        self._minutes = []
+        self._snapshots = []
+
+    def push(self, minutes: np.ndarray, codes: np.ndarray):
+        """minutes: int64 minute index per row (non-decreasing), codes: (n, n_cols) int8."""
+        n = len(minutes)
+        if n == 0:
+            return
+
+        filled = _ffill(codes, self.state)
+        self.state = filled[-1].copy()
+        # after the carry-in ffill, missing values only remain as a per-column prefix
+        na_prefix = (filled == NA_STATUS).sum(axis=0)
+
+        is_start = np.empty(n, dtype=bool)
+        is_start[0] = minutes[0] != self.open_minute
+        is_start[1:] = minutes[1:] != minutes[:-1]
+        starts = np.flatnonzero(is_start)
+        first_start = starts[0] if len(starts) else n
+
+        if self.open_minute is not None:
+            # rows continuing the open minute can still fill conveyors it has not seen
+            self._fill_first_seen(self.open_snapshot[None, :], np.array([0]), np.array([first_start]), filled, na_prefix)
+            if len(starts):
+                self._emit(np.array([self.open_minute]), self.open_snapshot[None, :])
+                self.open_minute = None
+
+        if not len(starts):
+            return
+
+        ends = np.append(starts[1:], n)
+        snapshots = filled[starts].copy()
+        self._fill_first_seen(snapshots, starts, ends, filled, na_prefix)
+
+        self._emit(minutes[starts[:-1]], snapshots[:-1])
+        self.open_minute = minutes[starts[-1]]
+        self.open_snapshot = snapshots[-1]
+
+    @staticmethod
+    def _fill_first_seen(snapshots, starts, ends, filled, na_prefix):
+        """resample().first() takes the first non-null value of a bucket, even when it appears after the bucket's first row."""
+        missing = snapshots == NA_STATUS
+        if not missing.any():
+            return
+        rows, cols = np.nonzero(missing)
+        first_seen = na_prefix[cols]
+        hit = (first_seen >= starts[rows]) & (first_seen < ends[rows])
+        snapshots[rows[hit], cols[hit]] = filled[first_seen[hit], cols[hit]]
+
+    def carried(self, conveyor_cols) -> dict:
+        """
+        JSON-serializable state a later export of the same line continues from:
+        the last status of every conveyor and the open minute, by conveyor name.
+        """
+        return {
+            "conveyors": list(conveyor_cols),
+            "state": self.state.tolist(),
+            "open_minute": None if self.open_minute is None else int(self.open_minute),
+            "open_snapshot": None if self.open_snapshot is None else self.open_snapshot.tolist(),
+            "last_ns": None if self.last_ns is None else int(self.last_ns)
+        }
+
+    @classmethod
+    def continuing(cls, conveyor_cols, carried: dict) -> "MinuteBucketer":
+        """Bucketer whose next rows continue the export carried() was taken after."""
+        bucketer = cls(len(conveyor_cols))
+        position = {name: i for i, name in enumerate(carried["conveyors"])}
+
+        def by_name(values):
+            return np.array([values[position[c]] if c in position else NA_STATUS for c in conveyor_cols], dtype=np.int8)
+
+        bucketer.state = by_name(carried["state"])
+        if carried["open_minute"] is not None:
+            bucketer.open_minute = carried["open_minute"]
+            bucketer.open_snapshot = by_name(carried["open_snapshot"])
+        bucketer.last_ns = carried["last_ns"]
+        return bucketer
+
+    def copy(self) -> "MinuteBucketer":
+        """Independent bucketer in the same state; emitted minutes are shared, they are never modified."""
+        other = copy.copy(self)
+        other.state = self.state.copy()
+        if self.open_snapshot is not None:
+            other.open_snapshot = self.open_snapshot.copy()
+        other._minutes = list(self._minutes)
+        other._snapshots = list(self._snapshots)
+        return other
+
+    def _emit(self, minutes, snapshots):
+        self._minutes.append(np.asarray(minutes, dtype=np.int64))
+        self._snapshots.append(np.asarray(snapshots, dtype=np.int8))
+
+    def finish(self):
+        """Close the open minute and expand to a gap-free per-minute (minutes, statuses) pair."""
+        if self.open_minute is not None:
+            self._emit(np.array([self.open_minute]), self.open_snapshot[None, :])
+            self.open_minute = None
+
+        if not self._minutes:
+            return np.empty(0, dtype=np.int64), np.empty((0, self.n_cols), dtype=np.int8)
+
+        minutes = np.concatenate(self._minutes)
+        snapshots = np.concatenate(self._snapshots)
+        # empty minutes repeat the previous minute, unknown conveyors count as 0
+        all_minutes = np.arange(minutes[0], minutes[-1] + 1, dtype=np.int64)
+        idx = np.searchsorted(minutes, all_minutes, side="right") - 1
+        statuses = snapshots[idx]
+        statuses[statuses == NA_STATUS] = 0
+        return all_minutes, statuses
+
+
+def _ffill(codes: np.ndarray, carry: np.ndarray) -> np.ndarray:
+    """Column-wise forward fill of NA_STATUS, seeded with the carried-in state."""
+    n = codes.shape[0]
+    valid = codes != NA_STATUS
+    idx = np.where(valid, np.arange(n)[:, None], -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = np.take_along_axis(codes, np.maximum(idx, 0), axis=0)
+    leading = idx < 0
+    if leading.any():
+        filled[leading] = np.broadcast_to(carry, codes.shape)[leading]
+    return filled
+
+
+def read_conveyor_csv(source, timestamp_unit="s", block_size=DEFAULT_BLOCK_SIZE, preview_rows=5, carried=None) -> IngestResult:
+    """
+    Stream a raw conveyor export into a per-minute status frame.
+
+    The header is validated before any row is parsed. The body is parsed by
+    pyarrow in blocks of ``block_size`` bytes with statuses typed as float32 and
+    immediately encoded as int8, then ffill + minute bucketing is applied block
+    by block, so memory is bounded by the block size plus one int8 row per
+    minute of history. Exports that are not time-ordered fall back to a single
+    in-memory sort.
+
+    result.state can continue the read on rows appended to the same export
+    (see resume_conveyor_csv). carried (result.carried of the previous export
+    of the line) continues the minutes of that export, as if both were one
+    file; it is ignored when this export starts before the carried rows end,
+    e.g. a re-upload of the same export that grew.
+    """
+    columns = read_header(source)
+    validate_header(columns)
+
+    conveyor_cols = [c for c in columns if c.startswith(STATUS_PREFIX)]
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=["TIMESTAMP"] + conveyor_cols,
+        column_types={"TIMESTAMP": pa.float64(), **{c: pa.float32() for c in conveyor_cols}},
+    )
+    read_options = pa_csv.ReadOptions(block_size=block_size)
+
+    bucketer = _bucketer(conveyor_cols, carried)
+    preview = None
+    rows_read = 0
+    chunks = 0
+
+    try:
+        reader = pa_csv.open_csv(_as_arrow_source(source), read_options=read_options, convert_options=convert_options)
+        for batch in reader:
+            if preview is None:
+                preview = batch.slice(0, preview_rows).to_pandas()
+            rows_read += batch.num_rows
+            chunks += 1
+            pushed = _push_batch(bucketer, batch, conveyor_cols, timestamp_unit)
+            if not pushed and carried is not None and chunks == 1:
+                logger.info("Upload starts before the carried rows end, reading it on its own")
+                bucketer, carried = MinuteBucketer(len(conveyor_cols)), None
+                pushed = _push_batch(bucketer, batch, conveyor_cols, timestamp_unit)
+            if not pushed:
+                logger.info("Upload is not time ordered, falling back to an in-memory sort")
+                return _read_unordered(source, conveyor_cols, convert_options, timestamp_unit, preview_rows, carried)
+    except pa.ArrowInvalid as e:
+        raise IngestionError(f"Could not parse CSV: {e}") from e
+
+    state = ReaderState(columns, conveyor_cols, bucketer.copy(), rows_read, chunks, preview)
+    return _build_result(bucketer, conveyor_cols, preview, rows_read, chunks, state)
+
+
+def resume_conveyor_csv(state: ReaderState, tail, timestamp_unit="s", block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Continue read_conveyor_csv on rows appended to an export it has read.
+
+    tail holds only the new rows (no header) and must start on a row boundary.
+    The open minute and the last state of every conveyor are taken from state,
+    so the result is identical to reading the whole export again. Returns None
+    when the new rows go back in time; the caller then reads the whole export.
+    """
+    bucketer = state.bucketer.copy()
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=["TIMESTAMP"] + state.conveyor_cols,
+        column_types={"TIMESTAMP": pa.float64(), **{c: pa.float32() for c in state.conveyor_cols}},
+    )
+    read_options = pa_csv.ReadOptions(block_size=block_size, column_names=state.columns)
+    rows_read, chunks = state.rows_read, state.chunks
+
+    # pyarrow rejects a body without rows; appending only line breaks changes nothing
+    pos = tail.tell()
+    has_rows = bool(tail.read(block_size).strip())
+    tail.seek(pos)
+    if has_rows:
+        try:
+            reader = pa_csv.open_csv(_as_arrow_source(tail), read_options=read_options, convert_options=convert_options)
+            for batch in reader:
+                rows_read += batch.num_rows
+                chunks += 1
+                if not _push_batch(bucketer, batch, state.conveyor_cols, timestamp_unit):
+                    logger.info("Appended rows are not time ordered, the export has to be read again")
+                    return None
+        except pa.ArrowInvalid as e:
+            raise IngestionError(f"Could not parse CSV: {e}") from e
+
+    new_state = ReaderState(state.columns, state.conveyor_cols, bucketer.copy(), rows_read, chunks, state.preview)
+    return _build_result(bucketer, state.conveyor_cols, state.preview, rows_read, chunks, new_state)
+
+
+def _push_batch(bucketer: MinuteBucketer, batch, conveyor_cols, timestamp_unit) -> bool:
+    """Bucket one record batch, False when it goes back in time relative to earlier batches."""
+    ts = pd.to_datetime(
+        batch.column("TIMESTAMP").to_numpy(zero_copy_only=False),
+        unit=timestamp_unit,
+        errors="coerce"
+    ).asi8
+    valid = ts != np.iinfo(np.int64).min
+    if not valid.all():
+        # unparseable timestamps sort last and never reach a minute bucket
+        ts = ts[valid]
+
+    if len(ts) == 0:
+        return True
+
+    order = None
+    if (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+    if bucketer.last_ns is not None and ts[0] < bucketer.last_ns:
+        return False
+    bucketer.last_ns = ts[-1]
+
+    values = np.column_stack([
+        batch.column(c).to_numpy(zero_copy_only=False) for c in conveyor_cols
+    ])
+    if not valid.all():
+        values = values[valid]
+    if order is not None:
+        values = values[order]
+
+    bucketer.push(ts // 60_000_000_000, to_status_codes(values))
+    return True
+
+
+def _bucketer(conveyor_cols, carried) -> MinuteBucketer:
+    if carried is None:
+        return MinuteBucketer(len(conveyor_cols))
+    return MinuteBucketer.continuing(conveyor_cols, carried)
+
+
+def _read_unordered(source, conveyor_cols, convert_options, timestamp_unit, preview_rows, carried=None) -> IngestResult:
+    if not isinstance(source, (str, Path)):
+        source.seek(0)
+    table = pa_csv.read_csv(_as_arrow_source(source), convert_options=convert_options)
+    bucketer = _bucketer(conveyor_cols, carried)
+    batch = table.combine_chunks().to_batches()[0] if table.num_rows else None
+    if batch is not None and not _push_batch(bucketer, batch, conveyor_cols, timestamp_unit):
+        bucketer = MinuteBucketer(len(conveyor_cols))
+        _push_batch(bucketer, batch, conveyor_cols, timestamp_unit)
+    preview = table.slice(0, preview_rows).to_pandas()
+    return _build_result(bucketer, conveyor_cols, preview, table.num_rows, 1)
+
+
+def _build_result(bucketer, conveyor_cols, preview, rows_read, chunks, state=None) -> IngestResult:
+    carried = bucketer.carried(conveyor_cols)
+    minutes, statuses = bucketer.finish()
+    resampled = pd.DataFrame(statuses, columns=conveyor_cols)
+    resampled.insert(0, "TIMESTAMP", pd.to_datetime(minutes * 60_000_000_000))
+    if preview is None:
+        preview = pd.DataFrame(columns=["TIMESTAMP"] + conveyor_cols)
+    logger.info(f"Ingested {rows_read} rows in {chunks} chunks into {len(resampled)} minutes")
+    return IngestResult(resampled, preview, rows_read, chunks, conveyor_cols, state, carried)
+
+
+def _as_arrow_source(source):
+    if isinstance(source, (str, Path)):
+        return str(source)
+    if isinstance(source, io.IOBase) or hasattr(source, "read"):
+        return pa.PythonFile(source, mode="r")
+    return source
@@ -0,0 +1,263 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from inference.constants import BASE_COLS, INPUT_PARAMS
+from inference.features import N_STATES
+from .csv_reader import (
+    DEFAULT_BLOCK_SIZE, NA_STATUS, STATUS_PREFIX, IngestionError,
+    _as_arrow_source, read_header, to_status_codes, validate_header
+)
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+EVENT_COLUMNS = ["TIMESTAMP", "CONVEYOR_ID", "STATUS"]
+MINUTE_NS = 60_000_000_000
+
+
+def is_event_log(columns) -> bool:
+    return set(EVENT_COLUMNS) <= set(columns)
+
+
+def wide_to_events(data: pd.DataFrame, timestamp_unit="s") -> pd.DataFrame:
+    """
+    Convert the wide export (one column per conveyor, mostly empty) into an
+    event log with one row per non-empty cell.
+
+    Rows without any status are kept as heartbeat events (CONVEYOR_ID NaN,
+    STATUS -1) only when they open a minute, because the batch resample takes
+    the state at the first row of each minute.
+    """
+    conveyor_cols = [c for c in data.columns if c.startswith(STATUS_PREFIX)]
+    ts = pd.to_datetime(data["TIMESTAMP"], unit=timestamp_unit, errors="coerce").to_numpy()
+    values = data[conveyor_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    keep = ~np.isnat(ts)
+    ts, values = ts[keep], values[keep]
+    order = np.argsort(ts, kind="stable")
+    ts, values = ts[order], values[order]
+    return _rows_to_events(ts.astype(np.int64), to_status_codes(values), conveyor_cols)
+
+
+def _rows_to_events(ts_ns: np.ndarray, codes: np.ndarray, conveyor_cols: list, prev_minute=None) -> pd.DataFrame:
+    has_status = codes != NA_STATUS
+    rows, cols = np.nonzero(has_status)
+
+    minutes = ts_ns // MINUTE_NS
+    opens_minute = np.ones(len(ts_ns), dtype=bool)
+    if len(ts_ns) and prev_minute is not None:
+        opens_minute[0] = minutes[0] != prev_minute
+    opens_minute[1:] = minutes[1:] != minutes[:-1]
+    heartbeat_rows = np.flatnonzero(~has_status.any(axis=1) & opens_minute)
+
+    event_rows = np.concatenate([rows, heartbeat_rows])
+    event_cols = np.concatenate([cols, np.full(len(heartbeat_rows), -1)])
+    event_status = np.concatenate([codes[rows, cols], np.full(len(heartbeat_rows), NA_STATUS, dtype=np.int8)])
+    # back to row order; within a row the column order is preserved
+    order = np.lexsort((event_cols, event_rows))
+
+    return pd.DataFrame({
+        "TIMESTAMP": pd.to_datetime(ts_ns[event_rows[order]]),
+        "CONVEYOR_ID": pd.Categorical.from_codes(event_cols[order], categories=conveyor_cols),
+        "STATUS": event_status[order]
+    })
+
+
+def event_counts(events: pd.DataFrame, conveyors=None) -> pd.DataFrame:
+    """
+    Per-minute num_carts_full/empty/maintenance straight from state-change events.
+
+    Every event moves one conveyor from its previous bin to its new bin; a
+    cumulative sum of those +1/-1 moves gives the running counts after each
+    event without ever building the conveyor x minute matrix. Conveyors that
+    have not reported yet count as full, like the fillna(0) in the batch path.
+    Minute values follow resample().first(): the counts after the events at
+    the first timestamp of the minute, plus any conveyor that reports for the
+    first time later in that minute. Empty minutes repeat the previous one.
+    """
+    events = events.dropna(subset=["TIMESTAMP"])
+    ts_ns = events["TIMESTAMP"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    order = np.argsort(ts_ns, kind="stable")
+    ts_ns = ts_ns[order]
+
+    conveyor_ids = events["CONVEYOR_ID"]
+    if not isinstance(conveyor_ids.dtype, pd.CategoricalDtype):
+        conveyor_ids = conveyor_ids.astype("category")
+    conv = conveyor_ids.cat.codes.to_numpy()[order].astype(np.int64)
+    universe = list(INPUT_PARAMS if conveyors is None else conveyors)
+    n_conveyors = len(set(universe) | set(conveyor_ids.cat.categories[np.unique(conv[conv >= 0])]))
+
+    status = events["STATUS"].to_numpy()[order]
+    if status.dtype != np.int8:
+        status = to_status_codes(status.astype(np.float64))
+    real = (conv >= 0) & (status != NA_STATUS)
+
+    if len(ts_ns) == 0:
+        return pd.DataFrame(columns=["TIMESTAMP"] + BASE_COLS)
+
+    # previous status of the same conveyor, -1 when it has not reported before
+    real_idx = np.flatnonzero(real)
+    by_conveyor = real_idx[np.argsort(conv[real_idx], kind="stable")]
+    prev = np.full(len(ts_ns), NA_STATUS, dtype=np.int8)
+    same = conv[by_conveyor[1:]] == conv[by_conveyor[:-1]]
+    prev[by_conveyor[1:][same]] = status[by_conveyor[:-1][same]]
+    first_seen = real & (prev == NA_STATUS)
+
+    # +1 into the new bin, -1 out of the old one (unknown conveyors sit in "full")
+    delta = np.zeros((len(ts_ns), N_STATES + 1), dtype=np.int32)
+    np.add.at(delta, (real_idx, status[real_idx]), 1)
+    np.add.at(delta, (real_idx, np.where(prev[real_idx] == NA_STATUS, 0, prev[real_idx])), -1)
+    running = np.cumsum(delta, axis=0)
+    running[:, 0] += n_conveyors
+
+    minutes = ts_ns // MINUTE_NS
+    minute_starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    # state after every event sharing the minute's first timestamp
+    at = np.searchsorted(ts_ns, ts_ns[minute_starts], side="right") - 1
+    snapshots = running[at].copy()
+
+    late = np.flatnonzero(first_seen & (np.arange(len(ts_ns)) > np.repeat(at, np.diff(np.r_[minute_starts, len(ts_ns)]))))
+    if len(late):
+        bucket = np.searchsorted(minute_starts, late, side="right") - 1
+        np.add.at(snapshots, bucket, delta[late])
+
+    event_minutes = minutes[minute_starts]
+    all_minutes = np.arange(event_minutes[0], event_minutes[-1] + 1, dtype=np.int64)
+    idx = np.searchsorted(event_minutes, all_minutes, side="right") - 1
+    counts = snapshots[idx, :N_STATES]
+
+    df_counts = pd.DataFrame(counts.astype(np.int64), columns=BASE_COLS)
+    df_counts.insert(0, "TIMESTAMP", pd.to_datetime(all_minutes * MINUTE_NS))
+    return df_counts
+
+
+def carried_state(events: pd.DataFrame) -> dict:
+    """
+    MinuteBucketer.carried() after an event log: the last status of every
+    conveyor that reported and, for the last minute, the status of each at
+    the minute's first timestamp (or its first status, when it first reports
+    later in that minute), so the next export can continue from it.
+    """
+    events = events.dropna(subset=["TIMESTAMP"])
+    if events.empty:
+        return None
+    ts_ns = events["TIMESTAMP"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+    order = np.argsort(ts_ns, kind="stable")
+    ts_ns = ts_ns[order]
+    conveyor_ids = events["CONVEYOR_ID"].to_numpy()[order]
+    status = events["STATUS"].to_numpy()[order]
+    real = pd.notna(conveyor_ids) & (status != NA_STATUS)
+
+    open_minute = int(ts_ns[-1] // MINUTE_NS)
+    minute_first_ts = ts_ns[np.searchsorted(ts_ns, open_minute * MINUTE_NS)]
+    by_conveyor = pd.Series(status[real].astype(np.int64), index=conveyor_ids[real])
+    before = ts_ns[real] <= minute_first_ts
+    last = by_conveyor.groupby(level=0, sort=True).last()
+    # everything after the minute's first timestamp is in the open minute
+    at_minute_start = by_conveyor[before].groupby(level=0).last().combine_first(by_conveyor[~before].groupby(level=0).first())
+
+    return {
+        "conveyors": [str(c) for c in last.index],
+        "state": last.tolist(),
+        "open_minute": open_minute,
+        "open_snapshot": at_minute_start.reindex(last.index, fill_value=NA_STATUS).astype(np.int64).tolist(),
+        "last_ns": int(ts_ns[-1])
+    }
+
+
+def with_carried(events: pd.DataFrame, carried: dict) -> pd.DataFrame:
+    """
+    Prefix the events of a later export with events that put every conveyor
+    in its carried state (carried_state or MinuteBucketer.carried), so
+    event_counts continues the previous export from its open minute as if
+    both were one log. Returned unchanged when carried is None or the events
+    start before the carried rows end (a re-upload of a grown export).
+    """
+    if carried is None or carried["open_minute"] is None:
+        return events
+    ts = events["TIMESTAMP"].dropna()
+    if len(ts) and ts.min().value < carried["last_ns"]:
+        return events
+
+    minute_start = carried["open_minute"] * MINUTE_NS
+    rows = []
+    for conveyor, code, start_code in zip(carried["conveyors"], carried["state"], carried["open_snapshot"]):
+        # the open minute's snapshot at its first timestamp, then the moves after it
+        if start_code != NA_STATUS:
+            rows.append((minute_start, conveyor, start_code))
+        if code != NA_STATUS and code != start_code:
+            rows.append((minute_start + 1, conveyor, code))
+    prefix = pd.DataFrame(rows, columns=EVENT_COLUMNS)
+    prefix["TIMESTAMP"] = pd.to_datetime(prefix["TIMESTAMP"].astype(np.int64))
+    prefix["STATUS"] = prefix["STATUS"].astype(np.int8)
+
+    combined = pd.concat([prefix, events.astype({"CONVEYOR_ID": object})], ignore_index=True)
+    combined["CONVEYOR_ID"] = combined["CONVEYOR_ID"].astype("category")
+    return combined
+
+
+def read_event_log(source, timestamp_unit="s", block_size=DEFAULT_BLOCK_SIZE) -> pd.DataFrame:
+    """
+    Read an event log CSV (TIMESTAMP, CONVEYOR_ID, STATUS), or a wide conveyor
+    export which is converted to events block by block.
+    """
+    columns = read_header(source)
+    if is_event_log(columns):
+        table = pa_csv.read_csv(
+            _as_arrow_source(source),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=EVENT_COLUMNS,
+                column_types={"TIMESTAMP": pa.float64(), "CONVEYOR_ID": pa.dictionary(pa.int32(), pa.string()), "STATUS": pa.float32()},
+                strings_can_be_null=True
+            )
+        )
+        events = table.to_pandas()
+        events["TIMESTAMP"] = pd.to_datetime(events["TIMESTAMP"], unit=timestamp_unit, errors="coerce")
+        events["STATUS"] = to_status_codes(events["STATUS"].to_numpy(dtype=np.float64, na_value=np.nan))
+        # rows without a conveyor are heartbeats
+        events.loc[events["CONVEYOR_ID"].isna(), "STATUS"] = NA_STATUS
+        return events
+
+    validate_header(columns)
+    conveyor_cols = [c for c in columns if c.startswith(STATUS_PREFIX)]
+    reader = pa_csv.open_csv(
+        _as_arrow_source(source),
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=["TIMESTAMP"] + conveyor_cols,
+            column_types={"TIMESTAMP": pa.float64(), **{c: pa.float32() for c in conveyor_cols}}
+        )
+    )
+
+    parts = []
+    prev_minute = None
+    try:
+        for batch in reader:
+            ts = pd.to_datetime(
+                batch.column("TIMESTAMP").to_numpy(zero_copy_only=False),
+                unit=timestamp_unit,
+                errors="coerce"
+            ).asi8
+            values = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in conveyor_cols])
+            keep = ts != np.iinfo(np.int64).min
+            order = np.argsort(ts[keep], kind="stable")
+            ts_sorted = ts[keep][order]
+            parts.append(_rows_to_events(ts_sorted, to_status_codes(values[keep][order]), conveyor_cols, prev_minute))
+            if len(ts_sorted):
+                prev_minute = ts_sorted[-1] // MINUTE_NS
+    except pa.ArrowInvalid as e:
+        raise IngestionError(f"Could not parse CSV: {e}") from e
+
+    if not parts:
+        return pd.DataFrame({c: [] for c in EVENT_COLUMNS})
+
+    events = pd.concat(parts, ignore_index=True)
+    events["CONVEYOR_ID"] = events["CONVEYOR_ID"].astype(pd.CategoricalDtype(conveyor_cols))
+    if not events["TIMESTAMP"].is_monotonic_increasing:
+        events = events.sort_values("TIMESTAMP", kind="stable").reset_index(drop=True)
+    logger.info(f"Read {len(events)} events from wide export ({len(conveyor_cols)} conveyors)")
+    return events
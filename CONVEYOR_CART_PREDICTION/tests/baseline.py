@@ -0,0 +1,47 @@
+"""
+The original pandas path of app.py (before the NumPy engines), kept as the
+reference the optimized inference code is checked against.
+"""
+import pandas as pd
+
+from inference.constants import BASE_COLS
+from benchmarks.synthetic import generate_wide
+
+
+def synthetic_export(duration="2D", rate=20, seed=0) -> pd.DataFrame:
+    """A small wide export from the synthetic generator, with epoch-second timestamps."""
+    return generate_wide(duration=duration, rate=rate, seed=seed)
+
+
+def resample(data: pd.DataFrame) -> pd.DataFrame:
+    """Converted, sorted export -> one row per minute."""
+    return (
+        data
+        .ffill()
+        .set_index("TIMESTAMP")
+        .resample("1min")
+        .first()
+        .ffill()
+        .fillna(0).reset_index()
+    )
+
+
+def counts(df_resampled: pd.DataFrame) -> pd.DataFrame:
+    df_resampled = df_resampled.copy()
+    conveyor_cols = [col for col in df_resampled.columns if col.startswith("CONVEYOR_STATUS")]
+    df_resampled["num_carts_full"] = (df_resampled[conveyor_cols] == 0).sum(axis=1)
+    df_resampled["num_carts_empty"] = (df_resampled[conveyor_cols] == 1).sum(axis=1)
+    df_resampled["num_carts_maintenance"] = (df_resampled[conveyor_cols] == 2).sum(axis=1)
+    return df_resampled
+
+
+def create_cart_features(df, roll_window):
+    df = df.sort_values("TIMESTAMP").reset_index(drop=True).copy()
+    for col in BASE_COLS:
+        df[f"{col}_lag1"] = df[col].shift(1)
+    for col in BASE_COLS:
+        df[f"{col}_roll_mean"] = df[col].rolling(roll_window).mean()
+        df[f"{col}_roll_std"] = df[col].rolling(roll_window).std()
+    for col in BASE_COLS:
+        df[f"{col}_diff1"] = df[col].diff(1)
+    return df.dropna().reset_index(drop=True)
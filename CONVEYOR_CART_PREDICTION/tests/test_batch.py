@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import Model, predict_lines
+from inference.constants import HORIZON_WINDOWS
+
+SAMPLE = Path(__file__).resolve().parents[1] / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+@pytest.fixture(scope="module")
+def lines():
+    data = pd.read_csv(SAMPLE)
+    # a few days per line keeps the full-history scoring quick
+    days = (data["TIMESTAMP"] - data["TIMESTAMP"].iloc[0]) // 86400
+    return {"A": data[days < 2].reset_index(drop=True), "B": data[days < 4].reset_index(drop=True)}
+
+
+@pytest.mark.parametrize("options", [{"multi_horizon": True}, {"backend": "numpy"}])
+def test_predict_lines_matches_model(lines, options):
+    model = Model(**options)
+    result = predict_lines(lines, mode="full", max_workers=1, model=model)
+
+    assert result["status"] == "success" and not result["errors"]
+    predictions = result["predictions"]
+    for line_id, df in lines.items():
+        direct = Model(**options).predict(df.copy(), mode="full")
+        for mins in HORIZON_WINDOWS:
+            rows = predictions[(predictions["LINE_ID"] == line_id) & (predictions["HORIZON"] == mins)]
+            ts, preds = direct["plots"][mins]
+            np.testing.assert_array_equal(rows["TIMESTAMP"].to_numpy(), ts.to_numpy())
+            np.testing.assert_array_equal(rows["PREDICTION"].to_numpy(), np.rint(preds).astype(int))
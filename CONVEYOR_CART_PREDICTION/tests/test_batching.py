@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import MicroBatcher, Model, get_registry
+from inference.constants import HORIZON_WINDOWS
+
+SAMPLE = Path(__file__).resolve().parents[1] / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+@pytest.fixture(scope="module")
+def data():
+    return pd.read_csv(SAMPLE)
+
+
+@pytest.mark.parametrize("mode", ["latest", "full"])
+def test_multi_horizon_through_batcher(data, mode):
+    batcher = MicroBatcher(HORIZON_WINDOWS, registry=get_registry(), window_ms=1)
+    batched = Model(multi_horizon=True, batcher=batcher).predict(data, mode=mode)
+    direct = Model(multi_horizon=True).predict(data, mode=mode)
+
+    assert batched["status"] == "success", batched.get("message")
+    assert batched["predictions"] == direct["predictions"]
+    for mins, (_, preds) in direct["plots"].items():
+        np.testing.assert_array_equal(batched["plots"][mins][1], preds)
+    assert batcher.stats["multi"]["requests"] == 1
+
+
+@pytest.mark.parametrize("backend", ["numpy", "auto"])
+def test_batcher_uses_compiled_backend(data, backend, monkeypatch):
+    registry = get_registry()
+    used = []
+    get_compiled = registry.get_compiled
+    monkeypatch.setattr(registry, "get_compiled", lambda h: used.append(h) or get_compiled(h))
+
+    batcher = MicroBatcher(HORIZON_WINDOWS, registry=registry, window_ms=1, backend=backend)
+    batched = Model(batcher=batcher, backend=backend).predict(data, mode="latest")
+    direct = Model().predict(data, mode="latest")
+
+    assert batched["predictions"] == direct["predictions"]
+    assert sorted(used) == sorted(HORIZON_WINDOWS)
+
+
+def test_model_rejects_other_backend_than_its_batcher():
+    with pytest.raises(ValueError, match="batcher"):
+        Model(batcher=MicroBatcher(HORIZON_WINDOWS, backend="xgboost"), backend="numpy")
+
+
+def test_stats_snapshot_is_a_copy():
+    batcher = MicroBatcher(HORIZON_WINDOWS, registry=get_registry(), window_ms=0).start()
+    X = np.zeros((2, 15))
+    batcher.predict_many({h: X for h in HORIZON_WINDOWS})
+    snapshot = batcher.stats_snapshot()
+    batcher.predict_many({h: X for h in HORIZON_WINDOWS})
+
+    assert {h: s["rows"] for h, s in snapshot.items()} == {h: 2 for h in HORIZON_WINDOWS}
+    assert batcher.stats_snapshot()[15]["rows"] == 4
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from inference import Model, PredictionCache, predict_upload
+
+from . import baseline
+
+
+@pytest.fixture(scope="module")
+def export():
+    return baseline.synthetic_export(seed=8).to_csv(index=False).encode()
+
+
+def head(data: bytes, fraction: float) -> bytes:
+    """The first rows of an export, cut at a line end."""
+    return data[:data.rindex(b"\n", 0, int(len(data) * fraction)) + 1]
+
+
+def assert_same_output(actual, expected):
+    assert actual["predictions"] == expected["predictions"]
+    for mins, (ts, preds) in expected["plots"].items():
+        assert np.array_equal(actual["plots"][mins][0], ts)
+        assert np.array_equal(actual["plots"][mins][1], preds)
+
+
+def test_appended_upload_extends_cached_predictions(export):
+    cache = PredictionCache()
+    assert predict_upload(head(export, 0.6), cache, mode="full")["cache"] == "miss"
+    extended = predict_upload(export, cache, mode="full")
+    fresh = predict_upload(export, PredictionCache(), mode="full")
+
+    assert extended["cache"] == "prefix"
+    assert_same_output(extended, fresh)
+    assert predict_upload(export, cache, mode="full")["cache"] == "hit"
+    assert cache.stats == {"hits": 1, "prefix_hits": 1, "misses": 1, "spilled": 0}
+
+
+def test_spilled_entries_load_back(export, tmp_path):
+    from ingestion import wide_to_events
+
+    cache = PredictionCache(max_entries=1, spill_dir=tmp_path)
+    first = predict_upload(head(export, 0.6), cache, mode="full")
+    events = wide_to_events(baseline.synthetic_export(seed=9))
+    events["TIMESTAMP"] = events["TIMESTAMP"].astype("int64") // 10**9
+    events = events.to_csv(index=False).encode()
+    event_output = predict_upload(events, cache, mode="full")
+    predict_upload(export, cache, mode="latest")
+    # the latest-mode upload loads the first entry back to check it as a prefix, spilling again
+    assert cache.stats["spilled"] >= 2
+    assert {p.suffix for p in tmp_path.iterdir()} == {".npz"}
+
+    # a new process finds the spilled files and continues the cached reader state
+    reopened = PredictionCache(spill_dir=tmp_path)
+    hit = predict_upload(head(export, 0.6), reopened, mode="full")
+    assert hit["cache"] == "hit"
+    assert_same_output(hit, first)
+    assert hit["preview"].equals(first["preview"])
+    extended = predict_upload(export, reopened, mode="full")
+    assert extended["cache"] == "prefix"
+    assert_same_output(extended, predict_upload(export, PredictionCache(), mode="full"))
+
+    event_hit = predict_upload(events, reopened, mode="full")
+    assert event_hit["cache"] == "hit"
+    assert_same_output(event_hit, event_output)
+    assert event_hit["preview"].equals(event_output["preview"])
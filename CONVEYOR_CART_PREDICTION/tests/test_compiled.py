@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import CompiledEnsemble, Model, get_registry
+from inference.constants import HORIZON_WINDOWS, MULTI_HORIZON
+
+from . import baseline
+
+KEYS = list(HORIZON_WINDOWS) + ([MULTI_HORIZON] if get_registry().model_path(MULTI_HORIZON).exists() else [])
+
+
+@pytest.fixture(scope="module")
+def data():
+    return baseline.synthetic_export(seed=7)
+
+
+@pytest.fixture(scope="module")
+def features(data):
+    data = data.copy()
+    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"], unit="s")
+    resampled = baseline.resample(data.sort_values("TIMESTAMP"))
+    out = dict(Model().prepare_resampled(resampled.copy(), "full")["features"])
+    if MULTI_HORIZON in KEYS:
+        out.update(Model(multi_horizon=True).prepare_resampled(resampled.copy(), "full")["features"])
+    return out
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_compiled_matches_xgboost(features, key):
+    booster = get_registry().get(key)
+    compiled = CompiledEnsemble.from_booster(booster)
+    X = np.asarray(features[key], dtype=np.float32)
+    # missing values take each split's default direction
+    X_nan = X.copy()
+    X_nan[np.random.default_rng(0).random(X.shape) < 0.05] = np.nan
+
+    for x in (X, X_nan):
+        assert np.allclose(compiled.predict(x), booster.predict(x), rtol=1e-6, atol=1e-5)
+    # single rows go through the generated row function
+    for x in (X[-3:], X_nan[-3:]):
+        for row in x:
+            assert np.allclose(compiled.predict(row[None, :]), booster.predict(row[None, :]), rtol=1e-6, atol=1e-5)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "auto"])
+@pytest.mark.parametrize("mode", ["latest", "full"])
+def test_model_backends_agree(data, backend, mode):
+    expected = Model().predict(data.copy(), mode=mode)
+    actual = Model(backend=backend).predict(data.copy(), mode=mode)
+    assert actual["predictions"] == expected["predictions"]
+    for mins, (ts, preds) in expected["plots"].items():
+        assert np.array_equal(actual["plots"][mins][0], ts)
+        assert np.allclose(actual["plots"][mins][1], preds, rtol=1e-6, atol=1e-5)
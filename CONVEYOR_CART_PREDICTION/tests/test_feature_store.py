@@ -0,0 +1,69 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore, append_upload
+from ingestion import read_event_log
+
+SAMPLE = Path(__file__).resolve().parents[1] / "EDA_Training_files" / "data" / "raw_conveyor_cart_data.csv"
+
+
+def export(header, rows, kind):
+    data = b"\n".join([header, *rows]) + b"\n"
+    if kind == "events":
+        events = read_event_log(io.BytesIO(data))
+        events["TIMESTAMP"] = events["TIMESTAMP"].astype("int64") // 10**9
+        data = events.to_csv(index=False).encode()
+    return data
+
+
+def assert_same_store(store, expected):
+    got, want = store.read(), expected.read()
+    assert got.num_rows == want.num_rows
+    for column in want.column_names:
+        if column.startswith("features"):
+            np.testing.assert_array_equal(FeatureStore.matrix(got, column), FeatureStore.matrix(want, column))
+        else:
+            assert got.column(column).equals(want.column(column)), column
+
+
+@pytest.fixture(scope="module")
+def sample():
+    raw = SAMPLE.read_bytes()
+    header, *rows = [line for line in raw.split(b"\n") if line]
+    return raw, header, rows
+
+
+@pytest.fixture(scope="module")
+def whole(sample, tmp_path_factory):
+    store = FeatureStore(tmp_path_factory.mktemp("whole"))
+    append_upload(store, sample[0])
+    return store
+
+
+@pytest.mark.parametrize("kinds", [("wide", "wide"), ("events", "events"), ("wide", "events")])
+def test_split_exports_match_one_export(sample, whole, tmp_path, kinds):
+    _, header, rows = sample
+    store = FeatureStore(tmp_path)
+    cut = len(rows) // 2
+    for part, kind in zip((rows[:cut], rows[cut:]), kinds):
+        append_upload(store, export(header, part, kind))
+    assert_same_store(store, whole)
+
+
+def test_growing_reupload_matches_one_export(sample, whole, tmp_path):
+    _, header, rows = sample
+    store = FeatureStore(tmp_path)
+    for end in (len(rows) // 3, len(rows) // 2, len(rows)):
+        append_upload(store, export(header, rows[:end], "wide"))
+    assert_same_store(store, whole)
+
+
+def test_counts_append_drops_carried_state(sample, whole, tmp_path):
+    store = FeatureStore(tmp_path)
+    append_upload(store, sample[0])
+    assert store.carried is not None
+    store.append(whole.counts(whole.read()).tail(1))
+    assert store.carried is None
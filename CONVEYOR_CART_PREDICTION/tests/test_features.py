@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import Model
+from inference.constants import FEATURE_COLS, HORIZON_WINDOWS, INPUT_PARAMS
+from inference.features import build_features, status_counts
+
+from . import baseline
+
+
+@pytest.fixture(scope="module", params=[0, 1])
+def resampled(request):
+    data = baseline.synthetic_export(seed=request.param)
+    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"], unit="s")
+    return baseline.resample(data.sort_values("TIMESTAMP"))
+
+
+def test_status_counts_match_pandas(resampled):
+    expected = baseline.counts(resampled)
+    counts = status_counts(resampled[INPUT_PARAMS].to_numpy())
+    assert np.array_equal(counts, expected[["num_carts_full", "num_carts_empty", "num_carts_maintenance"]].to_numpy())
+
+
+def test_window_features_match_create_cart_features(resampled):
+    df_counts = baseline.counts(resampled)
+    actual = build_features(status_counts(resampled[INPUT_PARAMS].to_numpy()), HORIZON_WINDOWS.values())
+    for roll_window in HORIZON_WINDOWS.values():
+        expected = baseline.create_cart_features(df_counts, roll_window)
+        start, X = actual[roll_window]
+        assert np.array_equal(df_counts["TIMESTAMP"].iloc[start:], expected["TIMESTAMP"])
+        # pandas' online rolling std differs in the last float64 bits, XGBoost reads float32
+        assert np.array_equal(X.astype(np.float32), expected[FEATURE_COLS].to_numpy().astype(np.float32))
+
+
+def test_model_features_match_create_cart_features(resampled):
+    df_counts = baseline.counts(resampled)
+    prepared = Model().prepare_resampled(resampled.copy(), "full")
+    assert prepared["status"] == "success"
+    for mins, roll_window in HORIZON_WINDOWS.items():
+        expected = baseline.create_cart_features(df_counts, roll_window)
+        assert np.array_equal(prepared["timestamps"][mins], expected["TIMESTAMP"])
+        assert np.array_equal(
+            np.asarray(prepared["features"][mins], dtype=np.float32),
+            expected[FEATURE_COLS].to_numpy().astype(np.float32)
+        )
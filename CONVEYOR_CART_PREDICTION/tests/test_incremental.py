@@ -0,0 +1,50 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference.constants import MODEL_DIR, model_filename
+from training.incremental import drift_report, update_horizons
+from training.pipeline import horizon_rows
+
+from . import baseline
+
+
+@pytest.fixture(scope="module")
+def rows():
+    data = baseline.synthetic_export(duration="3D", seed=10)
+    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"], unit="s")
+    resampled = baseline.resample(data.sort_values("TIMESTAMP"))
+    return horizon_rows(resampled, horizons=(15,))
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    shutil.copy(MODEL_DIR / model_filename(15), tmp_path / model_filename(15))
+    return tmp_path
+
+
+def test_drift_report_rejects_empty_rows(rows, model_dir):
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    model.load_model(model_dir / model_filename(15))
+    _, X, y = rows[15]
+    with pytest.raises(ValueError, match="0 reference"):
+        drift_report(model, (X[:0], y[:0]), (X, y))
+    with pytest.raises(ValueError, match="0 new"):
+        drift_report(model, (X, y), (X[:0], y[:0]))
+
+
+def test_no_reference_rows_retrains_from_scratch(rows, model_dir):
+    timestamps = rows[15][0]
+    # every row is new, none falls in the reference period before since
+    since = pd.Timestamp(timestamps[0]) - pd.Timedelta(minutes=1)
+    updated = update_horizons(rows, model_dir=model_dir, since=since, n_threads=1)
+
+    update = updated[15][1]["update"]
+    assert update["mode"] == "full"
+    assert update["reason"] == "no reference rows before the new ones"
+    assert "drift" not in update
+    assert np.isfinite(updated[15][1]["mae"])
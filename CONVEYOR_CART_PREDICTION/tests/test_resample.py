@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference.resample import resample_frame
+
+from . import baseline
+
+
+def converted(data):
+    """What Model.prepare hands to the resample step."""
+    data = data.copy()
+    data["TIMESTAMP"] = pd.to_datetime(data["TIMESTAMP"], unit="s", errors="coerce")
+    return data.sort_values("TIMESTAMP")
+
+
+def assert_same(data):
+    expected = baseline.resample(data)
+    actual = resample_frame(data)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    value_cols = [c for c in data.columns if c != "TIMESTAMP"]
+    assert np.array_equal(actual[value_cols].to_numpy(), expected[value_cols].to_numpy(), equal_nan=True)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_synthetic_export(seed):
+    assert_same(converted(baseline.synthetic_export(seed=seed)))
+
+
+def test_float32_columns():
+    data = baseline.synthetic_export(seed=3)
+    data = data.astype({c: np.float32 for c in data.columns if c != "TIMESTAMP"})
+    assert_same(converted(data))
+
+
+def test_sparse_export_with_empty_minutes():
+    # a handful of events a day leaves most minutes empty
+    assert_same(converted(baseline.synthetic_export(rate=0.5, seed=4)))
+
+
+def test_missing_timestamps():
+    data = baseline.synthetic_export(seed=5)
+    data.loc[data.sample(frac=0.02, random_state=0).index, "TIMESTAMP"] = np.nan
+    assert_same(converted(data))
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+def test_int_columns(gaps):
+    minutes = np.arange(0, 40, 2 if gaps else 1)
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "TIMESTAMP": np.repeat(minutes * 60, 3) + np.tile([5, 20, 50], len(minutes)),
+        "CONVEYOR_STATUS_01": rng.integers(0, 3, 3 * len(minutes)),
+        "CONVEYOR_STATUS_02": rng.integers(0, 3, 3 * len(minutes))
+    })
+    assert_same(converted(data))
+
+
+def test_conveyor_first_seen_late_in_a_minute():
+    data = pd.DataFrame({
+        "TIMESTAMP": [0, 10, 70, 75, 200],
+        "CONVEYOR_STATUS_01": [1.0, np.nan, 0.0, np.nan, 2.0],
+        "CONVEYOR_STATUS_02": [np.nan, np.nan, np.nan, 1.0, np.nan]
+    })
+    assert_same(converted(data))
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inference import Model, StreamingPredictor
+from inference.constants import HORIZON_WINDOWS
+from inference.features import first_valid_row
+
+from . import baseline
+
+
+def streamed(data, **kwargs):
+    predictor = StreamingPredictor(**kwargs)
+    rows = predictor.update_batch(data)
+    return rows + predictor.flush()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_streaming_matches_batch_full_rows(seed):
+    data = baseline.synthetic_export(seed=seed)
+    expected = Model().predict(data.copy(), mode="full")
+    rows = streamed(data)
+
+    for mins, (ts, preds) in expected["plots"].items():
+        key = f"PRED_{mins}"
+        scored = [row for row in rows if key in row["predictions"]]
+        assert np.array_equal(pd.DatetimeIndex([row["TIMESTAMP"] for row in scored]), ts.to_numpy())
+        assert [row["predictions"][key] for row in scored] == np.rint(preds).astype(int).tolist()
+
+
+def test_each_horizon_starts_after_its_own_window():
+    data = baseline.synthetic_export(seed=2)
+    rows = streamed(data)
+    first_minute = pd.to_datetime(data["TIMESTAMP"].min(), unit="s").floor("1min")
+    for mins, roll_window in HORIZON_WINDOWS.items():
+        first = next(row for row in rows if f"PRED_{mins}" in row["predictions"])
+        assert first["TIMESTAMP"] == first_minute + pd.Timedelta(minutes=first_valid_row(roll_window))
+    # the shortest window is ready before the longest one
+    assert len(rows[0]["predictions"]) < len(HORIZON_WINDOWS)
+
+
+def test_streaming_backend():
+    data = baseline.synthetic_export(seed=3)
+    assert streamed(data, backend="numpy") == streamed(data)
+
+
+def test_events_endpoint():
+    from fastapi.testclient import TestClient
+
+    from fastapi_app import app
+
+    data = baseline.synthetic_export(seed=4)
+    events = [
+        {k: v for k, v in row.items() if v == v}
+        for row in data.to_dict("records")
+    ]
+    half = len(events) // 2
+    with TestClient(app) as client:
+        client.delete("/lines/test/events")
+        first = client.post("/lines/test/events", json={"events": events[:half]}).json()
+        second = client.post("/lines/test/events", json={"events": events[half:], "flush": True}).json()
+        assert client.post("/lines/test/events", json={"events": [{"CONVEYOR_STATUS_01": 1}]}).status_code == 400
+        assert client.delete("/lines/test/events").json()["reset"]
+
+    minutes = first["minutes"] + second["minutes"]
+    expected = streamed(data)
+    assert [m["predictions"] for m in minutes] == [row["predictions"] for row in expected]
+    assert [m["TIMESTAMP"] for m in minutes] == [str(row["TIMESTAMP"]) for row in expected]
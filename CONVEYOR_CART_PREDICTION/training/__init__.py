@@ -0,0 +1,7 @@
+from .pipeline import (
+    DEFAULT_PARAMS, MULTI_PARAMS, TARGET_COL, evaluate, evaluate_multi, horizon_rows, multi_horizon_set, split_rows,
+    store_horizon_rows, store_multi_horizon_set, store_training_sets, thread_budget, train_horizons, train_multi_horizon,
+    training_sets, write_models
+)
+from .incremental import drift_report, live_version, population_stability, update_horizons
+from .search import SEARCH_SPACE, sample_candidates, search
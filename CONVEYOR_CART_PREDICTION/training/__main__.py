@@ -0,0 +1,162 @@
+"""
+Train the 15/30/45/60 minute models from a conveyor export (replaces the notebook run).
+
+RUN COMMAND (from CONVEYOR_CART_PREDICTION):
+python -m training --data EDA_Training_files/data/raw_conveyor_cart_data.csv
+python -m training --data history.csv --search halving --candidates 27 --jobs 4 --threads 16 --promote
+python -m training --data history.csv --multi-horizon --promote
+python -m training --store feature_store_data --promote
+python -m training --store feature_store_data --incremental --window 30D --promote
+"""
+import argparse
+import sys
+
+from inference.constants import HORIZON_WINDOWS, MODEL_DIR
+from inference.registry import live_setup
+from feature_store import FeatureStore
+from ingestion import IngestionError, read_conveyor_csv
+from .incremental import DEFAULT_ROUNDS, MAE_DRIFT_RATIO, update_horizons
+from .pipeline import (
+    horizon_rows, multi_horizon_set, store_horizon_rows, store_multi_horizon_set, store_training_sets, train_horizons,
+    train_multi_horizon, training_sets, write_models
+)
+from .search import search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="wide conveyor export CSV")
+    source.add_argument("--store", help="feature store directory (python -m feature_store)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(HORIZON_WINDOWS))
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--search", default="none", choices=["none", "random", "halving"])
+    parser.add_argument("--candidates", type=int, default=16)
+    parser.add_argument("--eta", type=int, default=3, help="successive halving reduction factor")
+    parser.add_argument("--jobs", type=int, default=4, help="concurrent fits during the search")
+    parser.add_argument("--threads", type=int, default=None, help="total XGBoost threads (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--version", default=None, help="version name (default: UTC timestamp)")
+    parser.add_argument("--promote", action="store_true", help="also replace the live model files")
+    parser.add_argument("--multi-horizon", action="store_true", help="train one model for all horizons instead of four")
+    parser.add_argument("--incremental", action="store_true", help="continue training the live models on the new rows")
+    parser.add_argument("--since", default=None, help="rows after this time are new (default: recorded with the live model)")
+    parser.add_argument("--window", default=None, help="warm start / retrain on this trailing period (e.g. 30D) instead")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="boosting rounds added by a warm start")
+    parser.add_argument("--mae-drift", type=float, default=MAE_DRIFT_RATIO, help="MAE ratio that triggers a full retrain")
+    parser.add_argument("--psi-drift", type=float, default=None, help="feature PSI that triggers a full retrain")
+    args = parser.parse_args()
+
+    unknown = set(args.horizons) - set(HORIZON_WINDOWS)
+    if unknown:
+        sys.exit(f"Unknown horizons: {sorted(unknown)}")
+    if args.multi_horizon and (args.search != "none" or set(args.horizons) != set(HORIZON_WINDOWS)):
+        sys.exit("--multi-horizon trains all horizons with the default parameters (no --search or --horizons)")
+    if args.incremental and (args.search != "none" or args.multi_horizon):
+        sys.exit("--incremental updates the live horizon models with their own parameters (no --search or --multi-horizon)")
+    if args.incremental and live_setup(args.model_dir).get("multi_horizon"):
+        sys.exit(
+            f"The live model in {args.model_dir} is the multi-horizon model (see live.json), --incremental only updates "
+            "the per-horizon models; retrain with --multi-horizon --promote instead"
+        )
+    if args.store:
+        store = FeatureStore(args.store)
+        data_source, n_minutes = str(args.store), len(store)
+    else:
+        try:
+            resampled = read_conveyor_csv(args.data).resampled
+        except IngestionError as e:
+            sys.exit(str(e))
+        data_source, n_minutes = str(args.data), len(resampled)
+
+    if args.incremental:
+        rows = store_horizon_rows(store, args.horizons) if args.store else horizon_rows(resampled, args.horizons)
+        trained = update_horizons(
+            rows,
+            model_dir=args.model_dir,
+            since=args.since,
+            window=args.window,
+            rounds=args.rounds,
+            test_fraction=args.test_fraction,
+            mae_drift_ratio=args.mae_drift,
+            psi_drift=args.psi_drift,
+            n_threads=args.threads
+        )
+        if not trained:
+            print("No model updated (too little new data, or no improvement on it), nothing written")
+            return
+        version_dir = write_models(
+            trained,
+            model_dir=args.model_dir,
+            version=args.version,
+            promote=args.promote,
+            extra_metadata={"data": data_source, "incremental": True, "window": args.window, "minutes": n_minutes}
+        )
+        print(f"{'horizon':>8} {'update':>11} {'rows':>7} {'trees':>6} {'MAE before':>11} {'MAE after':>10}")
+        for mins, (_, metrics, _) in sorted(trained.items()):
+            update = metrics["update"]
+            print(f"{mins:>8} {update['mode']:>11} {update['rows']:>7} {update['trees']:>6} {metrics['mae_before']:>11.3f} {metrics['mae']:>10.3f}")
+            if "reason" in update:
+                print(f"{'':>8} full retrain: {update['reason']}")
+        print(f"Models written to {version_dir}")
+        return
+
+    if args.multi_horizon:
+        if args.store:
+            data = store_multi_horizon_set(store, args.test_fraction)
+        else:
+            data = multi_horizon_set(resampled, args.test_fraction)
+        trained = train_multi_horizon(data, n_threads=args.threads)
+        version_dir = write_models(
+            trained,
+            model_dir=args.model_dir,
+            version=args.version,
+            promote=args.promote,
+            extra_metadata={"data": data_source, "multi_horizon": True, "minutes": n_minutes}
+        )
+        _, metrics, _ = next(iter(trained.values()))
+        _print_metrics(metrics["horizons"])
+        print(f"Model written to {version_dir}")
+        return
+
+    if args.store:
+        sets = store_training_sets(store, args.horizons, args.test_fraction)
+    else:
+        sets = training_sets(resampled, args.horizons, args.test_fraction)
+
+    params, history = None, None
+    if args.search != "none":
+        params, history = search(
+            sets,
+            method=args.search,
+            n_candidates=args.candidates,
+            eta=args.eta,
+            n_jobs=args.jobs,
+            n_threads=args.threads,
+            seed=args.seed
+        )
+
+    trained = train_horizons(sets, params, n_threads=args.threads)
+    version_dir = write_models(
+        trained,
+        model_dir=args.model_dir,
+        version=args.version,
+        promote=args.promote,
+        extra_metadata={"data": data_source, "search": args.search, "minutes": n_minutes}
+    )
+    if history is not None:
+        history.to_csv(version_dir / "search_history.csv", index=False)
+
+    _print_metrics({mins: metrics for mins, (_, metrics, _) in trained.items()})
+    print(f"Models written to {version_dir}")
+
+
+def _print_metrics(by_horizon: dict):
+    print(f"{'horizon':>8} {'MAE':>7} {'R2 train':>9} {'R2 test':>8}")
+    for mins, metrics in sorted(by_horizon.items()):
+        print(f"{mins:>8} {metrics['mae']:>7.3f} {metrics['r2_train']:>9.3f} {metrics['r2_test']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from inference.constants import MODEL_DIR, model_filename
+from inference.registry import live_setup
+from .pipeline import DEFAULT_PARAMS, evaluate, fit_model, split_rows, thread_budget
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+# boosting rounds added per update
+DEFAULT_ROUNDS = 100
+# fall back to a full retrain when the live model's error on the new rows is this many times its
+# error on the reference rows (day to day the ratio stays within about 0.6-1.25 on the sample)
+MAE_DRIFT_RATIO = 1.5
+# trailing period before the new rows the live model's error is compared with
+REFERENCE_PERIOD = "7D"
+# retrain from scratch instead once warm starts would grow a model past this many trees
+MAX_TREES = 1500
+# below this many new rows (a day of minutes) an update is skipped
+MIN_NEW_ROWS = 1440
+
+
+def live_version(model_dir, horizon):
+    """
+    (version, metadata entry) of the versions/ directory whose model file is
+    the live one for a horizon, found by content; (None, None) when the live
+    file was not written by write_models.
+    """
+    model_dir = Path(model_dir)
+    live = hashlib.sha256((model_dir / model_filename(horizon)).read_bytes()).hexdigest()
+    for version_dir in sorted((model_dir / "versions").glob("*"), reverse=True):
+        path = version_dir / model_filename(horizon)
+        if path.exists() and hashlib.sha256(path.read_bytes()).hexdigest() == live:
+            metadata = json.loads((version_dir / "metadata.json").read_text())
+            return version_dir.name, metadata["horizons"].get(str(horizon))
+    return None, None
+
+
+def population_stability(reference: np.ndarray, current: np.ndarray, bins=10) -> np.ndarray:
+    """
+    Population stability index of every feature column, on the reference
+    rows' deciles. About 0.1 is a moderate and above 0.25 a significant shift.
+    """
+    edges = np.nanquantile(reference, np.linspace(0, 1, bins + 1)[1:-1], axis=0)
+    psi = np.zeros(reference.shape[1])
+    for f in range(reference.shape[1]):
+        ref = np.bincount(np.searchsorted(edges[:, f], reference[:, f], side="right"), minlength=bins) / len(reference)
+        cur = np.bincount(np.searchsorted(edges[:, f], current[:, f], side="right"), minlength=bins) / len(current)
+        ref, cur = np.maximum(ref, 1e-4), np.maximum(cur, 1e-4)
+        psi[f] = float(np.sum((cur - ref) * np.log(cur / ref)))
+    return psi
+
+
+def drift_report(model: XGBRegressor, reference, new) -> dict:
+    """
+    The live model's MAE on the reference rows and on the new rows, and the
+    largest feature PSI between them. reference and new are (X, y) pairs.
+    Raises ValueError when either is empty, whose MAE and PSI would be NaN
+    and pass every threshold.
+    """
+    (X_ref, y_ref), (X_new, y_new) = reference, new
+    if len(y_ref) == 0 or len(y_new) == 0:
+        raise ValueError(f"Drift needs reference and new rows, got {len(y_ref)} reference and {len(y_new)} new rows")
+    mae_ref = float(np.mean(np.abs(model.predict(X_ref) - y_ref)))
+    mae_new = float(np.mean(np.abs(model.predict(X_new) - y_new)))
+    return {
+        "mae_reference": mae_ref,
+        "mae_new": mae_new,
+        "mae_ratio": mae_new / mae_ref if mae_ref > 0 else float("inf"),
+        "psi_max": float(population_stability(np.asarray(X_ref), np.asarray(X_new)).max())
+    }
+
+
+def update_horizons(
+    rows: dict,
+    model_dir=MODEL_DIR,
+    since=None,
+    window=None,
+    rounds=DEFAULT_ROUNDS,
+    test_fraction=0.2,
+    reference=REFERENCE_PERIOD,
+    mae_drift_ratio=MAE_DRIFT_RATIO,
+    psi_drift=None,
+    max_trees=MAX_TREES,
+    n_threads=None
+) -> dict:
+    """
+    Incremental refresh of the live horizon models from horizon_rows() output.
+
+    The new rows are the forecast origins after since (default: the data_end
+    recorded with the live model's version). For each horizon the live model
+    is checked for drift: its MAE on the new rows against its MAE over the
+    reference period before them, and, when psi_drift is given, the feature
+    PSI (reported either way; the daily mix of cart counts moves it well past
+    the usual 0.25 without the error changing). Without drift it keeps
+    boosting from its current trees (xgb_model warm start) for rounds more
+    rounds on the new rows, or, with window set (e.g. "30D"), on every row of
+    that trailing window. On drift, an unknown training range, no rows in the
+    reference period or a model past max_trees it is retrained from scratch
+    on all rows (or the window).
+
+    Either way the last test_fraction of the rows it trains on are held out
+    and both the live and the updated model are scored on them. Returns
+    {horizon: (model, metrics, params)} for write_models, with
+    metrics["update"] describing what was done. Horizons with fewer than
+    MIN_NEW_ROWS new rows, or whose warm start scores worse than the live
+    model on the held out rows, are left out.
+
+    Raises ValueError when the live setup is the multi-horizon model
+    (live_setup), whose per-horizon files are not the ones being served.
+    """
+    if live_setup(model_dir).get("multi_horizon"):
+        raise ValueError(
+            f"The live model in {model_dir} is the multi-horizon model, incremental updates only apply to the "
+            "per-horizon models; retrain it with --multi-horizon instead"
+        )
+    per_fit = thread_budget(n_threads, 1)
+    updated = {}
+    for mins, (timestamps, X, y) in rows.items():
+        start = time.perf_counter()
+        base = XGBRegressor()
+        base.load_model(Path(model_dir) / model_filename(mins))
+        version, metadata = live_version(model_dir, mins)
+        params = dict(metadata["params"]) if metadata else dict(DEFAULT_PARAMS)
+
+        horizon_since = since
+        if horizon_since is None and metadata is not None:
+            horizon_since = metadata["metrics"].get("data_end")
+        update = {"base_version": version, "since": None if horizon_since is None else str(horizon_since)}
+
+        window_start = 0
+        if window is not None:
+            window_start = int(np.searchsorted(timestamps, (pd.Timestamp(timestamps[-1]) - pd.Timedelta(window)).to_datetime64(), side="right"))
+
+        reason = None
+        if horizon_since is None:
+            reason = "training range of the live model unknown"
+            new_start = 0
+        else:
+            new_start = int(np.searchsorted(timestamps, pd.Timestamp(horizon_since).to_datetime64(), side="right"))
+            n_new = len(X) - new_start
+            if n_new < MIN_NEW_ROWS:
+                logger.info(f"{mins} min model: {n_new} new rows, no update")
+                continue
+            reference_start = int(np.searchsorted(timestamps, (pd.Timestamp(horizon_since) - pd.Timedelta(reference)).to_datetime64(), side="right"))
+            drift = None
+            if reference_start < new_start:
+                drift = drift_report(base, (X[reference_start:new_start], y[reference_start:new_start]), (X[new_start:], y[new_start:]))
+                update["drift"] = drift
+            if drift is None:
+                # nothing to compare the new rows with (e.g. a window starting at since)
+                reason = "no reference rows before the new ones"
+            elif drift["mae_ratio"] > mae_drift_ratio:
+                reason = f"MAE {drift['mae_ratio']:.2f}x the reference"
+            elif psi_drift is not None and drift["psi_max"] > psi_drift:
+                reason = f"feature PSI {drift['psi_max']:.2f}"
+            elif base.get_booster().num_boosted_rounds() + rounds > max_trees:
+                reason = f"model would exceed {max_trees} trees"
+
+        if reason is None:
+            train_start = window_start if window is not None else new_start
+            data = split_rows({mins: (timestamps[train_start:], X[train_start:], y[train_start:])}, test_fraction)[mins]
+            model = XGBRegressor(**{**params, "n_estimators": rounds, "n_jobs": per_fit})
+            model.fit(data["X_train"], data["y_train"], xgb_model=base.get_booster())
+            update["mode"] = "warm_start"
+        else:
+            data = split_rows({mins: (timestamps[window_start:], X[window_start:], y[window_start:])}, test_fraction)[mins]
+            model = fit_model(params, data["X_train"], data["y_train"], per_fit)
+            update["mode"] = "full"
+            update["reason"] = reason
+
+        metrics = evaluate(model, data)
+        metrics["mae_before"] = float(np.mean(np.abs(base.predict(data["X_test"]) - data["y_test"])))
+        metrics["fit_seconds"] = round(time.perf_counter() - start, 2)
+        update["rows"] = len(data["y_train"])
+        update["trees"] = model.get_booster().num_boosted_rounds()
+        metrics["update"] = update
+        if update["mode"] == "warm_start" and metrics["mae"] > metrics["mae_before"]:
+            logger.info(f"{mins} min model: warm start MAE {metrics['mae']:.3f} > live {metrics['mae_before']:.3f}, keeping the live model")
+            continue
+        logger.info(
+            f"{mins} min model: {update['mode']} on {update['rows']} rows"
+            + (f" ({reason})" if reason else "")
+            + f", test MAE {metrics['mae_before']:.3f} -> {metrics['mae']:.3f}"
+        )
+        updated[mins] = (model, metrics, params)
+    return updated
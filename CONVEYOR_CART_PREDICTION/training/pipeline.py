@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from inference.constants import BASE_COLS, HORIZON_WINDOWS, INPUT_PARAMS, MODEL_DIR, MULTI_HORIZON, model_filename
+from feature_store import feature_column, first_feature_row
+from inference.features import build_features, minutes_needed, multi_window_features, status_counts
+from inference.registry import LIVE_FILE
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+# the training target: empty carts this many minutes ahead (same as the notebook)
+TARGET_COL = "num_carts_empty"
+
+# notebook hyperparameters; hist builds feature histograms once per fit instead of sorting per split
+DEFAULT_PARAMS = {
+    "n_estimators": 600,
+    "max_depth": 3,
+    "learning_rate": 0.04,
+    "subsample": 0.65,
+    "colsample_bytree": 0.65,
+    "min_child_weight": 5,
+    "gamma": 0.5,
+    "reg_alpha": 0.1,
+    "reg_lambda": 1.0,
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    "random_state": 42
+}
+
+# one tree per boosting round with a leaf value for every horizon, so a row is traversed once
+MULTI_PARAMS = {**DEFAULT_PARAMS, "multi_strategy": "multi_output_tree"}
+
+
+def training_sets(df_resampled: pd.DataFrame, horizons=tuple(HORIZON_WINDOWS), test_fraction=0.2) -> dict:
+    """
+    Per-horizon time-split train/test matrices from one per-minute frame.
+
+    Counts, prefix sums and the roll-window features are computed once and
+    shared by all horizons, with the same code Model.predict runs, so the
+    models are trained on exactly the features they are served. The target is
+    num_carts_empty horizon minutes later; rows without one are dropped.
+    Returns {horizon: {"X_train", "y_train", "X_test", "y_test", "timestamps_train", "timestamps_test"}}.
+    """
+    return split_rows(horizon_rows(df_resampled, horizons), test_fraction)
+
+
+def store_training_sets(store, horizons=tuple(HORIZON_WINDOWS), test_fraction=0.2, start=None, end=None) -> dict:
+    """
+    training_sets() for the minutes [start, end] of a feature_store.FeatureStore,
+    slicing its stored feature matrices instead of recomputing them.
+    """
+    return split_rows(store_horizon_rows(store, horizons, start, end), test_fraction)
+
+
+def horizon_rows(df_resampled: pd.DataFrame, horizons=tuple(HORIZON_WINDOWS)) -> dict:
+    """
+    Every forecast origin with a known target, per horizon, before the
+    train/test split: {horizon: (origin timestamps, X, y)}.
+    """
+    counts, target = _counts_and_target(df_resampled)
+    window_map = build_features(counts, {HORIZON_WINDOWS[h] for h in horizons})
+    return _rows(window_map, target, df_resampled["TIMESTAMP"].to_numpy(), horizons)
+
+
+def store_horizon_rows(store, horizons=tuple(HORIZON_WINDOWS), start=None, end=None) -> dict:
+    """horizon_rows() for the minutes [start, end] of a feature_store.FeatureStore."""
+    table, offset = _read_store(store, start, end)
+    counts = np.column_stack([table.column(col).to_numpy() for col in BASE_COLS])
+    window_map = {}
+    for w in {HORIZON_WINDOWS[h] for h in horizons}:
+        skip = max(first_feature_row(w) - offset, 0)
+        window_map[w] = (skip, store.matrix(table, feature_column(w))[skip:])
+    target = counts[:, BASE_COLS.index(TARGET_COL)].astype(np.float64)
+    return _rows(window_map, target, table.column("TIMESTAMP").to_numpy(), horizons)
+
+
+def split_rows(rows: dict, test_fraction=0.2) -> dict:
+    """Time split of horizon_rows() into the training_sets() layout, the last rows for testing."""
+    sets = {}
+    for mins, (timestamps, X, y) in rows.items():
+        split = int(len(X) * (1 - test_fraction))
+        sets[mins] = {
+            "X_train": X[:split],
+            "y_train": y[:split],
+            "X_test": X[split:],
+            "y_test": y[split:],
+            "timestamps_train": timestamps[:split],
+            "timestamps_test": timestamps[split:]
+        }
+    return sets
+
+
+def _rows(window_map, target, timestamps, horizons):
+    rows = {}
+    for mins in horizons:
+        start, X = window_map[HORIZON_WINDOWS[mins]]
+        n = len(X) - mins
+        if n <= 1:
+            raise ValueError(f"Not enough history to train the {mins} min model")
+        rows[mins] = (timestamps[start:start + n], X[:n], target[start + mins:start + mins + n])
+    return rows
+
+
+def multi_horizon_set(df_resampled: pd.DataFrame, test_fraction=0.2) -> dict:
+    """
+    Train/test matrices for the single multi-horizon model: the shared
+    multi_window_features matrix and one target column per horizon, in
+    HORIZON_WINDOWS order (the order Model splits the predictions in). Rows
+    are kept only when the longest horizon's target exists, so all horizons
+    train on the same rows. Same keys as a training_sets() entry.
+    """
+    counts, target = _counts_and_target(df_resampled)
+    X = multi_window_features(counts)
+    return _split_multi(minutes_needed() - 1, X, target, df_resampled["TIMESTAMP"].to_numpy(), test_fraction)
+
+
+def store_multi_horizon_set(store, test_fraction=0.2, start=None, end=None) -> dict:
+    """multi_horizon_set() for the minutes [start, end] of a feature_store.FeatureStore."""
+    table, offset = _read_store(store, start, end)
+    skip = max(first_feature_row(MULTI_HORIZON) - offset, 0)
+    X = store.matrix(table, feature_column(MULTI_HORIZON))[skip:]
+    target = table.column(TARGET_COL).to_numpy().astype(np.float64)
+    return _split_multi(skip, X, target, table.column("TIMESTAMP").to_numpy(), test_fraction)
+
+
+def _split_multi(start, X, target, timestamps, test_fraction):
+    horizons = list(HORIZON_WINDOWS)
+    n = len(X) - max(horizons)
+    if n <= 1:
+        raise ValueError("Not enough history to train the multi-horizon model")
+    X = X[:n]
+    y = np.column_stack([target[start + mins:start + mins + n] for mins in horizons])
+    split = int(n * (1 - test_fraction))
+    return {
+        "X_train": X[:split],
+        "y_train": y[:split],
+        "X_test": X[split:],
+        "y_test": y[split:],
+        "timestamps_train": timestamps[start:start + split],
+        "timestamps_test": timestamps[start + split:start + n]
+    }
+
+
+def _read_store(store, start, end):
+    """Stored minutes [start, end] and the position of the first one in the whole history."""
+    table = store.read(start, end)
+    if table.num_rows == 0:
+        raise ValueError("No data in the feature store for the requested range")
+    return table, store.row_of(table.column("TIMESTAMP")[0].as_py())
+
+
+def _counts_and_target(df_resampled):
+    if all(col in df_resampled.columns for col in BASE_COLS):
+        counts = df_resampled[BASE_COLS].to_numpy()
+    else:
+        counts = status_counts(df_resampled[INPUT_PARAMS].to_numpy())
+    return counts, counts[:, BASE_COLS.index(TARGET_COL)].astype(np.float64)
+
+
+def thread_budget(n_threads=None, n_jobs=1) -> int:
+    """XGBoost threads per concurrent fit so n_jobs fits share n_threads cores without oversubscribing."""
+    n_threads = n_threads or os.cpu_count() or 1
+    return max(n_threads // max(n_jobs, 1), 1)
+
+
+def fit_model(params: dict, X, y, n_threads: int) -> XGBRegressor:
+    model = XGBRegressor(**{**params, "n_jobs": n_threads})
+    model.fit(X, y)
+    return model
+
+
+def evaluate(model: XGBRegressor, data: dict) -> dict:
+    """Notebook metrics: test MAE, train and test R2."""
+    pred_test = model.predict(data["X_test"])
+    pred_train = model.predict(data["X_train"])
+    return {
+        "mae": float(np.mean(np.abs(pred_test - data["y_test"]))),
+        "r2_train": _r2(data["y_train"], pred_train),
+        "r2_test": _r2(data["y_test"], pred_test),
+        "train_samples": int(len(data["y_train"])),
+        "test_samples": int(len(data["y_test"])),
+        # last forecast origin trained on, where an incremental update continues from
+        "data_end": _data_end(data)
+    }
+
+
+def evaluate_multi(model: XGBRegressor, data: dict) -> dict:
+    """evaluate() per horizon column of the multi-horizon model."""
+    pred_test = model.predict(data["X_test"])
+    pred_train = model.predict(data["X_train"])
+    metrics = {
+        "train_samples": int(len(data["y_train"])),
+        "test_samples": int(len(data["y_test"])),
+        "data_end": _data_end(data),
+        "horizons": {}
+    }
+    for i, mins in enumerate(HORIZON_WINDOWS):
+        metrics["horizons"][mins] = {
+            "mae": float(np.mean(np.abs(pred_test[:, i] - data["y_test"][:, i]))),
+            "r2_train": _r2(data["y_train"][:, i], pred_train[:, i]),
+            "r2_test": _r2(data["y_test"][:, i], pred_test[:, i])
+        }
+    return metrics
+
+
+def train_horizons(sets: dict, params_by_horizon: dict = None, n_threads=None) -> dict:
+    """
+    Fit every horizon concurrently. XGBoost releases the GIL while training, so
+    threads share the feature matrices without copies; each fit gets an equal
+    slice of the thread budget. Returns {horizon: (model, metrics, params)}.
+    """
+    params_by_horizon = params_by_horizon or {}
+    per_fit = thread_budget(n_threads, len(sets))
+
+    def train_one(mins):
+        params = params_by_horizon.get(mins, DEFAULT_PARAMS)
+        start = time.perf_counter()
+        model = fit_model(params, sets[mins]["X_train"], sets[mins]["y_train"], per_fit)
+        metrics = evaluate(model, sets[mins])
+        metrics["fit_seconds"] = round(time.perf_counter() - start, 2)
+        logger.info(f"Trained {mins} min model: MAE {metrics['mae']:.3f}, R2 test {metrics['r2_test']:.3f}")
+        return mins, (model, metrics, params)
+
+    with ThreadPoolExecutor(max_workers=len(sets)) as pool:
+        return dict(pool.map(train_one, sets))
+
+
+def train_multi_horizon(data: dict, params: dict = None, n_threads=None) -> dict:
+    """
+    Fit the multi-horizon model on a multi_horizon_set(). Returns
+    {MULTI_HORIZON: (model, metrics, params)}, which write_models saves as
+    xgb_regressor_cart_multi.json.
+    """
+    params = params or MULTI_PARAMS
+    start = time.perf_counter()
+    model = fit_model(params, data["X_train"], data["y_train"], thread_budget(n_threads))
+    metrics = evaluate_multi(model, data)
+    metrics["fit_seconds"] = round(time.perf_counter() - start, 2)
+    for mins, m in metrics["horizons"].items():
+        logger.info(f"Multi-horizon model, {mins} min: MAE {m['mae']:.3f}, R2 test {m['r2_test']:.3f}")
+    return {MULTI_HORIZON: (model, metrics, params)}
+
+
+def write_models(trained: dict, model_dir=MODEL_DIR, version=None, promote=False, extra_metadata=None) -> Path:
+    """
+    Save the boosters under model_dir/versions/<version>/ in the file layout the
+    app loads (xgb_regressor_cart{N}min.json) with a metadata.json of params
+    and metrics. promote=True also replaces the live files in model_dir; each
+    file is written beside its target and renamed over it, so the registry's
+    hot reload never sees a partial model. The promoted version and whether
+    it is the multi-horizon model are recorded in model_dir/live.json
+    (inference.registry.live_setup).
+    """
+    model_dir = Path(model_dir)
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    version_dir = model_dir / "versions" / version
+    version_dir.mkdir(parents=True, exist_ok=False)
+
+    metadata = {"version": version, "horizons": {}, **(extra_metadata or {})}
+    for mins, (model, metrics, params) in trained.items():
+        model.save_model(version_dir / model_filename(mins))
+        metadata["horizons"][str(mins)] = {"params": params, "metrics": metrics}
+    (version_dir / "metadata.json").write_text(json.dumps(metadata, indent=2, default=str))
+    logger.info(f"Wrote model version {version} to {version_dir}")
+
+    if promote:
+        for mins in trained:
+            target = model_dir / model_filename(mins)
+            tmp = target.with_name(f".{target.name}.tmp")
+            tmp.write_bytes((version_dir / model_filename(mins)).read_bytes())
+            os.replace(tmp, target)
+        live = {
+            "version": version,
+            "multi_horizon": MULTI_HORIZON in trained,
+            "promoted_at": datetime.now(timezone.utc).isoformat(timespec="seconds")
+        }
+        tmp = model_dir / f".{LIVE_FILE}.tmp"
+        tmp.write_text(json.dumps(live, indent=2))
+        os.replace(tmp, model_dir / LIVE_FILE)
+        logger.info(f"Promoted model version {version}")
+    return version_dir
+
+
+def _data_end(data):
+    return str(pd.Timestamp(data["timestamps_train"][-1])) if len(data["timestamps_train"]) else None
+
+
+def _r2(y, pred) -> float:
+    ss_tot = float(np.sum((y - y.mean()) ** 2))
+    return 1 - float(np.sum((y - pred) ** 2)) / ss_tot if ss_tot > 0 else float("nan")
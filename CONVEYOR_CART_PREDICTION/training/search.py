@@ -0,0 +1,96 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import DEFAULT_PARAMS, fit_model, thread_budget
+
+logger = logging.getLogger("ML MODEL LOGGER")
+
+# parameter -> sampler(rng); the notebook parameters are always candidate 0
+SEARCH_SPACE = {
+    "max_depth": lambda rng: int(rng.choice([3, 4, 5, 6])),
+    "learning_rate": lambda rng: float(np.exp(rng.uniform(np.log(0.02), np.log(0.2)))),
+    "subsample": lambda rng: float(rng.uniform(0.5, 1.0)),
+    "colsample_bytree": lambda rng: float(rng.uniform(0.5, 1.0)),
+    "min_child_weight": lambda rng: int(rng.choice([1, 3, 5, 10])),
+    "gamma": lambda rng: float(rng.choice([0.0, 0.25, 0.5, 1.0])),
+    "reg_alpha": lambda rng: float(rng.choice([0.0, 0.1, 1.0])),
+    "reg_lambda": lambda rng: float(rng.choice([0.5, 1.0, 2.0, 5.0]))
+}
+
+
+def sample_candidates(n_candidates: int, seed=0) -> list:
+    rng = np.random.default_rng(seed)
+    candidates = [dict(DEFAULT_PARAMS)]
+    while len(candidates) < n_candidates:
+        candidates.append({**DEFAULT_PARAMS, **{name: draw(rng) for name, draw in SEARCH_SPACE.items()}})
+    return candidates[:n_candidates]
+
+
+def search(
+    sets: dict,
+    method="halving",
+    n_candidates=16,
+    max_trees=DEFAULT_PARAMS["n_estimators"],
+    eta=3,
+    n_jobs=4,
+    n_threads=None,
+    validation_fraction=0.2,
+    seed=0
+):
+    """
+    Hyperparameter search for every horizon at once.
+
+    Each horizon's training split is cut again in time; candidates are fitted
+    on the first part and ranked by MAE on the last validation_fraction.
+    method="random" fits every candidate with max_trees trees; "halving"
+    (successive halving) starts all candidates on max_trees / eta**k trees
+    and keeps the best 1/eta for each next rung with eta times more trees.
+    Fits of all horizons and candidates share one pool of n_jobs threads,
+    each with thread_budget(n_threads, n_jobs) XGBoost threads.
+
+    Returns ({horizon: best params}, DataFrame of every fit).
+    """
+    if method not in ("random", "halving"):
+        raise ValueError(f"Unknown search method: {method}")
+    candidates = sample_candidates(n_candidates, seed)
+    n_rungs = int(math.log(n_candidates, eta) + 1e-9) + 1 if method == "halving" else 1
+    per_fit = thread_budget(n_threads, n_jobs)
+
+    splits = {}
+    for mins, data in sets.items():
+        cut = int(len(data["y_train"]) * (1 - validation_fraction))
+        splits[mins] = (data["X_train"][:cut], data["y_train"][:cut], data["X_train"][cut:], data["y_train"][cut:])
+
+    def score(task):
+        mins, idx, trees = task
+        X_fit, y_fit, X_val, y_val = splits[mins]
+        model = fit_model({**candidates[idx], "n_estimators": trees}, X_fit, y_fit, per_fit)
+        return float(np.mean(np.abs(model.predict(X_val) - y_val)))
+
+    alive = {mins: list(range(len(candidates))) for mins in sets}
+    history = []
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for rung in range(n_rungs):
+            trees = max(int(max_trees / eta ** (n_rungs - 1 - rung)), 1)
+            tasks = [(mins, idx, trees) for mins, indices in alive.items() for idx in indices]
+            for (mins, idx, _), mae in zip(tasks, pool.map(score, tasks)):
+                history.append({"HORIZON": mins, "RUNG": rung, "TREES": trees, "CANDIDATE": idx, "VAL_MAE": mae})
+
+            rung_scores = pd.DataFrame(history[-len(tasks):])
+            for mins, df in rung_scores.groupby("HORIZON"):
+                keep = max(math.ceil(len(df) / eta), 1)
+                alive[mins] = df.nsmallest(keep, "VAL_MAE")["CANDIDATE"].tolist()
+            logger.info(f"Search rung {rung}: {len(tasks)} fits with {trees} trees")
+
+    history = pd.DataFrame(history)
+    final = history[history["RUNG"] == n_rungs - 1]
+    best = {}
+    for mins, df in final.groupby("HORIZON"):
+        idx = int(df.loc[df["VAL_MAE"].idxmin(), "CANDIDATE"])
+        best[mins] = {**candidates[idx], "n_estimators": max_trees}
+        logger.info(f"Best {mins} min candidate: {idx} (validation MAE {df['VAL_MAE'].min():.3f})")
+    return best, history
@@ -0,0 +1,115 @@
+"""
+SessionDB under concurrent /chat load: blocking calls on the event loop vs AsyncSessionDB.
+
+--concurrency chats run at once on one event loop, each turn doing what /chat
+does against the database: create_chat_id, get_last_chats, a simulated LLM
+round trip (--llm-ms, exponential) and update_chat_answer. "sync" calls
+SessionDB directly from the coroutine, as the endpoints used to; "async"
+awaits AsyncSessionDB. A probe task sleeping 1 ms measures how late the loop
+wakes it up, which is the delay every other request on the worker sees.
+
+Reported per mode and concurrency: database time per turn (the three calls,
+without the LLM wait) p50/p99, event loop lag p99/max, turns per second and,
+for AsyncSessionDB, the mean number of writes committed per transaction.
+
+RUN COMMAND (from MCP_AGENTIC_AI):
+python -m benchmarks.bench_async_db --concurrency 1 16 64 256 --turns 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from db import AsyncSessionDB, SessionDB
+
+
+class BlockingDB:
+    """SessionDB called straight from the coroutine, blocking the loop for every statement."""
+
+    def __init__(self, path):
+        self.db = SessionDB(path)
+
+    async def create_chat_id(self, *args):
+        return self.db.create_chat_id(*args)
+
+    async def get_last_chats(self, *args, **kwargs):
+        return self.db.get_last_chats(*args, **kwargs)
+
+    async def update_chat_answer(self, *args):
+        self.db.update_chat_answer(*args)
+
+    async def close(self):
+        pass
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run(db, concurrency, turns, llm_ms, users, seed):
+    rng = random.Random(seed)
+    db_times = []
+    remaining = [turns]
+
+    async def chat(user):
+        session = 1
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            chat_id = await db.create_chat_id(user, session, "benchmark question")
+            await db.get_last_chats(session, chat_id, limit=2, user_id=user)
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(rng.expovariate(1000 / llm_ms) if llm_ms else 0)
+            start = time.perf_counter()
+            await db.update_chat_answer(user, session, chat_id, "benchmark answer " * 20)
+            db_times.append(elapsed + time.perf_counter() - start)
+
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[chat(rng.randint(1, users)) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return np.array(db_times) * 1000, np.array(lags) * 1000, turns / elapsed
+
+
+async def main_async(args):
+    print(f"{'mode':>6} {'chats':>6} {'db p50':>8} {'db p99':>8} {'lag p99':>8} {'lag max':>8} {'turns/s':>8} {'batch':>6}   (ms)")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for concurrency in args.concurrency:
+            for mode in ("sync", "async"):
+                path = os.path.join(tmp, f"{mode}_{concurrency}.db")
+                db = BlockingDB(path) if mode == "sync" else AsyncSessionDB(path)
+                db_ms, lag_ms, rate = await run(db, concurrency, args.turns, args.llm_ms, args.users, seed=concurrency)
+                batch = ""
+                if mode == "async":
+                    batch = f"{db.stats['writes'] / max(db.stats['batches'], 1):.1f}"
+                await db.close()
+                print(
+                    f"{mode:>6} {concurrency:>6} {np.percentile(db_ms, 50):>8.2f} {np.percentile(db_ms, 99):>8.2f} "
+                    f"{np.percentile(lag_ms, 99):>8.2f} {lag_ms.max():>8.2f} {rate:>8.0f} {batch:>6}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--turns", type=int, default=2000, help="chat turns per run")
+    parser.add_argument("--llm-ms", type=float, default=20, help="mean simulated LLM time per turn")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--dir", default=None, help="directory for the database files (default: system temp)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
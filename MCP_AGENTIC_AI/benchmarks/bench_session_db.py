@@ -0,0 +1,186 @@
+"""
+SessionDB benchmark: insert and lookup latency on a large chat history.
+
+Two databases are filled with --chats chats (--sessions sessions per user,
+--chats-per-session chats each): one with the original layout (TEXT ids, no
+indexes, a new connection and CREATE TABLE per request, rollback journal) and
+one through db.SessionDB (pooled WAL connections, INTEGER ids, composite
+indexes). Then --ops requests are timed on random sessions of both: the
+create_chat_id insert and the get_last_chats lookup /chat runs per turn.
+
+Finally --workers processes allocate chat ids in the same session at once, to
+check that no id is handed out twice.
+
+RUN COMMAND (from MCP_AGENTIC_AI):
+python -m benchmarks.bench_session_db --chats 1000000 --ops 200 --workers 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from db import SessionDB
+
+
+class LegacySessionDB:
+    """The data access of the original SessionDB, kept here as the baseline."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        cursor = self.conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            chat_session_id TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            question TEXT,
+            answer TEXT,
+            current INTEGER DEFAULT 1,
+            active INTEGER DEFAULT 1,
+            is_delete INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        self.conn.commit()
+
+    def create_chat_id(self, user_id, chat_session_id, question):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT COALESCE(MAX(CAST(chat_id AS INTEGER)), 0) + 1
+            FROM chats
+            WHERE user_id = ? AND chat_session_id = ?
+        """, (user_id, chat_session_id))
+        chat_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO chats (user_id, chat_session_id, chat_id, question, current, active, is_delete, created_at)
+            VALUES (?, ?, ?, ?, 1, 1, 0, CURRENT_TIMESTAMP)
+        """, (user_id, chat_session_id, chat_id, question))
+        self.conn.commit()
+        return chat_id
+
+    def get_last_chats(self, chat_session_id, chat_id, limit=5):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+        SELECT question, answer
+        FROM chats
+        WHERE chat_session_id = ? AND chat_id != ?
+        AND is_delete = 0
+        ORDER BY id DESC
+        LIMIT ?
+        """, (chat_session_id, chat_id, limit))
+        rows = cursor.fetchall()
+        rows.reverse()
+        return rows
+
+
+def rows(n_chats, sessions_per_user, chats_per_session):
+    per_user = sessions_per_user * chats_per_session
+    for i in range(n_chats):
+        user, rest = divmod(i, per_user)
+        session, chat = divmod(rest, chats_per_session)
+        yield (user + 1, session + 1, chat + 1, f"question {i}", f"answer {i}")
+
+
+def fill(path, n_chats, sessions_per_user, chats_per_session, legacy):
+    if legacy:
+        LegacySessionDB(path).conn.close()
+    else:
+        SessionDB(path)
+    conn = sqlite3.connect(path)
+    data = rows(n_chats, sessions_per_user, chats_per_session)
+    if legacy:
+        data = ((str(u), str(s), str(c), q, a) for u, s, c, q, a in data)
+    conn.executemany(
+        "INSERT INTO chats (user_id, chat_session_id, chat_id, question, answer) VALUES (?, ?, ?, ?, ?)",
+        data
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_ops(make_db, targets, legacy):
+    """Per request: open the db as the endpoint does, allocate a chat id, load the last two chats."""
+    insert, lookup = [], []
+    for user, session in targets:
+        start = time.perf_counter()
+        db = make_db()
+        chat_id = db.create_chat_id(user, session, "benchmark question")
+        insert.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        if legacy:
+            db.get_last_chats(session, chat_id, limit=2)
+        else:
+            db.get_last_chats(session, chat_id, limit=2, user_id=user)
+        lookup.append(time.perf_counter() - start)
+        if legacy:
+            db.conn.close()
+    return np.array(insert) * 1000, np.array(lookup) * 1000
+
+
+def allocate(path, n, queue):
+    db = SessionDB(path)
+    queue.put([db.create_chat_id(1, 1, f"worker {os.getpid()}") for _ in range(n)])
+
+
+def check_concurrent_ids(path, workers, ids_per_worker):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=allocate, args=(path, ids_per_worker, queue)) for _ in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    ids = [i for _ in procs for i in queue.get()]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    before = len(ids) and min(ids) - 1
+    expected = list(range(before + 1, before + len(ids) + 1))
+    return sorted(ids) == expected, len(ids), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=10, help="sessions per user")
+    parser.add_argument("--chats-per-session", type=int, default=10)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ids", type=int, default=200, help="chat ids allocated per worker")
+    args = parser.parse_args()
+
+    n_users = -(-args.chats // (args.sessions * args.chats_per_session))
+    rng = random.Random(0)
+    targets = [(rng.randint(1, n_users), rng.randint(1, args.sessions)) for _ in range(args.ops)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, legacy in (("legacy", True), ("SessionDB", False)):
+            path = os.path.join(tmp, f"{name}.db")
+            start = time.perf_counter()
+            fill(path, args.chats, args.sessions, args.chats_per_session, legacy)
+            print(f"{name}: {args.chats:,} chats written in {time.perf_counter() - start:.1f} s")
+            make_db = (lambda p=path: LegacySessionDB(p)) if legacy else (lambda p=path: SessionDB(p))
+            results[name] = time_ops(make_db, targets, legacy)
+
+        print(f"\n{'':>10} {'insert p50':>11} {'insert p99':>11} {'lookup p50':>11} {'lookup p99':>11}   (ms, {args.ops} requests)")
+        for name, (insert, lookup) in results.items():
+            print(
+                f"{name:>10} {np.percentile(insert, 50):>11.3f} {np.percentile(insert, 99):>11.3f} "
+                f"{np.percentile(lookup, 50):>11.3f} {np.percentile(lookup, 99):>11.3f}"
+            )
+
+        path = os.path.join(tmp, "SessionDB.db")
+        ok, n, elapsed = check_concurrent_ids(path, args.workers, args.ids)
+        print(f"\n{args.workers} processes allocated {n} chat ids in one session in {elapsed:.2f} s: "
+              + ("all unique and contiguous" if ok else "DUPLICATES OR GAPS"))
+
+
+if __name__ == "__main__":
+    main()
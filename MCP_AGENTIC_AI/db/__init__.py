@@ -1 +1,2 @@
-from .connections import SessionDB
\ No newline at end of file
+from .connections import SessionDB
+from .async_session_db import AsyncSessionDB
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+from .connections import (
+    SessionDB,
+    insert_chat,
+    insert_chat_session,
+    mark_chat_deleted,
+    mark_session_deleted,
+    update_answer,
+    write_transaction
+)
+
+from logger.base_logger import get_logger
+logger = get_logger(__name__)
+
+#most writes the writer thread commits in one transaction
+WRITE_BATCH_SIZE = int(os.getenv("SESSION_DB_WRITE_BATCH_SIZE", "64"))
+
+_STOP = object()
+
+
+class AsyncSessionDB:
+    """
+    SessionDB for the async endpoints: every method is awaited and no sqlite
+    call runs on the event loop.
+
+    Writes are queued to one writer thread holding its own pooled connection.
+    Whatever queued up while the previous commit was running is committed
+    together in one BEGIN IMMEDIATE transaction (one WAL sync for the batch),
+    each write inside its own savepoint so a failing write only rolls back
+    itself. A write's result is delivered once its batch is committed.
+
+    Reads run on a thread pool over the remaining pooled connections and,
+    with WAL, go ahead alongside the writer and each other.
+    """
+
+    def __init__(self, path="sessions.db", max_batch=WRITE_BATCH_SIZE):
+        self.db = SessionDB(path)
+        self.max_batch = max_batch
+        self.stats = {"writes": 0, "batches": 0, "failed": 0, "largest_batch": 0}
+        #the writer keeps one connection of the pool for itself
+        self._readers = ThreadPoolExecutor(max(1, self.db.pool.size - 1), thread_name_prefix="session-db-read")
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    async def create_chat_session(self, user_id: int) -> int:
+        return await self._write(insert_chat_session, user_id)
+
+    async def create_chat_id(self, user_id: int, chat_session_id: int, question: str) -> int:
+        return await self._write(insert_chat, user_id, chat_session_id, question)
+
+    async def update_chat_answer(self, user_id: int, chat_session_id: int, chat_id: int, answer: str):
+        await self._write(update_answer, user_id, chat_session_id, chat_id, answer)
+
+    async def delete_session(self, chat_session_id: int, user_id: int = None):
+        await self._write(mark_session_deleted, chat_session_id, user_id)
+
+    async def delete_chat(self, chat_id: int, user_id: int = None, chat_session_id: int = None):
+        await self._write(mark_chat_deleted, chat_id, user_id, chat_session_id)
+
+    async def get_last_chats(self, chat_session_id: int, chat_id: int, limit: int = 5, user_id: int = None):
+        return await self._read(self.db.get_last_chats, chat_session_id, chat_id, limit, user_id)
+
+    async def get_sessions(self, user_id: int):
+        return await self._read(self.db.get_sessions, user_id)
+
+    async def close(self):
+        """Commit the queued writes and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            writer = self._writer
+        if writer is not None:
+            self._queue.put(_STOP)
+            await asyncio.to_thread(writer.join)
+        self._readers.shutdown(wait=False)
+
+    async def _read(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, partial(method, *args))
+
+    async def _write(self, statement, *args):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("AsyncSessionDB is closed")
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="session-db-writer", daemon=True)
+                self._writer.start()
+            self._queue.put((future, statement, args))
+        return await asyncio.wrap_future(future)
+
+    def _run(self):
+        with self.db.pool.connection() as conn:
+            stop = False
+            while not stop:
+                job = self._queue.get()
+                if job is _STOP:
+                    break
+                batch = [job]
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is _STOP:
+                        stop = True
+                        break
+                    batch.append(job)
+                #requests cancelled while queued are dropped
+                batch = [job for job in batch if job[0].set_running_or_notify_cancel()]
+                if batch:
+                    self._commit(conn, batch)
+
+    def _commit(self, conn, batch):
+        results = []
+        try:
+            with write_transaction(conn) as cursor:
+                for future, statement, args in batch:
+                    cursor.execute("SAVEPOINT write")
+                    try:
+                        results.append((future, statement(cursor, *args), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO write")
+                        results.append((future, None, e))
+                    cursor.execute("RELEASE write")
+        except Exception as e:
+            #BEGIN or COMMIT failed (e.g. busy past the timeout), nothing of the batch was written
+            logger.exception(f"SessionDB batch of {len(batch)} writes failed")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(future, None, e) for future, _, _ in batch]
+
+        self.stats["writes"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        for future, value, error in results:
+            if error is None:
+                future.set_result(value)
+            else:
+                self.stats["failed"] += 1
+                future.set_exception(error)
@@ -1,144 +1,295 @@
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+from logger.base_logger import get_logger
+logger = get_logger(__name__)
+
+#connections kept open per database file
+POOL_SIZE = int(os.getenv("SESSION_DB_POOL_SIZE", "8"))
+#how long a connection waits for another process' write lock before failing
+BUSY_TIMEOUT_MS = int(os.getenv("SESSION_DB_BUSY_TIMEOUT_MS", "5000"))
+#NORMAL only syncs the WAL at checkpoints, FULL syncs every commit
+SYNCHRONOUS = os.getenv("SESSION_DB_SYNCHRONOUS", "NORMAL")
+#PRAGMA user_version of the current schema, older files are migrated on open
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    chat_session_id INTEGER NOT NULL,
+    current INTEGER DEFAULT 1,
+    active INTEGER DEFAULT 1,
+    is_delete INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    chat_session_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    question TEXT,
+    answer TEXT,
+    current INTEGER DEFAULT 1,
+    active INTEGER DEFAULT 1,
+    is_delete INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_session ON chat_sessions (user_id, chat_session_id);
+CREATE INDEX IF NOT EXISTS idx_chats_user_session_chat ON chats (user_id, chat_session_id, chat_id);
+"""
+
+
+class ConnectionPool:
+    """
+    Fixed set of sqlite connections to one database file, shared by every
+    SessionDB of the process (connections are created on first use, up to
+    size, and handed out one caller at a time).
+
+    Connections run in WAL mode, so readers do not block the writer, in
+    autocommit mode; SessionDB opens explicit transactions for writes.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if not create:
+            return self._idle.get()
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute("PRAGMA journal_mode=WAL")
+        #with WAL, NORMAL stays crash safe; a power loss can only drop the last commits
+        conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path) -> ConnectionPool:
+    """The process-wide pool of a database file, creating (and migrating) it on first use."""
+    key = os.path.abspath(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(path)
+            with pool.connection() as conn:
+                migrate(conn)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def write_transaction(conn):
+    """
+    BEGIN IMMEDIATE takes the database write lock up front, so reading the
+    next id and inserting it cannot interleave with another connection or
+    another uvicorn worker process.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def migrate(conn):
+    """
+    Bring a database file to SCHEMA_VERSION. Version 0 files written by the
+    first SessionDB keep user_id, chat_session_id and chat_id as TEXT; their
+    tables are rebuilt with INTEGER columns (rows and ids unchanged) and the
+    indexes are added.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with write_transaction(conn) as cursor:
+        #another worker may have migrated while this one waited for the lock
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        legacy = {
+            row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('chat_sessions', 'chats')"
+            )
+        }
+        for table in legacy:
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_v0")
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+
+        if "chat_sessions" in legacy:
+            cursor.execute("""
+            INSERT INTO chat_sessions (id, user_id, chat_session_id, current, active, is_delete, created_at)
+            SELECT id, CAST(user_id AS INTEGER), CAST(chat_session_id AS INTEGER), current, active, is_delete, created_at
+            FROM chat_sessions_v0
+            """)
+            cursor.execute("DROP TABLE chat_sessions_v0")
+        if "chats" in legacy:
+            cursor.execute("""
+            INSERT INTO chats (id, user_id, chat_session_id, chat_id, question, answer, current, active, is_delete, created_at)
+            SELECT id, CAST(user_id AS INTEGER), CAST(chat_session_id AS INTEGER), CAST(chat_id AS INTEGER),
+                   question, answer, current, active, is_delete, created_at
+            FROM chats_v0
+            """)
+            cursor.execute("DROP TABLE chats_v0")
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    if legacy:
+        logger.info(f"Migrated {sorted(legacy)} to schema version {SCHEMA_VERSION}")
+
+
+#the statements run inside a transaction (writes) or on a pooled connection (reads);
+#SessionDB runs each on its own, AsyncSessionDB group-commits the writes
+
+def insert_chat_session(cursor, user_id: int) -> int:
+
+    cursor.execute("""
+        SELECT COALESCE(MAX(chat_session_id), 0) + 1
+        FROM chat_sessions
+        WHERE user_id = ?
+    """, (user_id,))
+
+    chat_session_id = cursor.fetchone()[0]
+    logger.info(f"Generated chat_session_id: {chat_session_id} for user_id: {user_id}")
+    #mark old sessions as not current
+    cursor.execute("""
+        UPDATE chat_sessions
+        SET current = 0
+        WHERE user_id = ? AND current = 1
+    """, (user_id,))
 
+    #insert new session
+    cursor.execute("""
+        INSERT INTO chat_sessions (
+            user_id,
+            chat_session_id,
+            current,
+            active,
+            is_delete,
+            created_at
+        )
+        VALUES (?, ?, 1, 1, 0, CURRENT_TIMESTAMP)
+    """, (
+        user_id,
+        chat_session_id
+    ))
 
-class SessionDB:
-    def __init__(self, path="sessions.db"):
-        self.conn = sqlite3.connect(path, check_same_thread=False)
-        self._init_tables()
+    return chat_session_id
 
 
-    def _init_tables(self):
+#create a new chat_id and insert the question
+def insert_chat(cursor, user_id: int, chat_session_id: int, question: str) -> int:
 
-        cursor = self.conn.cursor()
+    #get next chat_id, an index seek on (user_id, chat_session_id, chat_id)
+    cursor.execute("""
+        SELECT COALESCE(MAX(chat_id), 0) + 1
+        FROM chats
+        WHERE user_id = ? AND chat_session_id = ?
+    """, (user_id, chat_session_id))
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chat_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            chat_session_id TEXT NOT NULL,
-            current INTEGER DEFAULT 1,
-            active INTEGER DEFAULT 1,
-            is_delete INTEGER DEFAULT 0,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
+    chat_id = cursor.fetchone()[0]
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chats (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            chat_session_id TEXT NOT NULL,
-            chat_id TEXT NOT NULL,
-            question TEXT,
-            answer TEXT,
-            current INTEGER DEFAULT 1,
-            active INTEGER DEFAULT 1,
-            is_delete INTEGER DEFAULT 0,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    #insert question only
+    cursor.execute("""
+        INSERT INTO chats (
+            user_id,
+            chat_session_id,
+            chat_id,
+            question,
+            current,
+            active,
+            is_delete,
+            created_at
         )
-        """)
+        VALUES (?, ?, ?, ?, 1, 1, 0, CURRENT_TIMESTAMP)
+    """, (
+        user_id,
+        chat_session_id,
+        chat_id,
+        question
+    ))
 
-        self.conn.commit()
-    
-    def create_chat_session(self, user_id: int):
+    return chat_id
 
-        cursor = self.conn.cursor()
 
-        cursor.execute("""
-            SELECT COALESCE(MAX(CAST(chat_session_id AS INTEGER)), 0) + 1
-            FROM chat_sessions
-            WHERE user_id = ?
-        """, (user_id,))
-
-        chat_session_id = cursor.fetchone()[0]
-        print(f"Generated chat_session_id: {chat_session_id} for user_id: {user_id}")
-        #mark old sessions as not current
-        cursor.execute("""
-            UPDATE chat_sessions
-            SET current = 0
-            WHERE user_id = ?
-        """, (user_id,))
+#  Update the answer for an existing chat
+def update_answer(cursor, user_id: int, chat_session_id: int, chat_id: int, answer: str):
 
-        #insert new session
-        cursor.execute("""
-            INSERT INTO chat_sessions (
-                user_id,
-                chat_session_id,
-                current,
-                active,
-                is_delete,
-                created_at
-            )
-            VALUES (?, ?, 1, 1, 0, CURRENT_TIMESTAMP)
-        """, (
-            user_id,
-            chat_session_id
-        ))
+    cursor.execute("""
+        UPDATE chats
+        SET answer = ?
+        WHERE user_id = ? AND chat_session_id = ? AND chat_id = ?
+    """, (answer, user_id, chat_session_id, chat_id))
 
-        self.conn.commit()
 
-        return chat_session_id
+def mark_session_deleted(cursor, chat_session_id: int, user_id: int = None):
 
-    
-    #create a new chat_id and insert the question
-    def create_chat_id(self, user_id: int, chat_session_id: int, question: str) -> int:
-        cursor = self.conn.cursor()
+    cursor.execute("""
+    UPDATE chat_sessions
+    SET is_delete = 1, active = 0, current = 0
+    WHERE chat_session_id = ? AND (? IS NULL OR user_id = ?)
+    """, (chat_session_id, user_id, user_id))
 
-        #get next chat_id
-        cursor.execute("""
-            SELECT COALESCE(MAX(CAST(chat_id AS INTEGER)), 0) + 1
-            FROM chats
-            WHERE user_id = ? AND chat_session_id = ?
-        """, (user_id, chat_session_id))
 
-        chat_id = cursor.fetchone()[0]
+def mark_chat_deleted(cursor, chat_id: int, user_id: int = None, chat_session_id: int = None):
 
-        #insert question only
-        cursor.execute("""
-            INSERT INTO chats (
-                user_id,
-                chat_session_id,
-                chat_id,
-                question,
-                current,
-                active,
-                is_delete,
-                created_at
-            )
-            VALUES (?, ?, ?, ?, 1, 1, 0, CURRENT_TIMESTAMP)
-        """, (
-            user_id,
-            chat_session_id,
-            chat_id,
-            question
-        ))
+    cursor.execute("""
+    UPDATE chats
+    SET is_delete = 1, active = 0, current = 0
+    WHERE chat_id = ? AND (? IS NULL OR user_id = ?) AND (? IS NULL OR chat_session_id = ?)
+    """, (chat_id, user_id, user_id, chat_session_id, chat_session_id))
 
-        self.conn.commit()
-        return chat_id
 
-    #  Update the answer for an existing chat
-    def update_chat_answer(self, user_id: int, chat_session_id: int, chat_id: int, answer: str):
-        cursor = self.conn.cursor()
-
-        cursor.execute("""
-            UPDATE chats
-            SET answer = ?
-            WHERE user_id = ? AND chat_session_id = ? AND chat_id = ?
-        """, (answer, user_id, chat_session_id, chat_id))
-
-        self.conn.commit()
-
-   
-    #get last n chats for a session
-    def get_last_chats(
-        self,
-        chat_session_id: str,
-        chat_id: str,
-        limit: int = 5
-    ):
-
-        cursor = self.conn.cursor()
+#get last n chats for a session
+def select_last_chats(cursor, chat_session_id: int, chat_id: int, limit: int = 5, user_id: int = None):
 
+    if user_id is None:
         cursor.execute("""
         SELECT question, answer
         FROM chats
@@ -147,35 +298,75 @@ class SessionDB:
         ORDER BY id DESC
         LIMIT ?
         """, (chat_session_id, chat_id, limit))
+    else:
+        #newest first straight from the index
+        cursor.execute("""
+        SELECT question, answer
+        FROM chats
+        WHERE user_id = ? AND chat_session_id = ? AND chat_id != ?
+        AND is_delete = 0
+        ORDER BY chat_id DESC
+        LIMIT ?
+        """, (user_id, chat_session_id, chat_id, limit))
 
-        rows = cursor.fetchall()
+    rows = cursor.fetchall()
+    rows.reverse()
 
-        rows.reverse()
+    return rows
 
-        return rows
 
-    
-    def delete_session(self, chat_session_id: str):
+#sessions of a user, newest first
+def select_sessions(cursor, user_id: int):
 
-        cursor = self.conn.cursor()
+    cursor.execute("""
+    SELECT chat_session_id, current, created_at
+    FROM chat_sessions
+    WHERE user_id = ? AND is_delete = 0
+    ORDER BY chat_session_id DESC
+    """, (user_id,))
 
-        cursor.execute("""
-        UPDATE chat_sessions
-        SET is_delete = 1, active = 0, current = 0
-        WHERE chat_session_id = ?
-        """, (chat_session_id,))
+    return [
+        {"chat_session_id": session_id, "current": bool(current), "created_at": created_at}
+        for session_id, current, created_at in cursor.fetchall()
+    ]
 
-        self.conn.commit()
 
+class SessionDB:
+    def __init__(self, path="sessions.db"):
+        #cheap per request: the pool, WAL setup and migration are shared per database file
+        self.pool = get_pool(path)
 
-    def delete_chat(self, chat_id: str):
+    def create_chat_session(self, user_id: int):
+        return self._write(insert_chat_session, user_id)
 
-        cursor = self.conn.cursor()
+    def create_chat_id(self, user_id: int, chat_session_id: int, question: str) -> int:
+        return self._write(insert_chat, user_id, chat_session_id, question)
 
-        cursor.execute("""
-        UPDATE chats
-        SET is_delete = 1, active = 0, current = 0
-        WHERE chat_id = ?
-        """, (chat_id,))
+    def update_chat_answer(self, user_id: int, chat_session_id: int, chat_id: int, answer: str):
+        self._write(update_answer, user_id, chat_session_id, chat_id, answer)
+
+    def get_last_chats(
+        self,
+        chat_session_id: int,
+        chat_id: int,
+        limit: int = 5,
+        user_id: int = None
+    ):
+        return self._read(select_last_chats, chat_session_id, chat_id, limit, user_id)
+
+    def get_sessions(self, user_id: int):
+        return self._read(select_sessions, user_id)
+
+    def delete_session(self, chat_session_id: int, user_id: int = None):
+        self._write(mark_session_deleted, chat_session_id, user_id)
+
+    def delete_chat(self, chat_id: int, user_id: int = None, chat_session_id: int = None):
+        self._write(mark_chat_deleted, chat_id, user_id, chat_session_id)
+
+    def _write(self, statement, *args):
+        with self.pool.connection() as conn, write_transaction(conn) as cursor:
+            return statement(cursor, *args)
 
-        self.conn.commit()
+    def _read(self, statement, *args):
+        with self.pool.connection() as conn:
+            return statement(conn.cursor(), *args)
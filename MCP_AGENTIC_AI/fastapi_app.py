@@ -5,22 +5,59 @@ from typing import List
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from langchain_core.messages import AIMessage, ToolMessage
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.agents import create_agent
 import json
 from models import azure_chatopenai_model, google_model
-from db import SessionDB
+from db import AsyncSessionDB
 from logger.base_logger import get_logger
 from pathlib import Path
-from utilities import format_response
+from utilities import AgentCache, SessionManager, format_response
 from pydantic import BaseModel, Field
 from typing import Literal
 load_dotenv()
 
 logger = get_logger(__name__)
 
-app = FastAPI(title="MCP Agent API")
+
+def build_agent(tools, tools_info):
+    prompt = f"""
+    You are an assistant.
+
+    You have access to the following tools:
+
+    {tools_info}
+
+    If asked for plotting or analysis:
+    1. Fetch CSV data using the best tool if not already provided in the query.
+    2. Perform plotting/analysis for the csv data. MANDATORY to pass the CORRECT csv filename returned from the previous tool to the analysis/plotting tool. Do NOT pass any imaginary filename, only use the filename returned from the file retrieval tool.
+    3. Pass the chat session id and chat id to the tools that require them for saving files to the shared folder. You are capable to plotting by calling the data visualization tool and you are capable of doing analysis by calling the data analysis tool.
+    4. MANDATORILY to USE the correct filename returned from the tool for saving the results and include the file name in the response.This instruction is of utmost importance,
+    5.Mandatory to Include all the filenames in the response and do not include any file paths.
+    6. You can even use the csv file paths in the previous response, in case the query seems like a follow-up and the user is asking for analysis or plotting after the csv file has been provided in the previous response. Just make sure to use the correct csv filename from the previous response and pass only the filename instead of the whole file path to the agent.
+    """
+    return create_agent(google_model, tools, system_prompt=prompt)
+
+
+#one persistent session per MCP server, shared by discovery and every tool call
+mcp_sessions = SessionManager()
+#tool catalog and agent are built once and refreshed in the background (TTL, servers.json change, tools/list_changed)
+agent_cache = AgentCache(build_agent, servers_path="servers.json", sessions=mcp_sessions)
+#sqlite runs off the event loop, writes are group-committed by one writer thread
+session_db = AsyncSessionDB()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await agent_cache.start()
+    yield
+    await agent_cache.close()
+    await mcp_sessions.close()
+    await session_db.close()
+
+
+app = FastAPI(title="MCP Agent API", lifespan=lifespan)
 
 
 class ChatRequest(BaseModel):
@@ -38,23 +75,25 @@ class FollowupIntent(BaseModel):
     response_if_intent_not_found: str = Field(description="The response to return if the intent is not found, return empty string if intent is found", default="")
 
 
+followup_llm = google_model.with_structured_output(FollowupIntent)
+
+
 #chat endpoint
 @app.post("/chat")
 async def chat(req: ChatRequest):
     try:
 
         logger.info(f"Received chat request: {req}")
-        db = SessionDB()
 
         #create a chat id 
         user_id = req.user_id
         chat_session_id = req.chat_session_id
         user_query = req.user_query
 
-        chat_id = db.create_chat_id(
-            user_id,
-            chat_session_id,
-            user_query
+        #the chat row and its history are independent of the agent, prepare both at once
+        (chat_id, rows), (agent, tool_info) = await asyncio.gather(
+            open_chat(user_id, chat_session_id, user_query),
+            agent_cache.get()
         )
         PROJECT_ROOT = Path(__file__).parent.resolve()  # MCP_AGENTIC_AI folder
 
@@ -64,17 +103,13 @@ async def chat(req: ChatRequest):
 
         shared_folder.mkdir(parents=True, exist_ok=True)
 
-        #load last 2 chats for context
-        rows = db.get_last_chats(chat_session_id, chat_id, limit=2)
-
         history = []
         for q, a in rows:
             history.append({"role": "user", "content": q})
             history.append({"role": "assistant", "content": a})
         logger.info("Chat history loaded for context: {}".format(history))
-        agent, tool_info = await build_agent()
-        
-        followup_result = is_followup(history, user_query, tool_info)
+
+        followup_result = await is_followup(history, user_query, tool_info)
         if followup_result.intent_detected == "no":
             response= [{
                 "type":"markdown",
@@ -122,16 +157,16 @@ async def chat(req: ChatRequest):
         answer="\n".join(t for t in texts if t)       
         logger.info(f"Response before formatting: {answer}")
 
-        answer = format_response(user_query, answer)
+        answer = await format_response(user_query, answer)
         answer = attach_filepaths(answer, shared_folder)
         if not isinstance(answer, str):
             answer = json.dumps(answer, ensure_ascii=False)
 
         safe_answer = answer.encode("utf-8", "ignore").decode()
 
-        print(f"Final response: {safe_answer}")
+        logger.debug(f"Final response: {safe_answer}")
 
-        db.update_chat_answer(
+        await session_db.update_chat_answer(
             user_id,
             chat_session_id,
             chat_id,
@@ -155,9 +190,7 @@ async def chat(req: ChatRequest):
 @app.post("/new_session")
 async def new_session(req: NewSessionRequest):
 
-    db = SessionDB()
-    logger.info("Initialized SessionDB for new session request")
-    chat_session_id=db.create_chat_session(
+    chat_session_id=await session_db.create_chat_session(
         req.user_id
     )
     logger.info(f"New chat session created: {chat_session_id} for user {req.user_id}")
@@ -179,22 +212,38 @@ async def list_files(user_id: int, session_id: int, chat_id: int):
 
 
 
+# MCP servers and tools the agent is using
+@app.get("/tools")
+async def list_tools():
+    report = agent_cache.report()
+    report["sessions"] = mcp_sessions.report()
+    return report
+
+
 # List Sessions
 @app.get("/sessions/{user_id}")
 async def list_sessions(user_id: str):
-    db = SessionDB()
-
-    sessions = db.get_sessions(user_id)
+    sessions = await session_db.get_sessions(user_id)
 
     return sessions
 
 
 
-def is_followup(chat_history: List[dict], user_query: str,tool_info: str) -> bool:
+#create the chat id, then load the last 2 chats before it for context
+async def open_chat(user_id: int, chat_session_id: int, user_query: str):
+    chat_id = await session_db.create_chat_id(
+        user_id,
+        chat_session_id,
+        user_query
+    )
+    rows = await session_db.get_last_chats(chat_session_id, chat_id, limit=2, user_id=user_id)
+    return chat_id, rows
+
+
+async def is_followup(chat_history: List[dict], user_query: str,tool_info: str) -> FollowupIntent:
     #intent detection and followup logic here
     
     logger.info("Detecting if the query is a follow-up and intent detection. User query: {}, Chat history: {}".format(user_query, chat_history))
-    structured_llm = google_model.with_structured_output(FollowupIntent)
     prompt=f"""Given the following conversation history and user query, determine if the user query is a follow-up question.
     A follow-up question is a question that is related to the previous conversation and requires the context of the previous conversation to answer. If it is a follow-up question, return 'yes' for is_followup else 'no' for is_followup.
 
@@ -206,39 +255,11 @@ def is_followup(chat_history: List[dict], user_query: str,tool_info: str) -> boo
     Conversation history: {chat_history}
     """
 
-    result = structured_llm.invoke(prompt)
+    result = await followup_llm.ainvoke(prompt)
     logger.info("Follow-up detection result: {}".format(result))
     return result
 
 
-async def build_agent():
-
-    with open("servers.json","r") as f:
-        servers = json.load(f)
-    client = MultiServerMCPClient(servers)
-    tools = await client.get_tools()
-    tools_info = {tool.name: tool.description for tool in tools}
-    prompt = f"""
-    You are an assistant.
-
-    You have access to the following tools:
-
-    {tools_info}
-
-    If asked for plotting or analysis:
-    1. Fetch CSV data using the best tool if not already provided in the query.
-    2. Perform plotting/analysis for the csv data. MANDATORY to pass the CORRECT csv filename returned from the previous tool to the analysis/plotting tool. Do NOT pass any imaginary filename, only use the filename returned from the file retrieval tool.
-    3. Pass the chat session id and chat id to the tools that require them for saving files to the shared folder. You are capable to plotting by calling the data visualization tool and you are capable of doing analysis by calling the data analysis tool.
-    4. MANDATORILY to USE the correct filename returned from the tool for saving the results and include the file name in the response.This instruction is of utmost importance,
-    5.Mandatory to Include all the filenames in the response and do not include any file paths.
-    6. You can even use the csv file paths in the previous response, in case the query seems like a follow-up and the user is asking for analysis or plotting after the csv file has been provided in the previous response. Just make sure to use the correct csv filename from the previous response and pass only the filename instead of the whole file path to the agent.
-    """
-    agent = create_agent(google_model, tools, system_prompt=prompt)
-
-    return agent, tools_info
-
-
-
 def attach_filepaths(response_blocks, shared_folder: Path):
 
     if isinstance(response_blocks, str):
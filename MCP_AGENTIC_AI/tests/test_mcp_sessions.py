@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, INVALID_PARAMS, ErrorData
+
+from utilities import mcp_sessions
+from utilities.mcp_sessions import ServerSession
+
+
+class FakeSession:
+    """ClientSession stand-in whose call_tool and send_ping raise the given errors."""
+
+    def __init__(self, call_error=None, ping_error=None):
+        self.call_error = call_error
+        self.ping_error = ping_error
+
+    async def initialize(self):
+        pass
+
+    async def call_tool(self, tool, arguments):
+        if self.call_error is not None:
+            raise self.call_error
+        return {"tool": tool}
+
+    async def send_ping(self):
+        if self.ping_error is not None:
+            raise self.ping_error
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """The sessions create_session hands out, in order; later connects get a healthy one."""
+    queue = []
+
+    @asynccontextmanager
+    async def create_session(connection):
+        yield queue.pop(0) if queue else FakeSession()
+
+    monkeypatch.setattr(mcp_sessions, "create_session", create_session)
+    monkeypatch.setattr(mcp_sessions, "RECONNECT_INITIAL_SECONDS", 0)
+    return queue
+
+
+def run(server, coro):
+    async def main():
+        server.start()
+        try:
+            return await coro()
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def mcp_error(code, message):
+    return McpError(ErrorData(code=code, message=message))
+
+
+@pytest.mark.parametrize("error", [
+    mcp_error(CONNECTION_CLOSED, "Connection closed"),
+    mcp_error(32600, "Session terminated"),
+])
+def test_closed_connection_reconnects(sessions, error):
+    sessions.append(FakeSession(call_error=error))
+    server = ServerSession("fake", {})
+
+    async def calls():
+        with pytest.raises(McpError):
+            await server.call_tool("tool", {})
+        return await server.call_tool("tool", {})
+
+    assert run(server, calls) == {"tool": "tool"}
+    assert server.stats["reconnects"] == 1
+    assert server.stats["errors"] == 1
+
+
+def test_tool_error_keeps_session(sessions):
+    sessions.append(FakeSession(call_error=mcp_error(INVALID_PARAMS, "bad arguments")))
+    server = ServerSession("fake", {})
+
+    async def calls():
+        first = await server.get()
+        with pytest.raises(McpError):
+            await server.call_tool("tool", {})
+        await asyncio.sleep(0.01)
+        return first, await server.get()
+
+    first, second = run(server, calls)
+    assert first is second
+    assert server.stats["reconnects"] == 0
+
+
+def test_session_ending_by_itself_reconnects(sessions):
+    sessions.append(FakeSession(ping_error=mcp_error(CONNECTION_CLOSED, "Connection closed")))
+    server = ServerSession("fake", {}, ping_interval=0.01)
+
+    async def idle():
+        first = await server.get()
+        while server.stats["reconnects"] == 0:
+            await asyncio.sleep(0.01)
+        return first, await server.get()
+
+    first, second = run(server, idle)
+    assert first is not second
+    assert second.ping_error is None
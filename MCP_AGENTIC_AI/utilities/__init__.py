@@ -1 +1,3 @@
-from .response_writer_agent import format_response
\ No newline at end of file
+from .response_writer_agent import format_response
+from .agent_cache import AgentCache
+from .mcp_sessions import SessionManager
\ No newline at end of file
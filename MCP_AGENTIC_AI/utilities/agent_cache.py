@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+from mcp import types as mcp_types
+
+from logger.base_logger import get_logger
+logger = get_logger(__name__)
+
+#tool catalog is rediscovered after this many seconds
+TOOLS_TTL_SECONDS = float(os.getenv("MCP_TOOLS_TTL_SECONDS", "300"))
+#degraded servers are retried sooner than the TTL
+DEGRADED_RETRY_SECONDS = float(os.getenv("MCP_DEGRADED_RETRY_SECONDS", "30"))
+#discovery of one server gives up after this many seconds
+DISCOVERY_TIMEOUT_SECONDS = float(os.getenv("MCP_DISCOVERY_TIMEOUT_SECONDS", "10"))
+
+
+class AgentCache:
+    """
+    App-level cache of the MCP tool catalog and the agent built on it.
+
+    The catalog is discovered once at startup, one task per server with a
+    timeout, so a server that is down or slow is marked degraded and left out
+    instead of failing or stalling discovery. get() never waits on discovery
+    once an agent exists: when the catalog is older than the TTL, a degraded
+    server is due for a retry, servers.json changed, or a server sent a
+    tools/list_changed notification, it returns the current agent and
+    refreshes in the background. The agent is only rebuilt when the set of
+    tools (names and descriptions) changed.
+
+    With a SessionManager, discovery and every tool call use its persistent
+    session to the server, which is also what delivers tools/list_changed.
+    """
+
+    def __init__(self, build_agent, servers_path="servers.json", ttl=TOOLS_TTL_SECONDS,
+                 degraded_retry=DEGRADED_RETRY_SECONDS, timeout=DISCOVERY_TIMEOUT_SECONDS, sessions=None):
+        #build_agent(tools, tools_info) -> agent
+        self.build_agent = build_agent
+        self.sessions = sessions
+        self.servers_path = Path(servers_path)
+        self.ttl = ttl
+        self.degraded_retry = degraded_retry
+        self.timeout = timeout
+
+        self.client = None
+        self.servers = {}
+        self.status = {}
+        self._servers_mtime = None
+        self._tools = {}
+        self._signature = None
+        self._agent = None
+        self._tools_info = {}
+        self._refreshed_at = 0.0
+        self._changed = False
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    async def start(self):
+        """Discover the tools and build the agent, called once at startup."""
+        await self.refresh()
+        return self
+
+    async def close(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+    async def get(self):
+        """(agent, tools_info) for a request; only the first call waits for discovery."""
+        if self._agent is None:
+            await self.refresh()
+        elif self._needs_refresh():
+            self._schedule_refresh()
+        return self._agent, self._tools_info
+
+    def mark_changed(self):
+        """Rediscover the tools on the next get(), e.g. after a tools/list_changed notification."""
+        self._changed = True
+
+    def report(self) -> dict:
+        """Per-server discovery state for the /tools endpoint."""
+        return {
+            "refreshed_at": self._refreshed_at,
+            "ttl_seconds": self.ttl,
+            "tools": sorted(self._tools_info),
+            "servers": self.status
+        }
+
+    async def refresh(self):
+        async with self._lock:
+            if self._load_servers():
+                interceptors = None
+                if self.sessions is not None:
+                    self.sessions.configure(self.servers)
+                    interceptors = [self.sessions.interceptor]
+                self.client = MultiServerMCPClient(self.servers, tool_interceptors=interceptors)
+            self._changed = False
+
+            names = list(self.servers)
+            results = await asyncio.gather(*[self._discover(name) for name in names])
+            self._tools = {name: tools for name, tools in zip(names, results) if tools is not None}
+            self._refreshed_at = time.time()
+
+            tools = [tool for server_tools in self._tools.values() for tool in server_tools]
+            signature = tuple(sorted((tool.name, tool.description or "") for tool in tools))
+            if signature != self._signature or self._agent is None:
+                self._tools_info = {tool.name: tool.description for tool in tools}
+                self._agent = self.build_agent(tools, self._tools_info)
+                self._signature = signature
+                logger.info(f"Agent built with {len(tools)} tools from {len(self._tools)}/{len(names)} servers")
+
+    async def _discover(self, name):
+        start = time.perf_counter()
+        try:
+            tools = await asyncio.wait_for(self._load_tools(name), self.timeout)
+        except Exception as e:
+            logger.warning(f"MCP server '{name}' degraded, tool discovery failed: {e!r}")
+            self.status[name] = {
+                "state": "degraded",
+                "error": repr(e),
+                "tools": 0,
+                "checked_at": time.time()
+            }
+            return None
+        self.status[name] = {
+            "state": "ok",
+            "tools": len(tools),
+            "discovery_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": time.time()
+        }
+        return tools
+
+    async def _load_tools(self, name):
+        if self.sessions is None:
+            return await self.client.get_tools(server_name=name)
+        session = await self.sessions.session(name, self.timeout)
+        return await load_mcp_tools(
+            session,
+            callbacks=self.client.callbacks,
+            server_name=name,
+            tool_interceptors=self.client.tool_interceptors
+        )
+
+    def _load_servers(self) -> bool:
+        """Re-read servers.json if it changed; True when the connections were replaced."""
+        mtime = self.servers_path.stat().st_mtime_ns
+        if mtime == self._servers_mtime:
+            return False
+        with open(self.servers_path, "r") as f:
+            servers = json.load(f)
+        #every session reports tools/list_changed back to the cache
+        for name, connection in servers.items():
+            session_kwargs = dict(connection.get("session_kwargs") or {})
+            session_kwargs["message_handler"] = self._message_handler(name)
+            connection["session_kwargs"] = session_kwargs
+        self.servers = servers
+        self.status = {name: self.status[name] for name in servers if name in self.status}
+        self._servers_mtime = mtime
+        logger.info(f"Loaded {len(servers)} MCP servers from {self.servers_path}")
+        return True
+
+    def _message_handler(self, name):
+        async def handle(message):
+            if isinstance(message, mcp_types.ServerNotification) and isinstance(message.root, mcp_types.ToolListChangedNotification):
+                logger.info(f"MCP server '{name}' changed its tool list")
+                self.mark_changed()
+        return handle
+
+    def _needs_refresh(self) -> bool:
+        age = time.time() - self._refreshed_at
+        if self._changed or age > self.ttl:
+            return True
+        if age > self.degraded_retry and any(s["state"] == "degraded" for s in self.status.values()):
+            return True
+        try:
+            return self.servers_path.stat().st_mtime_ns != self._servers_mtime
+        except OSError:
+            return False
+
+    def _schedule_refresh(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception:
+            #the current agent keeps serving, the next request retries
+            logger.exception("Background tool refresh failed")
@@ -0,0 +1,278 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from functools import partial
+
+import httpx
+from langchain_mcp_adapters.sessions import create_session
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from logger.base_logger import get_logger
+logger = get_logger(__name__)
+
+#pooled HTTP connections per streamable-http server
+MAX_CONNECTIONS = int(os.getenv("MCP_MAX_CONNECTIONS", "10"))
+#how long a tool call waits for its server's session before failing
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("MCP_CONNECT_TIMEOUT_SECONDS", "10"))
+#reconnect delays double from the first to the last value
+RECONNECT_INITIAL_SECONDS = float(os.getenv("MCP_RECONNECT_INITIAL_SECONDS", "0.5"))
+RECONNECT_MAX_SECONDS = float(os.getenv("MCP_RECONNECT_MAX_SECONDS", "30"))
+#how often an idle session is pinged to notice a server that went away
+PING_INTERVAL_SECONDS = float(os.getenv("MCP_PING_INTERVAL_SECONDS", "15"))
+#latency samples kept per server for the percentiles
+LATENCY_SAMPLES = 1000
+
+HTTP_TRANSPORTS = ("sse", "http", "streamable_http", "streamable-http")
+
+
+def pooled_http_client_factory(max_connections=MAX_CONNECTIONS):
+    """httpx client factory with the MCP defaults plus a keep-alive pool of max_connections."""
+    def factory(headers=None, timeout=None, auth=None):
+        kwargs = {
+            "follow_redirects": True,
+            "timeout": timeout if timeout is not None else httpx.Timeout(30, read=300),
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        }
+        if headers is not None:
+            kwargs["headers"] = headers
+        if auth is not None:
+            kwargs["auth"] = auth
+        return httpx.AsyncClient(**kwargs)
+    return factory
+
+
+def transport_closed(error: McpError) -> bool:
+    """
+    Whether an McpError reports the connection gone rather than an error of the
+    call: the SDK fails pending requests with CONNECTION_CLOSED when the stream
+    ends, and a restarted streamable-http server rejects the old session id.
+    """
+    return error.error.code == CONNECTION_CLOSED or "session terminated" in error.error.message.lower()
+
+
+class ServerSession:
+    """
+    One initialized MCP session to a server, held open by a background task.
+
+    The task enters the session context (the stdio process or HTTP client
+    lives as long as it does) and waits until a call reports the transport
+    broken or the session ends by itself, which a ping every
+    PING_INTERVAL_SECONDS notices when no call is in flight, then reconnects.
+    Connect attempts that fail are retried with exponential backoff and
+    jitter. Tool calls share the session concurrently; errors returned by the
+    server (isError results, McpError other than a closed connection or
+    terminated session) do not reconnect it.
+    """
+
+    def __init__(self, name, connection, connect_timeout=CONNECT_TIMEOUT_SECONDS, ping_interval=PING_INTERVAL_SECONDS):
+        self.name = name
+        self.connection = connection
+        self.connect_timeout = connect_timeout
+        self.ping_interval = ping_interval
+        self.session = None
+        self.state = "connecting"
+        self.last_error = None
+        self.connected_at = None
+        self.stats = {"calls": 0, "errors": 0, "reconnects": 0, "total_ms": 0.0, "max_ms": 0.0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._ready = asyncio.Event()
+        self._broken = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def get(self, timeout=None):
+        """The live session, waiting up to timeout for a (re)connect."""
+        try:
+            async with asyncio.timeout(timeout if timeout is not None else self.connect_timeout):
+                #the session can be dropped between the wake-up and the return
+                while self.session is None or not self._ready.is_set():
+                    await self._ready.wait()
+        except TimeoutError:
+            raise ConnectionError(f"MCP server '{self.name}' is unavailable: {self.last_error}") from None
+        return self.session
+
+    async def call_tool(self, tool, arguments):
+        session = await self.get()
+        start = time.perf_counter()
+        error = False
+        try:
+            result = await session.call_tool(tool, arguments)
+            error = bool(getattr(result, "isError", False))
+            return result
+        except McpError as e:
+            error = True
+            if transport_closed(e):
+                self._drop(session, f"call to {tool} failed", e)
+            raise
+        except Exception as e:
+            error = True
+            #transport failure, drop this session and reconnect
+            self._drop(session, f"call to {tool} failed", e)
+            raise
+        finally:
+            self._record((time.perf_counter() - start) * 1000, error)
+
+    def report(self) -> dict:
+        lat = sorted(self.latencies)
+        calls = self.stats["calls"]
+        return {
+            "state": self.state,
+            "connected_at": self.connected_at,
+            "last_error": self.last_error,
+            "calls": calls,
+            "errors": self.stats["errors"],
+            "reconnects": self.stats["reconnects"],
+            "mean_ms": round(self.stats["total_ms"] / calls, 2) if calls else None,
+            "p50_ms": round(lat[len(lat) // 2], 2) if lat else None,
+            "p95_ms": round(lat[min(int(len(lat) * 0.95), len(lat) - 1)], 2) if lat else None,
+            "max_ms": round(self.stats["max_ms"], 2) if calls else None
+        }
+
+    def _drop(self, session, reason, error):
+        logger.warning(f"MCP server '{self.name}' {reason}, reconnecting: {error!r}")
+        self.last_error = repr(error)
+        if self.session is session:
+            #later calls wait for the reconnect instead of getting this session
+            self._ready.clear()
+            self._broken.set()
+
+    async def _watch(self, session):
+        """Ping the session until its transport is gone."""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await asyncio.wait_for(session.send_ping(), self.connect_timeout)
+            except asyncio.TimeoutError:
+                #a busy server, not a closed one
+                continue
+            except McpError as e:
+                if transport_closed(e):
+                    self._drop(session, "session ended", e)
+                    return
+            except Exception as e:
+                self._drop(session, "session ended", e)
+                return
+
+    def _record(self, ms, error):
+        self.stats["calls"] += 1
+        self.stats["errors"] += int(error)
+        self.stats["total_ms"] += ms
+        self.stats["max_ms"] = max(self.stats["max_ms"], ms)
+        self.latencies.append(ms)
+
+    async def _run(self):
+        delay = RECONNECT_INITIAL_SECONDS
+        while True:
+            connected = False
+            try:
+                async with create_session(self.connection) as session:
+                    await asyncio.wait_for(session.initialize(), self.connect_timeout)
+                    self.session = session
+                    self.state = "connected"
+                    self.connected_at = time.time()
+                    self._ready.set()
+                    connected = True
+                    delay = RECONNECT_INITIAL_SECONDS
+                    logger.info(f"MCP session to '{self.name}' established")
+                    broken = asyncio.create_task(self._broken.wait())
+                    watch = asyncio.create_task(self._watch(session))
+                    try:
+                        await asyncio.wait({broken, watch}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        broken.cancel()
+                        watch.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = repr(e)
+                logger.warning(f"MCP session to '{self.name}' failed: {e!r}")
+            finally:
+                self.session = None
+                self._ready.clear()
+                self._broken.clear()
+
+            self.state = "reconnecting"
+            self.stats["reconnects"] += int(connected)
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            if not connected:
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+class SessionManager:
+    """
+    Persistent MCP sessions for every server in servers.json.
+
+    interceptor() is passed to MultiServerMCPClient as a tool call
+    interceptor: calls to a managed server go through its long-lived session
+    instead of the adapter's new session per call (a new stdio process or
+    streamable-http handshake each time). HTTP servers get a pooled httpx
+    client. report() gives per-server state, call counts and latency.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, connect_timeout=CONNECT_TIMEOUT_SECONDS):
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.servers = {}
+        self._configs = {}
+        #sessions of removed servers still closing, kept so the tasks are not collected
+        self._closing = set()
+
+    def configure(self, servers: dict):
+        """Start sessions for new or changed servers and close the removed ones."""
+        configs = {name: _config(connection) for name, connection in servers.items()}
+        for name in list(self.servers):
+            if configs.get(name) != self._configs[name]:
+                task = asyncio.create_task(self.servers.pop(name).close())
+                self._closing.add(task)
+                task.add_done_callback(partial(self._closed, name))
+                del self._configs[name]
+        for name, connection in servers.items():
+            if name in self.servers:
+                continue
+            connection = dict(connection)
+            if connection.get("transport") in HTTP_TRANSPORTS and "httpx_client_factory" not in connection:
+                connection["httpx_client_factory"] = pooled_http_client_factory(self.max_connections)
+            server = ServerSession(name, connection, self.connect_timeout)
+            server.start()
+            self.servers[name] = server
+            self._configs[name] = configs[name]
+
+    def _closed(self, name, task):
+        self._closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Closing the MCP session to '{name}' failed", exc_info=task.exception())
+
+    async def session(self, name, timeout=None):
+        return await self.servers[name].get(timeout)
+
+    async def interceptor(self, request, handler):
+        server = self.servers.get(request.server_name)
+        if server is None:
+            return await handler(request)
+        return await server.call_tool(request.name, request.args)
+
+    def report(self) -> dict:
+        return {name: server.report() for name, server in self.servers.items()}
+
+    async def close(self):
+        await asyncio.gather(*[server.close() for server in self.servers.values()], *self._closing)
+        self.servers = {}
+        self._configs = {}
+
+
+def _config(connection) -> dict:
+    """The servers.json entry without the callbacks added to it, to tell if a server changed."""
+    return {k: v for k, v in connection.items() if k != "session_kwargs"}
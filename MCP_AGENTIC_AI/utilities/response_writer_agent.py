@@ -18,7 +18,14 @@ class ResponseModel(BaseModel):
     content: List[ContentItem]
 
 
-def format_response(user_query: str, answer: str) -> str:
+#the writer agent does not depend on the request, build it once
+response_writer = create_agent(
+    model=google_model,#azure_chatopenai_model,
+    response_format=ResponseModel
+)
+
+
+async def format_response(user_query: str, answer: str) -> str:
     """
     Formats agent response into structured JSON list
     """
@@ -61,12 +68,7 @@ def format_response(user_query: str, answer: str) -> str:
         {answer}
         """
 
-        agent = create_agent(
-            model=google_model,#azure_chatopenai_model,
-            response_format=ResponseModel
-        )
-       
-        result = agent.invoke({
+        result = await response_writer.ainvoke({
             "messages": [{"role": "user", "content": template}]
         })
         structured_output = result["structured_response"]